@@ -1,16 +1,16 @@
 from fastapi import APIRouter, HTTPException, Query
 import os
 from service.azureBlobService import AzureBlobService
-from service.weaviateService import WeaviateService
-from service.rag_utils import find_relevant_chunks
-from pydantic import BaseModel, Field
+from service.asyncWeaviateService import async_weaviate_service
+from service.snippet_utils import RESULT_FIELDS, resolve_fields
+from models.searchFilters import SearchFilters
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
 
 
 router = APIRouter()
 blobservice = AzureBlobService()
-weaviateService = WeaviateService()
 
 @router.get('/paginateMongoCases')
 async def paginate_cases(
@@ -47,10 +47,10 @@ class SearchRequest(BaseModel):
     query: str
 
 @router.get('/paginateWeaviateCases')
-def paginate_weaviate_cases(
+async def paginate_weaviate_cases(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100)):
-    paginated_response = blobservice.paginate_weaviate_cases(page,page_size)
+    paginated_response = await async_weaviate_service.paginate_cases(page, page_size)
     return paginated_response
 
 
@@ -59,6 +59,16 @@ class SearchPaginationRequest(BaseModel):
     query: str = Field(..., description="Search query (can be very long)", min_length=1, max_length=10000)
     page: int = Field(1, description="Page number", ge=1)
     page_size: int = Field(10, description="Number of results per page", ge=1, le=100)
+    result_set_token: Optional[str] = Field(default=None, description="Token from a previous response; pages the same ranked results without searching again")
+    snippet: bool = Field(False, description="Return a short highlighted passage per result instead of the full chunk text")
+    fields: Optional[List[str]] = Field(default=None, description=f"Result fields to return, any of {list(RESULT_FIELDS)}")
+    filters: Optional[SearchFilters] = Field(default=None, description="Restrict results by jurisdiction, type, category or date")
+    group_by_case: bool = Field(False, description="Return one best chunk per case with its hit count, paginated by case")
+
+    @field_validator("fields")
+    @classmethod
+    def check_fields(cls, fields: Optional[List[str]]) -> Optional[List[str]]:
+        return resolve_fields(fields, []) if fields else fields
     # limit: int = Field(description="Number of top matched results")
 
 class SearchPaginationResponse(BaseModel):
@@ -66,24 +76,40 @@ class SearchPaginationResponse(BaseModel):
     page: int
     page_size: int
     total_records: int
+    result_set_token: Optional[str] = None
+    total_hits: Optional[int] = None
     # total_pages: int
     # has_next: bool
     # has_previous: bool
     results: List[Dict[str, Any]]
 
 @router.post('/caseSearch', response_model=SearchPaginationResponse)
-def search_relevant_docs(request: SearchPaginationRequest):
+async def search_relevant_docs(request: SearchPaginationRequest):
     try:
-        paginated_response = weaviateService.search_relevant_docs(
+        paginated_response = await async_weaviate_service.search_relevant_docs(
             query=request.query, 
             page=request.page, 
-            page_size=request.page_size
+            page_size=request.page_size,
+            result_set_token=request.result_set_token,
+            snippet=request.snippet,
+            fields=request.fields,
+            filters=request.filters,
+            group_by_case=request.group_by_case
         )
         return paginated_response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 
+@router.get('/caseChunk/{object_id}')
+async def get_case_chunk(object_id: str):
+    """Full text and metadata of one chunk, by the `id` returned from /caseSearch or /search_articles."""
+    chunk = await async_weaviate_service.get_chunk_text(object_id)
+    if chunk is None:
+        raise HTTPException(status_code=404, detail=f"Chunk {object_id} not found")
+    return chunk
+
+
 # @router.post('/search-weaviate-paginated', response_model=SearchPaginationResponse)
 # def search_weaviate_paginated_post(request: SearchPaginationRequest):
 #     """
@@ -1,14 +1,18 @@
 import os
 import sys
+import asyncio
 import logging
+import threading
 from typing import List
 import uuid
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 import json
 
 # from com.sequation.document.service.azureTableService import AzureTableService
-from service.chatService import ChatService
+from service.asyncChatService import AsyncChatService
+from service.sessionScheduler import SessionBusyError, session_scheduler
 from models.chatModels import ChatRequest, ChatResponse
 from dotenv import load_dotenv
 from config.tokenUtils import get_auth, AuthContext
@@ -23,39 +27,48 @@ load_dotenv()
 
 # Global singleton instances to prevent multiple initializations
 _chat_service_instance = None
+_chat_service_lock = threading.Lock()
 
-def get_chat_service(lat: str = None, long: str = None) -> ChatService:
-    """Get singleton instance of ChatService"""
+def get_chat_service(lat: str = None, long: str = None) -> AsyncChatService:
+    """Get singleton instance of AsyncChatService; construction blocks, so call it off the event loop"""
     global _chat_service_instance
-    if _chat_service_instance is None:
-        try:
-            logger.info("Creating new ChatService instance")
-            _chat_service_instance = ChatService()
-        except Exception as e:
-            logger.error(f"Failed to create ChatService instance: {str(e)}", exc_info=True)
-            raise HTTPException(status_code=500, detail=f"Service initialization failed: {str(e)}")
+    with _chat_service_lock:
+        if _chat_service_instance is None:
+            try:
+                logger.info("Creating new AsyncChatService instance")
+                _chat_service_instance = AsyncChatService()
+            except Exception as e:
+                logger.error(f"Failed to create AsyncChatService instance: {str(e)}", exc_info=True)
+                raise HTTPException(status_code=500, detail=f"Service initialization failed: {str(e)}")
     return _chat_service_instance
 
-def cleanup_services():
-    """Cleanup function to properly close all service connections"""
+async def init_services():
+    """Build the chat service and load the graph reference data; called at application startup"""
+    try:
+        # The Neo4j schema read and the Mem0 client setup are blocking
+        chat_service = await asyncio.to_thread(get_chat_service)
+        await chat_service.graphRAGService.build_allowed_values_async()
+        logger.info("Chat service and graph reference data ready")
+    except Exception as e:
+        # The first chat request retries; the rest of the API stays up
+        logger.warning(f"Could not initialize the chat service at startup: {str(e)}")
+
+async def cleanup_services():
+    """Close the chat service's connections; called at application shutdown"""
     global _chat_service_instance
     logger.info("Cleaning up all service instances")
     
     try:
         if _chat_service_instance:
-            logger.info("Cleaning up ChatService instance")
-            _chat_service_instance.cleanup()
+            logger.info("Cleaning up AsyncChatService instance")
+            await _chat_service_instance.close()
             _chat_service_instance = None
-            logger.info("ChatService instance cleaned up")
+            logger.info("AsyncChatService instance cleaned up")
     except Exception as e:
-        logger.error(f"Error cleaning up ChatService: {str(e)}")
+        logger.error(f"Error cleaning up AsyncChatService: {str(e)}")
     
     logger.info("All service instances cleaned up")
 
-# Register cleanup function for application shutdown
-import atexit
-atexit.register(cleanup_services)
-
 @router.post('/chat/stream')
 async def stream_chat(request: ChatRequest):
     """
@@ -81,21 +94,52 @@ async def stream_chat(request: ChatRequest):
         longitude = request.long if request.long else "54.3941"
                 
         # Get singleton service instances
-        logger.info(f"[{request_id}] Getting ChatService instance")
-        chat_service = get_chat_service(lat=lattitude, long=longitude)
+        logger.info(f"[{request_id}] Getting AsyncChatService instance")
+        chat_service = await asyncio.to_thread(get_chat_service, lattitude, longitude)
+
+        # Generate or use existing session ID
+        if not request.session_id:
+            unique_session_id = user_id + "_" + str(uuid.uuid4())
+            logger.info(f"[{request_id}] Generated new session ID: {unique_session_id}")
+        else:
+            unique_session_id = request.session_id
+            logger.info(f"[{request_id}] Using existing session ID: {unique_session_id}")
+
+        # Prepare metadata with session information
+        metadata = {
+            "session_id": unique_session_id,
+            "user_id": user_id,
+            "tenant_name": tenant_name,
+            "org_id": str(orgId),
+            "timestamp": str(datetime.datetime.now()),
+            "lattitude": lattitude,
+            "longitude": longitude
+        }
+        logger.info(f"[{request_id}] Prepared metadata: {metadata}")
+
+        # Queue behind earlier requests of the session, or join an identical one in flight
+        try:
+            ticket = session_scheduler.admit(
+                session_scheduler.session_key(user_id, unique_session_id),
+                request.message,
+                lambda: chat_service.enhanced_chat_completion(
+                    message=request.message,
+                    top_k=15,
+                    tenant_name=tenant_name,
+                    user_id=user_id,
+                    metadata=metadata
+                )
+            )
+        except SessionBusyError as e:
+            logger.warning(f"[{request_id}] Rejecting request: {str(e)}")
+            raise HTTPException(status_code=429, detail="Too many requests in progress for this session", headers={"Retry-After": "1"})
+        if ticket.coalesced:
+            logger.info(f"[{request_id}] Attached to an identical request already in progress")
         
-        def generate():
-            """Generator function for streaming response with progress indicators."""
+        async def generate():
+            """Async generator for the streaming response with progress indicators; holds no thread while waiting."""
             try:
                 logger.info(f"[{request_id}] Starting response generation")
-                
-                # Generate or use existing session ID
-                if not request.session_id:
-                    unique_session_id = user_id + "_" + str(uuid.uuid4())
-                    logger.info(f"[{request_id}] Generated new session ID: {unique_session_id}")
-                else:
-                    unique_session_id = request.session_id
-                    logger.info(f"[{request_id}] Using existing session ID: {unique_session_id}")
 
                 #SET device location
                 
@@ -104,28 +148,10 @@ async def stream_chat(request: ChatRequest):
                 logger.info(f"[{request_id}] Sending session start indicator")
                 yield session_start
                 
-                # Prepare metadata with session information
-                metadata = {
-                    "session_id": unique_session_id,
-                    "user_id": user_id,
-                    "tenant_name": tenant_name,
-                    "org_id": str(orgId),
-                    "timestamp": str(datetime.datetime.now()),
-                    "lattitude": lattitude,
-                    "longitude": longitude
-                }
-                logger.info(f"[{request_id}] Prepared metadata: {metadata}")
-                
                 # Stream the chat response
                 chunk_count = 0
                 logger.info(f"[{request_id}] Starting enhanced chat completion")
-                for chunk in chat_service.enhanced_chat_completion(
-                    message=request.message,
-                    top_k=15,
-                    tenant_name=tenant_name,
-                    user_id=user_id,
-                    metadata=metadata
-                ):
+                async for chunk in ticket.stream():
                     # Handle different chunk types
                     if isinstance(chunk, dict):
                         chunk_type = chunk.get("type")
@@ -139,6 +165,9 @@ async def stream_chat(request: ChatRequest):
                             progress_chunk = f"data: {json.dumps(chunk)}\n\n"
                             logger.info(f"[{request_id}] Sending progress chunk: {chunk.get('message', '')}")
                             yield progress_chunk
+                        elif chunk_type == "error":
+                            logger.info(f"[{request_id}] Sending error chunk: {chunk.get('content', '')}")
+                            yield f"data: {json.dumps(chunk)}\n\n"
                         elif chunk_type == "text":
                             # Send text chunk
                             chunk_count += 1
@@ -162,7 +191,7 @@ async def stream_chat(request: ChatRequest):
                    
             except Exception as e:
                 logger.error(f"[{request_id}] Error in generate function: {str(e)}", exc_info=True)
-                error_chunk = f"data: {json.dumps({'type': 'error', 'error': str(e), 'session_id': unique_session_id if 'unique_session_id' in locals() else None})}\n\n"
+                error_chunk = f"data: {json.dumps({'type': 'error', 'error': str(e), 'session_id': unique_session_id})}\n\n"
                 yield error_chunk
         
         # Use proper headers for streaming
@@ -176,8 +205,11 @@ async def stream_chat(request: ChatRequest):
         }
         
         logger.info(f"[{request_id}] Returning StreamingResponse")
-        return StreamingResponse(generate(), media_type="text/event-stream", headers=headers)
+        # Frees the ticket even when the client leaves before the body is streamed
+        return StreamingResponse(generate(), media_type="text/event-stream", headers=headers, background=BackgroundTask(ticket.release))
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[{request_id}] Error in stream_chat endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,32 @@
 from fastapi import APIRouter
+from service.searchCache import search_cache
+from service.weaviateConnection import weaviate_connection
+from service.sessionScheduler import session_scheduler
+from service.referenceDataCache import reference_data_cache
+from service.cypherPlanCache import cypher_plan_cache
 
 router = APIRouter()
 
 @router.get('/ping')
 def ping():
-    return {"message": "pong"}
\ No newline at end of file
+    return {"message": "pong"}
+
+@router.get('/searchCacheMetrics')
+def search_cache_metrics():
+    return search_cache.metrics()
+
+@router.get('/weaviateConnectionMetrics')
+def weaviate_connection_metrics():
+    return weaviate_connection.metrics()
+
+@router.get('/chatSchedulerMetrics')
+def chat_scheduler_metrics():
+    return session_scheduler.metrics()
+
+@router.get('/graphReferenceDataMetrics')
+def graph_reference_data_metrics():
+    return reference_data_cache.metrics()
+
+@router.get('/cypherPlanCacheMetrics')
+def cypher_plan_cache_metrics():
+    return cypher_plan_cache.metrics()
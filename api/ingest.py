@@ -3,19 +3,16 @@ from fastapi import APIRouter, File, HTTPException, UploadFile
 import logging
 from service.azureBlobService import AzureBlobService
 from service.weaviateService import WeaviateService
+from service.ingestionService import IngestionService, KnownHashCache
+from service.embeddingService import EmbeddingService
 from models.decision import DecisionModel
 from models.appeal import AppealModel
 from models.documentRecord import DocumentRecordModel
 from dotenv import load_dotenv
-import os
 from datetime import datetime, time
-import hashlib
 import traceback
-from service.splitter import SuperRecursiveSplitter
-from models.chatModels import IngestRequest
+from models.chatModels import IngestRequest, MigrateCollectionRequest
 from pathlib import Path
-import time as sleep
-import tiktoken
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -51,134 +48,40 @@ async def ingest(request: IngestRequest):
         caseRecordModel = DocumentRecordModel()
         weaviateService = WeaviateService()
         azureBlobService = AzureBlobService()
-        
-        processed_files = []
-        skipped_files = []
-        
-        orgId = 1
-        tenantId = 1
-        
-        page_start = request.page_start
-        page_end = request.page_end
-        page_size = request.page_size
+        embeddingService = EmbeddingService() if request.client_side_embeddings else None
 
-        logger.info(f"Starting ingestion process for {request.type} documents from page {page_start} to {page_end} (page size: {page_size})")
-        while True and page_start <= page_end:
-            logger.info(f"Processing page {page_start} of {request.type} documents")
-            
-            documents = sourceModel.get_paginated_decision_by_jurisdiction_code(page_start, page_size, request.jurisdiction_code) if request.type == 'decision' else sourceModel.get_paginated_appeal(page_start, page_size)    
-            
-            if not documents:
-                logger.info(f"No more documents to process")
-                break
-
-            for doc in documents:
-                logger.info(f"Processing document: {doc.id}")
-                if not doc.md_file_paths:
-                    continue
-
-                for pdf_path, md_path in doc.md_file_paths.items():
-                    
-                    logger.info(f"Processing document: {doc.id} with pdf_path: {pdf_path} and md_path: {md_path}")
-                    container_name = os.getenv("DECISION_CONTAINER_NAME") if request.type == 'decision' else os.getenv("APPEAL_CONTAINER_NAME")
-                    full_md_blob_path = f"{container_name}/{md_path}"
-                    full_pdf_blob_path = f"{container_name}/{pdf_path}"
-                    
-                    db_path_clean = md_path.lstrip("/\\")
-                    db_path_clean = db_path_clean.replace("\\", "/")  # unify separators
-                    db_path_clean = Path(db_path_clean)  # let Path handle OS format
-                    
-                    full_path = Path(os.getenv("LOCAL_PATH"))/container_name/db_path_clean
-                    try:
-                        logger.info(f"Fetching file content for md_path: {md_path}")
-
-                        file_content = azureBlobService.fetch_files_locally(full_path)
-                        
-                        if file_content is None:
-                            logger.error(f"File content not found for md_path: {md_path}")
-                            skipped_files.append({"filename": md_path, "reason": "File not found in Azure Blob Storage"})
-                            continue
-                        
-                        logger.info(f"File content fetched for md_path: {md_path}")
-                        full_text = file_content
-                        
-                        md5Hash = hashlib.md5(full_text.encode('UTF-8')).hexdigest()
-                        
-                        document_record = {
-                            "parentDocumentId": doc.id,
-                            "documentHash": md5Hash,
-                            "filename": md_path,
-                            "blobUrl": f"{full_md_blob_path}",
-                            "clientId": tenantId,
-                            "orgId": orgId,
-                            "type": request.type,
-                            "uploadedById": tenantId,
-                            "uploadedByName": "Meganexus"
-                        }   
-
-                        # Check if document already exists
-                        documentExists = caseRecordModel.check_document_exists(md5Hash, tenantId, orgId)
-                        weaviateDocumentExists = weaviateService.check_document_exists(md5Hash, str(tenantId), orgId)
-
-                        if documentExists and not weaviateDocumentExists:
-                            logger.info(f"Document already exists in caseRecordModel but not in weaviate: {md_path}")
-                            
-                            encoding = tiktoken.get_encoding("cl100k_base")
-                            token_count = len(encoding.encode(full_text))
-
-                            if token_count > 8000:
-                                chunks = weaviateService.chunk_and_embed_document(full_text, request.type, doc, full_pdf_blob_path, md5Hash, orgId)
-                            else:
-                                chunks = weaviateService.create_document_chunk(full_text, request.type, doc, full_pdf_blob_path, md5Hash, orgId)
-                            
-                            weaviateService.upload_documents(chunks, str(tenantId))
-                            processed_files.append({"filename": md_path, "reason": "Successfully ingested"})
-                        elif not documentExists and weaviateDocumentExists:
-                            logger.info(f"Document already exists in weaviate but not in caseRecordModel: {md_path}")
-                            # Create a record in CaseDocumentRecordManager
-                            caseRecordModel.create_document_record(**document_record)
-                            skipped_files.append({"filename": md_path, "reason": "Already ingested"})
-                            continue
-                        elif not documentExists and not weaviateDocumentExists:
-                            logger.info(f"Document does not exist in caseRecordModel or weaviate: {md_path}")
-                            
-                            encoding = tiktoken.get_encoding("cl100k_base")
-                            token_count = len(encoding.encode(full_text))
+        ingestionService = IngestionService(
+            doc_type=request.type,
+            source_model=sourceModel,
+            record_model=caseRecordModel,
+            weaviate_service=weaviateService,
+            blob_service=azureBlobService,
+            io_workers=request.io_workers,
+            cpu_workers=request.cpu_workers,
+            write_batch_size=request.write_batch_size,
+            use_hash_cache=request.use_hash_cache,
+            embedding_service=embeddingService,
+            prune_stale=request.prune_stale_chunks,
+        )
 
-                            if token_count > 8000:
-                                chunks = weaviateService.chunk_and_embed_document(full_text, request.type, doc, full_pdf_blob_path, md5Hash, orgId)
-                            else:
-                                chunks = weaviateService.create_document_chunk(full_text, request.type, doc, full_pdf_blob_path, md5Hash, orgId)
-                            
-                            weaviateService.upload_documents(chunks, str(tenantId))
-                            
-                            caseRecordModel.create_document_record(**document_record)
-                            processed_files.append({"filename": md_path, "reason": "Successfully ingested"})
-                        else:
-                            logger.info(f"Document already exists in caseRecordModel and weaviate: {md_path}")
-                            skipped_files.append({"filename": md_path, "reason": "Already ingested"})
-                            continue
-                        
-                        logger.info(f"Uploaded document: {md_path} to weaviate and id: {doc.id}")
-                        
-                        # sleep.sleep(request.sleep_seconds)
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing file {md_path}: {e}")
-                        skipped_files.append({"filename": md_path, "reason": str(e)})
-
-            page_start += 1
-
-        sourceModel.close()
-        caseRecordModel.close()
-        weaviateService.close()
+        try:
+            summary = ingestionService.run(
+                page_start=request.page_start,
+                page_end=request.page_end,
+                page_size=request.page_size,
+                jurisdiction_code=request.jurisdiction_code,
+                resume=request.resume,
+            )
+        finally:
+            sourceModel.close()
+            caseRecordModel.close()
+            weaviateService.close()
+            if embeddingService is not None:
+                embeddingService.close()
             
         return {
             "message": "File ingestion completed",
-            "summary": {
-                "processed": len(processed_files), 
-                "skipped": len(skipped_files)
-            }
+            "summary": summary
         }
     except Exception as e:
         logger.error(f"Error during file ingestion: {str(e)}")
@@ -189,4 +92,19 @@ async def ingest(request: IngestRequest):
 async def deleteCollection():
     weaviateService = WeaviateService()
     weaviateService.delete_collection()
+    # Known hashes describe what is stored in the collection, so they go with it
+    KnownHashCache.clear()
     return {"message": "Collection deleted"}
+
+@router.post('/migrateCollection')
+def migrateCollection(request: MigrateCollectionRequest):
+    """Copy the collection into a new one with the current schema, e.g. to add filter indexes or change the vector index profile."""
+    weaviateService = WeaviateService()
+    try:
+        summary = weaviateService.migrate_collection(request.target_collection, batch_size=request.batch_size, index_profile=request.index_profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error migrating collection: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"message": "Collection migrated", "summary": summary}
@@ -11,6 +11,8 @@ import json
 from dotenv import load_dotenv
 import datetime
 from azure.data.tables import TableServiceClient
+from pydantic import ValidationError
+from models.searchFilters import SearchFilters
 from service.rag import run_rag
 from service.lawyer_rag import run_lawyer_rag
 from service.damage_breakdown import build_damage_context, run_damage_breakdown
@@ -40,6 +42,14 @@ async def start_analysis(
         case_id = form_data.get('case_id')
         if not case_id:
             return Response(content="Case ID is required", status_code=400)
+
+        # Optional JSON-encoded SearchFilters restricting which cases are retrieved
+        filters = None
+        if form_data.get('filters'):
+            try:
+                filters = SearchFilters.model_validate_json(form_data.get('filters'))
+            except ValidationError as e:
+                return Response(content=f"Invalid filters: {e}", status_code=400)
         
         # Get all files from the request
         defendant_files = defendantDocs
@@ -116,14 +126,16 @@ async def start_analysis(
                     plaintiff_text.strip(),
                     defendant_text.strip(),
                     case_id,
-                    case_status_table
+                    case_status_table,
+                    filters=filters
                 )
             else:    
                 # Run analysis and wait for result
                 result = run_rag(
                     defendant_text.strip(),
                     case_id,
-                    case_status_table
+                    case_status_table,
+                    filters=filters
                 )
             
             # Add case ID and timestamp to result
@@ -3,7 +3,9 @@ from fastapi import APIRouter, Request, Response
 import json
 
 from dotenv import load_dotenv
-from service.rag_utils import find_relevant_chunks
+from pydantic import ValidationError
+from service.rag_utils import find_relevant_chunks_async
+from models.searchFilters import SearchFilters
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,7 +16,7 @@ load_dotenv()
 
 
 @router.get('/search_articles')
-def search_articles(req: Request) -> Response:
+async def search_articles(req: Request) -> Response:
     """Search for relevant articles based on a query string"""
     try:
         query = req.query_params.get('query', '')
@@ -25,14 +27,30 @@ def search_articles(req: Request) -> Response:
                 status_code=400
             )
             
+        # Snippet mode returns a highlighted passage; full text comes from /caseChunk/{chunk_id}
+        snippet = req.query_params.get('snippet', 'false').lower() == 'true'
+
+        # Optional structured filters, e.g. ?jurisdiction_code=UKEAT&type=appeal&decision_date_from=2020-01-01
+        try:
+            filters = SearchFilters(
+                jurisdiction_codes=req.query_params.getlist('jurisdiction_code') or None,
+                types=req.query_params.getlist('type') or None,
+                categories=req.query_params.getlist('category') or None,
+                decision_date_from=req.query_params.get('decision_date_from'),
+                decision_date_to=req.query_params.get('decision_date_to'),
+            )
+        except ValidationError as e:
+            return Response(str(e), status_code=400)
+
         # Use RAG utils to find relevant chunks
-        matches = find_relevant_chunks(query, n_results=20)
+        matches = await find_relevant_chunks_async(query, n_results=20, snippet=snippet, filters=filters)
         
         # Format the response
         articles = [{
             'id': 1,
+            'chunk_id': match.get('id'),
             'score': 0,
-            'article_text': match.get('rawText', ''),
+            'article_text': match.get('snippet' if snippet else 'rawText', ''),
             'legislation_title': match.get('caseName', ''),
             'article_number': match.get('jurisdictionCode', '')
         } for match in matches]
@@ -0,0 +1,233 @@
+"""
+Compare vector index profiles on recall@k, query latency and memory.
+
+Each profile from `service.indexProfiles` gets its own scratch collection in a local
+Weaviate, shaped like the production one: one tenant and a named vector "default". The
+collection is filled with the same vectors and queried with the same query vectors.
+Recall is measured against exact top-k neighbours computed with numpy.
+
+Start a local Weaviate with metrics and async indexing on. The dynamic profile needs
+async indexing.
+
+    docker run -d --name weaviate-bench -p 8080:8080 -p 50051:50051 -p 2112:2112 \\
+        -e PROMETHEUS_MONITORING_ENABLED=true -e ASYNC_INDEXING=true \\
+        -e AUTHENTICATION_ANONYMOUS_ACCESS_ENABLED=true -e DEFAULT_VECTORIZER_MODULE=none \\
+        -e PERSISTENCE_DATA_PATH=/var/lib/weaviate -e CLUSTER_HOSTNAME=node1 \\
+        cr.weaviate.io/semitechnologies/weaviate:1.30.0
+
+Synthetic corpus: clustered unit vectors with the embedding dimension.
+
+    python benchmarks/bench_index_profiles.py --objects 50000
+    python benchmarks/bench_index_profiles.py --profiles hnsw-bq hnsw-pq --ef 128 --max-connections 16
+
+Sampled corpus: store vectors from the configured collection once, then benchmark on them.
+Queries are held out of the sample.
+
+    python benchmarks/bench_index_profiles.py --dump-sample sample.npy --sample-size 50000
+    python benchmarks/bench_index_profiles.py --vectors sample.npy
+
+Memory is the growth in Weaviate's Go heap while a profile's collection is built and
+indexed, read from the Prometheus endpoint. It is approximate, because the heap also
+holds garbage that has not been collected yet. Run one Weaviate per benchmark for
+comparable numbers.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import requests
+import weaviate
+from dotenv import load_dotenv
+from weaviate.classes import config as Config
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from service.indexProfiles import INDEX_PROFILES, vector_index_config  # noqa: E402
+
+HEAP_METRIC = re.compile(r"^go_memstats_heap_inuse_bytes\s+([0-9.e+]+)$", re.MULTILINE)
+TENANT = "bench"
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Unit vectors around random centroids; real embeddings cluster by topic in the same way."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centroids[rng.integers(0, clusters, size=count)] + rng.normal(scale=0.6, size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def dump_sample(output_path: str, sample_size: int) -> None:
+    from service.config import Config as ServiceConfig
+
+    load_dotenv()
+
+    client = ServiceConfig.buildWeaviateConnection()
+    try:
+        collection = client.collections.get(os.getenv("WEAVIATE_COLLECTION_NAME")).with_tenant("1")
+        vectors = []
+        for obj in collection.iterator(include_vector=True, return_properties=[]):
+            vectors.append(obj.vector["default"])
+            if len(vectors) >= sample_size:
+                break
+    finally:
+        client.close()
+    np.save(output_path, np.asarray(vectors, dtype=np.float32))
+    print(f"Stored {len(vectors)} vectors in {output_path}")
+
+
+def exact_neighbours(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the k nearest corpus vectors by cosine distance, per query."""
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    neighbours = []
+    for start in range(0, len(queries), 256):
+        similarity = queries[start:start + 256] @ corpus.T
+        top = np.argpartition(-similarity, k, axis=1)[:, :k]
+        order = np.take_along_axis(similarity, top, axis=1).argsort(axis=1)[:, ::-1]
+        neighbours.append(np.take_along_axis(top, order, axis=1))
+    return np.vstack(neighbours)
+
+
+def heap_bytes(metrics_url: str):
+    try:
+        match = HEAP_METRIC.search(requests.get(metrics_url, timeout=5).text)
+    except requests.RequestException:
+        return None
+    return float(match.group(1)) if match else None
+
+
+def wait_for_index(client, collection_name: str, expect_compressed: bool, timeout: float) -> bool:
+    """Wait until the async indexing queue is drained and, for PQ, the shard is compressed."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        shards = [shard for node in client.cluster.nodes(collection_name, output="verbose") for shard in node.shards or []]
+        if shards and all(
+            shard.vector_queue_length == 0 and shard.vector_indexing_status == "READY" and (shard.compressed or not expect_compressed)
+            for shard in shards
+        ):
+            return True
+        time.sleep(1)
+    return False
+
+
+def bench_profile(client, profile: str, corpus: np.ndarray, queries: np.ndarray, truth: np.ndarray, args) -> dict:
+    collection_name = f"BenchIndex_{profile.replace('-', '_')}"
+    if client.collections.exists(collection_name):
+        client.collections.delete(collection_name)
+    heap_before = heap_bytes(args.metrics_url)
+
+    index_config = vector_index_config(
+        profile,
+        ef=args.ef,
+        ef_construction=args.ef_construction,
+        max_connections=args.max_connections,
+        pq_training_limit=min(args.pq_training_limit, len(corpus)),
+        dynamic_threshold=args.dynamic_threshold,
+    )
+    collection = client.collections.create(
+        name=collection_name,
+        vectorizer_config=[Config.Configure.NamedVectors.none(name="default", vector_index_config=index_config)],
+        multi_tenancy_config=Config.Configure.multi_tenancy(enabled=True),
+        properties=[Config.Property(name="position", data_type=Config.DataType.INT)],
+    )
+    collection.tenants.create([weaviate.classes.tenants.Tenant(name=TENANT)])
+    tenant = collection.with_tenant(TENANT)
+
+    started = time.perf_counter()
+    with tenant.batch.fixed_size(batch_size=args.batch_size) as batch:
+        for position, vector in enumerate(corpus):
+            batch.add_object(properties={"position": position}, uuid=uuid.UUID(int=position + 1), vector={"default": vector.tolist()})
+    if tenant.batch.failed_objects:
+        print(f"  {profile}: {len(tenant.batch.failed_objects)} objects failed to import")
+    indexed = wait_for_index(client, collection_name, INDEX_PROFILES[profile][1] == "pq", args.index_timeout)
+    import_seconds = time.perf_counter() - started
+    if not indexed:
+        print(f"  {profile}: indexing did not finish within {args.index_timeout}s; results may be off")
+    heap_after = heap_bytes(args.metrics_url)
+
+    for query in queries[:args.warmup]:
+        tenant.query.near_vector(near_vector=query.tolist(), target_vector="default", limit=args.k, return_properties=[])
+
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        response = tenant.query.near_vector(near_vector=query.tolist(), target_vector="default", limit=args.k, return_properties=[])
+        latencies.append((time.perf_counter() - started) * 1000)
+        found = {obj.uuid.int - 1 for obj in response.objects}
+        recalls.append(len(found & set(expected.tolist())) / args.k)
+
+    if not args.keep:
+        client.collections.delete(collection_name)
+
+    latencies.sort()
+    return {
+        "recall": float(np.mean(recalls)),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "import_s": import_seconds,
+        "heap_mb": (heap_after - heap_before) / 2**20 if heap_before is not None and heap_after is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--grpc-port", type=int, default=50051)
+    parser.add_argument("--metrics-url", help="Prometheus endpoint; defaults to http://<host>:2112/metrics")
+    parser.add_argument("--profiles", nargs="*", default=list(INDEX_PROFILES), choices=list(INDEX_PROFILES))
+    parser.add_argument("--vectors", help="Sampled corpus (.npy) to load instead of synthetic vectors")
+    parser.add_argument("--dump-sample", help="Write vectors from the configured collection to this .npy file and exit")
+    parser.add_argument("--sample-size", type=int, default=50000)
+    parser.add_argument("--objects", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=1536, help="Synthetic vector dimension")
+    parser.add_argument("--clusters", type=int, default=100, help="Synthetic topic clusters")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef", type=int)
+    parser.add_argument("--ef-construction", type=int)
+    parser.add_argument("--max-connections", type=int)
+    parser.add_argument("--pq-training-limit", type=int, default=100000)
+    parser.add_argument("--dynamic-threshold", type=int)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--index-timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    args = parser.parse_args()
+    args.metrics_url = args.metrics_url or f"http://{args.host}:2112/metrics"
+
+    if args.dump_sample:
+        dump_sample(args.dump_sample, args.sample_size)
+        return
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+        rng = np.random.default_rng(args.seed)
+        held_out = rng.choice(len(vectors), size=args.queries, replace=False)
+        mask = np.ones(len(vectors), dtype=bool)
+        mask[held_out] = False
+        corpus, queries = vectors[mask], vectors[held_out]
+    else:
+        vectors = synthetic_vectors(args.objects + args.queries, args.dim, args.clusters, args.seed)
+        corpus, queries = vectors[:args.objects], vectors[args.objects:]
+    truth = exact_neighbours(corpus, queries, args.k)
+    print(f"{len(corpus)} vectors of dimension {corpus.shape[1]}, {len(queries)} queries")
+
+    client = weaviate.connect_to_local(host=args.host, port=args.port, grpc_port=args.grpc_port)
+    try:
+        print(f"{'profile':<10}{f'recall@{args.k}':>11}{'p50 ms':>9}{'p99 ms':>9}{'import s':>10}{'heap MB':>9}")
+        for profile in args.profiles:
+            result = bench_profile(client, profile, corpus, queries, truth, args)
+            heap = f"{result['heap_mb']:>9.0f}" if result["heap_mb"] is not None else f"{'n/a':>9}"
+            print(f"{profile:<10}{result['recall']:>11.3f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['import_s']:>10.1f}{heap}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare skip/limit pagination with keyset pagination on `_id`.
+
+Seeds a scratch collection with synthetic decisions, then times single pages
+at increasing depths with both strategies. Skip/limit latency grows with the
+page number; keyset latency should stay flat.
+
+Usage:
+    python benchmarks/bench_keyset_pagination.py --docs 120000 --page-size 100
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, ASCENDING
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from models.decision import INGEST_PROJECTION  # noqa: E402
+from models.pagination import encode_continuation_token, decode_continuation_token  # noqa: E402
+
+load_dotenv()
+
+
+def seed(collection, total: int, jurisdiction_code: str) -> None:
+    if collection.count_documents({}) >= total:
+        print(f"Reusing {collection.name} ({total} documents)")
+        return
+    collection.drop()
+    batch = []
+    for i in range(total):
+        batch.append({
+            "Case_name": f"Claimant {i} v Respondent {i}",
+            "From": ["Employment Tribunal"],
+            "country": "England and Wales",
+            "jurisdiction_code": jurisdiction_code,
+            "md_file_paths": {f"{i}.pdf": f"{i}.md"},
+            "body": "x" * 512,
+        })
+        if len(batch) == 5000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+    collection.create_index([("jurisdiction_code", ASCENDING), ("_id", ASCENDING)])
+    print(f"Seeded {collection.name} with {total} documents")
+
+
+def time_skip_page(collection, page: int, page_size: int, jurisdiction_code: str) -> float:
+    started = time.perf_counter()
+    list(collection.find({"jurisdiction_code": jurisdiction_code}).skip((page - 1) * page_size).limit(page_size))
+    return (time.perf_counter() - started) * 1000
+
+
+def keyset_tokens(collection, pages, page_size: int, jurisdiction_code: str) -> dict:
+    """Walk the collection once to collect the continuation token in front of each sampled page."""
+    wanted = set(p for p in pages if p > 1)
+    tokens = {1: None}
+    cursor = collection.find({"jurisdiction_code": jurisdiction_code}, {"_id": 1}).sort("_id", ASCENDING)
+    for position, doc in enumerate(cursor, start=1):
+        next_page = position // page_size + 1
+        if position % page_size == 0 and next_page in wanted:
+            tokens[next_page] = encode_continuation_token(doc["_id"])
+    return tokens
+
+
+def time_keyset_page(collection, token, page_size: int, jurisdiction_code: str) -> float:
+    query = {"jurisdiction_code": jurisdiction_code}
+    after_id = decode_continuation_token(token)
+    if after_id is not None:
+        query["_id"] = {"$gt": after_id}
+    started = time.perf_counter()
+    list(collection.find(query, INGEST_PROJECTION).sort("_id", ASCENDING).limit(page_size))
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=os.getenv("MONGODB_HOST", "mongodb://localhost:27017/bench"))
+    parser.add_argument("--collection", default="bench-keyset-pagination")
+    parser.add_argument("--docs", type=int, default=120000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--drop", action="store_true", help="Drop the scratch collection when done")
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri)
+    collection = client.get_default_database(default="bench")[args.collection]
+    jurisdiction_code = "BENCH"
+    seed(collection, args.docs, jurisdiction_code)
+
+    last_page = args.docs // args.page_size
+    pages = sorted({1, 10, 100, last_page // 4, last_page // 2, last_page} - {0})
+    tokens = keyset_tokens(collection, pages, args.page_size, jurisdiction_code)
+
+    print(f"{'page':>8} {'skip ms':>10} {'keyset ms':>10}")
+    for page in pages:
+        skip_ms = min(time_skip_page(collection, page, args.page_size, jurisdiction_code) for _ in range(args.repeats))
+        keyset_ms = min(time_keyset_page(collection, tokens[page], args.page_size, jurisdiction_code) for _ in range(args.repeats))
+        print(f"{page:>8} {skip_ms:>10.2f} {keyset_ms:>10.2f}")
+
+    if args.drop:
+        collection.drop()
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark the offset-based SuperRecursiveSplitter against the placeholder implementation.
+
+Runs both engines with the ingestion settings over 1-10 MB judgments and checks
+that they produce the same chunks. The placeholder engine inserts a space at
+every join of its final merge, so chunks are compared with those join spaces
+allowed for. Real judgments can be passed with --files; otherwise synthetic
+text shaped like a tribunal judgment is generated.
+
+Usage:
+    python benchmarks/bench_splitter.py
+    python benchmarks/bench_splitter.py --files judgments/*.md
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from service.splitter import SuperRecursiveSplitter  # noqa: E402
+
+SEPARATORS = ["\n\n", "\n", ".", ",", " "]
+TARGET_CHUNK_SIZE = 20000
+
+WORDS = (
+    "the claimant respondent tribunal employment judge dismissal unfair reasonable "
+    "employer employee section act evidence hearing witness contract notice pay "
+    "grievance procedure disability discrimination adjustment appeal finding"
+).split()
+
+
+def synthetic_judgment(size_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    paragraphs = []
+    total = 0
+    number = 1
+    while total < size_bytes:
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 30))]
+            for i in rng.sample(range(len(words)), k=min(2, len(words) - 1)):
+                words[i] += ","
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraph = f"{number}. " + " ".join(sentences)
+        if rng.random() < 0.2:
+            paragraph += "\n" + "\n".join(f"({chr(97 + i)}) {rng.choice(WORDS)} {rng.choice(WORDS)};" for i in range(rng.randint(2, 5)))
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+        number += 1
+    return "\n\n".join(paragraphs)
+
+
+def same_chunks(span_chunks, placeholder_chunks) -> bool:
+    """Placeholder chunks may only differ by the spaces inserted at merge joins."""
+    if len(span_chunks) != len(placeholder_chunks):
+        return False
+    for new, old in zip(span_chunks, placeholder_chunks):
+        if new.replace(" ", "") != old.replace(" ", ""):
+            return False
+        remaining = iter(old)
+        if not all(char in remaining for char in new):
+            return False
+    return True
+
+
+def timed(func, text: str, repeats: int):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", nargs="*", help="Markdown judgments to split instead of synthetic text")
+    parser.add_argument("--sizes-mb", nargs="*", type=float, default=[1, 2, 5, 10])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.files:
+        corpus = [(Path(path).name, Path(path).read_text(encoding="utf-8")) for path in args.files]
+    else:
+        corpus = [(f"synthetic {size:g} MB", synthetic_judgment(int(size * 1024 * 1024))) for size in args.sizes_mb]
+
+    splitter = SuperRecursiveSplitter(separators=SEPARATORS, target_chunk_size=TARGET_CHUNK_SIZE)
+    print(f"{'document':<24} {'chunks':>7} {'placeholder ms':>15} {'spans ms':>10} {'speedup':>8} {'match':>6}")
+    failures = 0
+    for name, text in corpus:
+        placeholder_ms, placeholder_chunks = timed(splitter._split_into_chunks_placeholder, text, args.repeats)
+        span_ms, span_chunks = timed(splitter.split_into_chunks, text, args.repeats)
+        match = same_chunks(span_chunks, placeholder_chunks) and "".join(span_chunks) == text
+        failures += not match
+        print(f"{name[:24]:<24} {len(span_chunks):>7} {placeholder_ms:>15.1f} {span_ms:>10.1f} {placeholder_ms / span_ms:>7.1f}x {str(match):>6}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
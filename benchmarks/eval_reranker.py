@@ -0,0 +1,115 @@
+"""
+Offline evaluation of the rerankers on a stored query set.
+
+A query set is a JSONL file with one query per line:
+
+    {"query": "unfair dismissal after a grievance", "relevant": ["<chunk id or case name>", ...]}
+
+Candidates are the hybrid search hits for each query. Fetch them once from Weaviate
+and store them, so later runs need no connection and every reranker sees the same
+input:
+
+    python benchmarks/eval_reranker.py --queries queries.jsonl --dump-candidates candidates.jsonl
+
+Then compare the hybrid order with each reranker on recall@k, MRR and rerank latency:
+
+    python benchmarks/eval_reranker.py --candidates candidates.jsonl
+    python benchmarks/eval_reranker.py --candidates candidates.jsonl --rerankers lexical cross-encoder --k 2 5
+
+A hit counts as relevant when its id or its case name is listed in `relevant`.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from service.reranker import chunk_text, get_reranker  # noqa: E402
+
+
+def read_jsonl(path: str):
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def dump_candidates(queries_path: str, output_path: str, candidates_k: int) -> None:
+    from service.rag_utils import find_relevant_chunks
+
+    queries = read_jsonl(queries_path)
+    with open(output_path, "w", encoding="utf-8") as handle:
+        for entry in queries:
+            started = time.perf_counter()
+            hits = find_relevant_chunks(entry["query"], n_results=candidates_k, reranker="none")
+            entry = dict(entry, candidates=hits, search_ms=(time.perf_counter() - started) * 1000)
+            handle.write(json.dumps(entry) + "\n")
+    print(f"Stored candidates for {len(queries)} queries in {output_path}")
+
+
+def is_relevant(hit: dict, relevant: set) -> bool:
+    return hit.get("id") in relevant or hit.get("caseName") in relevant
+
+
+def evaluate(entries, reranker_name: str, ks):
+    reranker = get_reranker(reranker_name)
+    recalls = {k: [] for k in ks}
+    reciprocal_ranks, latencies = [], []
+    for entry in entries:
+        relevant = set(entry["relevant"])
+        candidates = entry["candidates"]
+        started = time.perf_counter()
+        ranked = reranker.rerank(entry["query"], candidates, len(candidates), text=chunk_text) if reranker else candidates
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        flags = [is_relevant(hit, relevant) for hit in ranked]
+        found = sum(1 for hit in candidates if is_relevant(hit, relevant))
+        for k in ks:
+            # Recall against what retrieval could reach, so rerankers are compared on ordering alone
+            recalls[k].append(sum(flags[:k]) / found if found else 0.0)
+        reciprocal_ranks.append(next((1 / (rank + 1) for rank, flag in enumerate(flags) if flag), 0.0))
+
+    latencies.sort()
+    return {
+        "recall": {k: statistics.mean(values) for k, values in recalls.items()},
+        "mrr": statistics.mean(reciprocal_ranks),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", help="Query set (JSONL) to fetch candidates for")
+    parser.add_argument("--dump-candidates", help="Write hybrid candidates for --queries to this JSONL file and exit")
+    parser.add_argument("--candidates", help="Stored candidates (JSONL) to evaluate")
+    parser.add_argument("--candidates-k", type=int, default=20, help="Candidates fetched per query")
+    parser.add_argument("--rerankers", nargs="*", default=["none", "lexical", "cross-encoder"])
+    parser.add_argument("--k", nargs="*", type=int, default=[1, 2, 5])
+    args = parser.parse_args()
+
+    if args.dump_candidates:
+        if not args.queries:
+            parser.error("--dump-candidates needs --queries")
+        dump_candidates(args.queries, args.dump_candidates, args.candidates_k)
+        return
+    if not args.candidates:
+        parser.error("pass --candidates, or --queries with --dump-candidates")
+
+    entries = read_jsonl(args.candidates)
+    entries = [entry for entry in entries if entry.get("candidates")]
+    reachable = sum(1 for entry in entries if any(is_relevant(hit, set(entry["relevant"])) for hit in entry["candidates"]))
+    print(f"{len(entries)} queries, {reachable} with a relevant hit among their candidates")
+
+    header = f"{'reranker':<14}" + "".join(f"{f'recall@{k}':>11}" for k in args.k) + f"{'MRR':>8}{'p50 ms':>9}{'p95 ms':>9}"
+    print(header)
+    for name in args.rerankers:
+        result = evaluate(entries, name, args.k)
+        reranker = get_reranker(name)
+        label = reranker.name if reranker else "hybrid"
+        row = f"{label:<14}" + "".join(f"{result['recall'][k]:>11.3f}" for k in args.k)
+        print(row + f"{result['mrr']:>8.3f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
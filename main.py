@@ -2,11 +2,12 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from api.auth import router as auth_router
 from api.caseEvidence import router as case_evidence_router
 from api.caseHistory import router as case_history_router
-from api.chat import router as chat_router
+from api.chat import router as chat_router, cleanup_services as cleanup_chat_services, init_services as init_chat_services
 from api.createCaseMember import router as create_case_member_router
 from api.export  import router as export_router
 from api.healthCheck import router as healthCheck_router
@@ -15,10 +16,25 @@ from api.memorandum import router as memorandum_router
 from api.retrieve import router as retrieve_router
 from api.searchCases import router as search_case_router
 from api.cases import router as cases_router
+from service.asyncWeaviateService import async_weaviate_service
+from service.weaviateConnection import weaviate_connection
 
 load_dotenv()
 
-app = FastAPI(title="RAG API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One async Weaviate connection shared by all non-blocking search endpoints
+    await async_weaviate_service.connect()
+    # Chat service and graph reference data are ready before the first request
+    await init_chat_services()
+    yield
+    await cleanup_chat_services()
+    await async_weaviate_service.close()
+    weaviate_connection.close()
+
+
+app = FastAPI(title="RAG API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
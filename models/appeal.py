@@ -1,10 +1,11 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime, date
-from typing import Optional, List, Dict
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from typing import Optional, List, Dict, Iterator, Tuple
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, CursorNotFound
 import os
 from dotenv import load_dotenv
+from models.pagination import encode_continuation_token, decode_continuation_token
 
 load_dotenv()
 
@@ -27,6 +28,22 @@ class Appeal(BaseModel):
         populate_by_name=True
     )
 
+# Every field the `Appeal` model knows about
+MODEL_PROJECTION = {(field.alias or name): 1 for name, field in Appeal.model_fields.items() if name != "id"}
+
+# Fields read by ingestion; everything else stays on the server
+INGEST_PROJECTION = {
+    "Case_name": 1,
+    "Case_details": 1,
+    "From": 1,
+    "Published_date": 1,
+    "Category": 1,
+    "SubCategory": 1,
+    "Landmark": 1,
+    "Decision_date": 1,
+    "md_file_paths": 1,
+}
+
 class AppealModel:
     def __init__(self):
         self.client = None
@@ -139,6 +156,130 @@ class AppealModel:
             print(f"Error retrieving paginated appeals: {str(e)}")
             return None
     
+    def get_appeals_after(self, continuation_token: Optional[str], page_size: int) -> Tuple[List[Appeal], Optional[str]]:
+        """
+        Get one page of appeals using keyset pagination on `_id`.
+        
+        Args:
+            continuation_token: Token returned with the previous page, or None for the first page
+            page_size: The number of appeals per page
+            
+        Returns:
+            Tuple of (list of Appeal objects, token for the next page or None when exhausted)
+        """
+        if not self._ensure_connection():
+            return [], None
+
+        after_id = decode_continuation_token(continuation_token)
+        query = {"_id": {"$gt": after_id}} if after_id is not None else {}
+        try:
+            appeals_data = list(
+                self.collection.find(query, INGEST_PROJECTION)
+                .sort("_id", ASCENDING)
+                .limit(page_size)
+            )
+        except Exception as e:
+            print(f"Error retrieving appeals after cursor: {str(e)}")
+            return [], None
+
+        if not appeals_data:
+            return [], None
+        next_token = encode_continuation_token(appeals_data[-1]["_id"]) if len(appeals_data) == page_size else None
+        return self._to_appeals(appeals_data), next_token
+
+    def stream_appeal_pages(
+        self,
+        page_size: int,
+        continuation_token: Optional[str] = None,
+        skip_pages: int = 0,
+    ) -> Iterator[Tuple[List[Appeal], str]]:
+        """
+        Stream pages of appeals from a single long-lived cursor sorted by `_id`.
+        
+        Each yielded page comes with the continuation token that resumes right after it.
+        `skip_pages` is only applied once, when starting without a token. If the server
+        drops the cursor between pages it is reopened from the last yielded `_id`.
+        
+        Yields:
+            Tuple of (list of Appeal objects, continuation token after this page)
+        """
+        if not self._ensure_connection():
+            return
+
+        after_id = decode_continuation_token(continuation_token)
+        skip = skip_pages * page_size if after_id is None else 0
+
+        while True:
+            query = {"_id": {"$gt": after_id}} if after_id is not None else {}
+            cursor = (
+                self.collection.find(query, INGEST_PROJECTION)
+                .sort("_id", ASCENDING)
+                .batch_size(page_size)
+            )
+            if skip and after_id is None:
+                cursor = cursor.skip(skip)
+            try:
+                page = []
+                for appeal in cursor:
+                    page.append(appeal)
+                    if len(page) == page_size:
+                        after_id = page[-1]["_id"]
+                        yield self._to_appeals(page), encode_continuation_token(after_id)
+                        page = []
+                if page:
+                    after_id = page[-1]["_id"]
+                    yield self._to_appeals(page), encode_continuation_token(after_id)
+                return
+            except CursorNotFound:
+                print(f"Appeal cursor expired, reopening after {after_id}")
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def _to_appeals(documents: List[dict]) -> List[Appeal]:
+        for appeal in documents:
+            appeal["_id"] = str(appeal["_id"])
+        return [Appeal(**appeal) for appeal in documents]
+    
+    def iter_appeals(
+        self,
+        batch_size: int = 500,
+        projection: Optional[Dict[str, int]] = None,
+    ) -> Iterator[List[Appeal]]:
+        """
+        Stream every appeal in `_id` order, in batches of `batch_size`.
+        
+        Objects are built with `model_construct`, skipping validation, so a full-corpus
+        pass runs in constant memory regardless of collection size.
+        
+        Args:
+            batch_size: Number of objects per yielded batch, also used as the cursor batch size
+            projection: Server-side projection; defaults to the fields of the `Appeal` model
+            
+        Yields:
+            Lists of Appeal objects
+        """
+        if not self._ensure_connection():
+            return
+
+        cursor = (
+            self.collection.find({}, projection or MODEL_PROJECTION)
+            .sort("_id", ASCENDING)
+            .batch_size(batch_size)
+        )
+        try:
+            batch = []
+            for document in cursor:
+                document["_id"] = str(document["_id"])
+                batch.append(Appeal.model_construct(**document))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            cursor.close()
+    
     def close(self):
         """Close the MongoDB connection."""
         if self.client:
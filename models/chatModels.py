@@ -30,4 +30,16 @@ class IngestRequest(BaseModel):
     page_end: int = Field(..., description="Page number of the document to ingest")
     page_size: int = Field(..., description="Page size of the document to ingest")
     sleep_seconds: int = Field(..., description="Sleep seconds between pages")
-    jurisdiction_code: Optional[str] = Field(default=None, description="Jurisdiction code of the document to ingest")
\ No newline at end of file
+    jurisdiction_code: Optional[str] = Field(default=None, description="Jurisdiction code of the document to ingest")
+    io_workers: int = Field(default=8, ge=1, description="Worker threads for file reads and existence checks")
+    cpu_workers: int = Field(default=4, ge=1, description="Worker threads for hashing, token counting and splitting")
+    write_batch_size: int = Field(default=200, ge=1, description="Number of chunks per Weaviate upload batch")
+    resume: bool = Field(default=True, description="Resume from the last checkpointed page of an interrupted run")
+    use_hash_cache: bool = Field(default=True, description="Skip documents whose hash is in the local known-hash cache without querying Mongo or Weaviate")
+    client_side_embeddings: bool = Field(default=False, description="Embed chunks in batches before upload, reusing vectors from the on-disk embedding cache")
+    prune_stale_chunks: bool = Field(default=False, description="Delete chunks of re-ingested documents left over from an earlier, longer chunking")
+
+class MigrateCollectionRequest(BaseModel):
+    target_collection: str = Field(..., min_length=1, description="New collection to copy objects into, created with the current schema")
+    batch_size: int = Field(default=200, ge=1, le=1000, description="Objects per insert batch")
+    index_profile: Optional[str] = Field(default=None, description="Vector index profile for the new collection, e.g. 'hnsw-bq', 'hnsw-pq' or 'dynamic'; defaults to WEAVIATE_INDEX_PROFILE")
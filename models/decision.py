@@ -1,10 +1,11 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime, date
-from typing import Optional, List, Dict
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from typing import Optional, List, Dict, Iterator, Tuple
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, CursorNotFound
 import os
 from dotenv import load_dotenv
+from models.pagination import encode_continuation_token, decode_continuation_token
 
 load_dotenv()
 
@@ -25,6 +26,20 @@ class Decision(BaseModel):
         populate_by_name=True
     )
 
+# Every field the `Decision` model knows about
+MODEL_PROJECTION = {(field.alias or name): 1 for name, field in Decision.model_fields.items() if name != "id"}
+
+# Fields read by ingestion; everything else stays on the server
+INGEST_PROJECTION = {
+    "Case_name": 1,
+    "From": 1,
+    "Published_date": 1,
+    "country": 1,
+    "jurisdiction_code": 1,
+    "Decision_date": 1,
+    "md_file_paths": 1,
+}
+
 class DecisionModel:
     def __init__(self):
         self.client = None
@@ -159,6 +174,155 @@ class DecisionModel:
             print(f"Error retrieving paginated decisions: {str(e)}")
             return None
     
+    def ensure_keyset_index(self) -> bool:
+        """
+        Create the (jurisdiction_code, _id) index that keyset pagination relies on.
+        Safe to call repeatedly; MongoDB ignores an identical existing index.
+        """
+        if not self._ensure_connection():
+            return False
+        try:
+            self.collection.create_index([("jurisdiction_code", ASCENDING), ("_id", ASCENDING)], name="jurisdiction_code_id")
+            return True
+        except Exception as e:
+            print(f"Error creating keyset pagination index: {str(e)}")
+            return False
+
+    @staticmethod
+    def _keyset_query(jurisdiction_code: Optional[str], after_id) -> dict:
+        query = {}
+        if jurisdiction_code is not None:
+            query["jurisdiction_code"] = jurisdiction_code
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        return query
+
+    def get_decisions_after(self, continuation_token: Optional[str], page_size: int, jurisdiction_code: Optional[str] = None) -> Tuple[List[Decision], Optional[str]]:
+        """
+        Get one page of decisions using keyset pagination on `_id`.
+        
+        Args:
+            continuation_token: Token returned with the previous page, or None for the first page
+            page_size: The number of decisions per page
+            jurisdiction_code: Optional jurisdiction code to filter on
+            
+        Returns:
+            Tuple of (list of Decision objects, token for the next page or None when exhausted)
+        """
+        if not self._ensure_connection():
+            return [], None
+
+        after_id = decode_continuation_token(continuation_token)
+        try:
+            decisions_data = list(
+                self.collection.find(self._keyset_query(jurisdiction_code, after_id), INGEST_PROJECTION)
+                .sort("_id", ASCENDING)
+                .limit(page_size)
+            )
+        except Exception as e:
+            print(f"Error retrieving decisions after cursor: {str(e)}")
+            return [], None
+
+        if not decisions_data:
+            return [], None
+        next_token = encode_continuation_token(decisions_data[-1]["_id"]) if len(decisions_data) == page_size else None
+        return self._to_decisions(decisions_data), next_token
+
+    def stream_decision_pages(
+        self,
+        page_size: int,
+        jurisdiction_code: Optional[str] = None,
+        continuation_token: Optional[str] = None,
+        skip_pages: int = 0,
+    ) -> Iterator[Tuple[List[Decision], str]]:
+        """
+        Stream pages of decisions from a single long-lived cursor sorted by `_id`.
+        
+        Each yielded page comes with the continuation token that resumes right after it.
+        `skip_pages` is only applied once, when starting without a token. If the server
+        drops the cursor between pages it is reopened from the last yielded `_id`.
+        
+        Yields:
+            Tuple of (list of Decision objects, continuation token after this page)
+        """
+        if not self._ensure_connection():
+            return
+
+        after_id = decode_continuation_token(continuation_token)
+        skip = skip_pages * page_size if after_id is None else 0
+
+        while True:
+            cursor = (
+                self.collection.find(self._keyset_query(jurisdiction_code, after_id), INGEST_PROJECTION)
+                .sort("_id", ASCENDING)
+                .batch_size(page_size)
+            )
+            if skip and after_id is None:
+                cursor = cursor.skip(skip)
+            try:
+                page = []
+                for decision in cursor:
+                    page.append(decision)
+                    if len(page) == page_size:
+                        after_id = page[-1]["_id"]
+                        yield self._to_decisions(page), encode_continuation_token(after_id)
+                        page = []
+                if page:
+                    after_id = page[-1]["_id"]
+                    yield self._to_decisions(page), encode_continuation_token(after_id)
+                return
+            except CursorNotFound:
+                print(f"Decision cursor expired, reopening after {after_id}")
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def _to_decisions(documents: List[dict]) -> List[Decision]:
+        for decision in documents:
+            decision["_id"] = str(decision["_id"])
+        return [Decision(**decision) for decision in documents]
+    
+    def iter_decisions(
+        self,
+        batch_size: int = 500,
+        jurisdiction_code: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = None,
+    ) -> Iterator[List[Decision]]:
+        """
+        Stream every decision in `_id` order, in batches of `batch_size`.
+        
+        Objects are built with `model_construct`, skipping validation, so a full-corpus
+        pass runs in constant memory regardless of collection size.
+        
+        Args:
+            batch_size: Number of objects per yielded batch, also used as the cursor batch size
+            jurisdiction_code: Optional jurisdiction code to filter on
+            projection: Server-side projection; defaults to the fields of the `Decision` model
+            
+        Yields:
+            Lists of Decision objects
+        """
+        if not self._ensure_connection():
+            return
+
+        cursor = (
+            self.collection.find(self._keyset_query(jurisdiction_code, None), projection or MODEL_PROJECTION)
+            .sort("_id", ASCENDING)
+            .batch_size(batch_size)
+        )
+        try:
+            batch = []
+            for document in cursor:
+                document["_id"] = str(document["_id"])
+                batch.append(Decision.model_construct(**document))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            cursor.close()
+    
     def close(self):
         """Close the MongoDB connection."""
         if self.client:
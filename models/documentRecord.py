@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Set
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 import os
@@ -85,6 +85,28 @@ class DocumentRecordModel:
             print(f"Error checking document existence: {str(e)}")
             return False
     
+    def get_existing_hashes(self, documentHashes: List[str], clientId: int, orgId: int) -> Set[str]:
+        """
+        Return the subset of the given hashes that already have a document record,
+        resolved with a single `$in` query.
+        """
+        if not documentHashes or not self._ensure_connection():
+            return set()
+            
+        try:
+            cursor = self.collection.find(
+                {
+                    "documentHash": {"$in": list(documentHashes)},
+                    "clientId": clientId,
+                    "orgId": orgId
+                },
+                {"documentHash": 1, "_id": 0}
+            )
+            return {record["documentHash"] for record in cursor}
+        except Exception as e:
+            print(f"Error checking document existence in bulk: {str(e)}")
+            return set()
+    
     def create_document_record(
         self,
         parentDocumentId: str,
@@ -124,6 +146,23 @@ class DocumentRecordModel:
             print(f"Error creating document record: {str(e)}")
             return False
     
+    def create_document_records(self, records: List[dict]) -> bool:
+        """
+        Create many document records with a single `insert_many`.
+        Each record takes the same fields as `create_document_record`.
+        """
+        if not records or not self._ensure_connection():
+            return False
+            
+        try:
+            now = datetime.utcnow()
+            documents = [{**record, "isActive": True, "indexedAt": now} for record in records]
+            result = self.collection.insert_many(documents, ordered=False)
+            return len(result.inserted_ids) == len(documents)
+        except Exception as e:
+            print(f"Error creating document records: {str(e)}")
+            return False
+    
     def close(self):
         """Close the MongoDB connection."""
         if self.client:
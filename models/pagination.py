@@ -0,0 +1,36 @@
+import base64
+import json
+from typing import Any, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+def encode_continuation_token(last_id: Any) -> Optional[str]:
+    """
+    Encode the last `_id` of a page as an opaque, URL-safe continuation token.
+    """
+    if last_id is None:
+        return None
+    if isinstance(last_id, ObjectId):
+        payload = {"oid": str(last_id)}
+    else:
+        payload = {"id": last_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def decode_continuation_token(token: Optional[str]) -> Any:
+    """
+    Decode a continuation token back into the `_id` value to resume after.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    if not token:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+        if "oid" in payload:
+            return ObjectId(payload["oid"])
+        return payload["id"]
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid continuation token: {token}") from e
@@ -0,0 +1,61 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import date, datetime, time, timezone
+from typing import Optional, List, Literal
+from weaviate.classes.query import Filter
+
+
+class SearchFilters(BaseModel):
+    """
+    Structured restrictions for chunk searches.
+
+    They run as Weaviate pre-filters, so the hybrid search only scores matching objects.
+    Values within a field are alternatives; different fields must all match.
+    """
+    jurisdiction_codes: Optional[List[str]] = Field(default=None, description="Match any of these jurisdiction codes")
+    types: Optional[List[Literal["decision", "appeal"]]] = Field(default=None, description="Match any of these document types")
+    categories: Optional[List[str]] = Field(default=None, description="Match appeals in any of these categories")
+    decision_date_from: Optional[date] = Field(default=None, description="Earliest decision date, inclusive")
+    decision_date_to: Optional[date] = Field(default=None, description="Latest decision date, inclusive")
+    published_date_from: Optional[date] = Field(default=None, description="Earliest published date, inclusive")
+    published_date_to: Optional[date] = Field(default=None, description="Latest published date, inclusive")
+
+    @model_validator(mode="after")
+    def check_ranges(self) -> "SearchFilters":
+        for start, end in ((self.decision_date_from, self.decision_date_to), (self.published_date_from, self.published_date_to)):
+            if start and end and start > end:
+                raise ValueError(f"Date range starts after it ends: {start} > {end}")
+        return self
+
+    def is_empty(self) -> bool:
+        return not any(self.model_dump().values())
+
+    def cache_key(self) -> Optional[dict]:
+        """JSON-safe form for search cache keys; None when nothing is filtered."""
+        return None if self.is_empty() else self.model_dump(mode="json", exclude_none=True)
+
+    def to_weaviate(self):
+        """The combined Weaviate filter, or None when nothing is filtered."""
+        conditions = []
+        for prop, values in (("jurisdictionCode", self.jurisdiction_codes), ("type", self.types), ("category", self.categories)):
+            if values:
+                conditions.append(Filter.by_property(prop).contains_any(list(values)))
+        for prop, start, end in (
+            ("decisionDate", self.decision_date_from, self.decision_date_to),
+            ("publishedDate", self.published_date_from, self.published_date_to),
+        ):
+            # Dates are stored as midnight UTC
+            if start:
+                conditions.append(Filter.by_property(prop).greater_or_equal(datetime.combine(start, time.min, tzinfo=timezone.utc)))
+            if end:
+                conditions.append(Filter.by_property(prop).less_or_equal(datetime.combine(end, time.min, tzinfo=timezone.utc)))
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else Filter.all_of(conditions)
+
+
+def to_weaviate_filter(filters: Optional[SearchFilters]):
+    return filters.to_weaviate() if filters is not None else None
+
+
+def filters_cache_key(filters: Optional[SearchFilters]) -> Optional[dict]:
+    return filters.cache_key() if filters is not None else None
@@ -0,0 +1,188 @@
+import asyncio
+import time
+import logging
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from openai import AsyncAzureOpenAI
+
+from service.chatService import BaseChatService, same_query
+from service.graphRAGService import AsyncGraphRAGService
+from service.asyncWeaviateService import AsyncWeaviateService, async_weaviate_service
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class AsyncChatService(BaseChatService):
+    """
+    The chat pipeline: memory search, query rewrite, document and graph search, and the
+    streamed answer, without blocking calls.
+
+    The model is called through `AsyncAzureOpenAI`, documents come from the shared async
+    Weaviate client and the graph lookup uses the async Neo4j driver, so an open chat
+    stream holds no thread while it waits. Mem0 has no async client here; its calls run
+    in worker threads for their duration only. Independent stages run concurrently, and
+    the document search starts on the raw message before the rewrite is known.
+
+    Requests of one session are serialized by the caller, through `session_scheduler`.
+    """
+
+    def __init__(self, weaviate_service: Optional[AsyncWeaviateService] = None):
+        logger.info("Initializing AsyncChatService")
+        super().__init__()
+
+        self.weaviate_service = weaviate_service or async_weaviate_service
+        self.graphRAGService = AsyncGraphRAGService(testing=True)
+
+        logger.info("Initializing async Azure OpenAI client")
+        self.chat_client = AsyncAzureOpenAI(
+            api_key=self.openai_api_key,
+            azure_endpoint=self.openai_api_base,
+            api_version=self.openai_api_version
+        )
+        logger.info("AsyncChatService initialization completed")
+
+    async def close(self) -> None:
+        """Close the model and Neo4j clients; the shared Weaviate client is closed by the application."""
+        await self.chat_client.close()
+        await self.graphRAGService.close_async()
+        logger.info("AsyncChatService closed")
+
+    async def search_documents(self, query: str, top_k: int, tenant_name: str) -> List[Dict[str, Any]]:
+        """Search policy documents; one retry after reconnecting."""
+        logger.info(f"Searching documents - query: {query}, top_k: {top_k}, tenant: {tenant_name}")
+        try:
+            documents = await self.weaviate_service.search_documents(query, top_k, tenant_name)
+        except Exception as e:
+            logger.error(f"Error in search_documents: {str(e)}", exc_info=True)
+            await self.weaviate_service.connect()
+            documents = await self.weaviate_service.search_documents(query, top_k, tenant_name)
+        logger.info(f"Document search completed. Found {len(documents)} documents")
+        return documents
+
+    async def rewrite_query_with_memory(self, message: str, memory_context: str) -> Dict[str, Any]:
+        logger.info("Rewriting query with memory context.")
+        try:
+            response = await self.chat_client.chat.completions.create(**self.rewrite_request(message, memory_context))
+            return self.parse_rewritten_data(response.choices[0].message.content, message)
+        except Exception as e:
+            logger.error(f"Error rewriting query: {e}", exc_info=True)
+            return self.default_rewritten_data(message)
+
+    async def _run_stage(self, pipeline_started: float, stage: str, work: Awaitable) -> Tuple[Any, Dict]:
+        stage_started = time.perf_counter()
+        result = await work
+        return result, self.stage_event(pipeline_started, stage, stage_started, time.perf_counter())
+
+    def _start_stage(self, pipeline_started: float, stage: str, work: Awaitable) -> asyncio.Task:
+        return asyncio.create_task(self._run_stage(pipeline_started, stage, work))
+
+    @staticmethod
+    def _discard(task: asyncio.Task) -> None:
+        """Cancel a stage whose result is no longer needed, retrieving any error it already raised."""
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
+
+    async def enhanced_chat_completion(self, message: str, top_k: int, tenant_name: str, user_id: str, metadata: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """Async generator with the progress events and answer chunks of one chat request."""
+        logger.info(f"Starting async enhanced_chat_completion - user: {user_id}, message length: {len(message)}, top_k: {top_k}, tenant: {tenant_name}")
+        session_id = metadata.get("session_id") if metadata else None
+
+        graphrag_response = None
+        graphrag_flag = False
+        tasks: List[asyncio.Task] = []
+
+        try:
+            pipeline_started = time.perf_counter()
+
+            # Step 1: Start everything that only needs the raw message
+            memories_task = self._start_stage(pipeline_started, "memory_search", asyncio.to_thread(self.search_relevant_memories, message, user_id, session_id))
+            speculative_search = self._start_stage(pipeline_started, "document_search", self.search_documents(message, top_k, tenant_name))
+            reference_data_task = self._start_stage(pipeline_started, "reference_data", self.graphRAGService.build_allowed_values_async())
+            tasks = [memories_task, speculative_search, reference_data_task]
+
+            memories, event = await memories_task
+            yield event
+            memory_context = self.build_memory_context(memories)
+            logger.info(f"Memory context: {memory_context} for session: {session_id}")
+
+            # Step 2: Rewrite the user's query using memory context
+            rewritten_data, event = await self._run_stage(pipeline_started, "query_rewrite", self.rewrite_query_with_memory(message, memory_context))
+            yield event
+            search_query = rewritten_data.get("rewrittenQuery", message)
+            if rewritten_data.get("questionType") == "Network":
+                graphrag_flag = True
+
+            graph_task = None
+            if graphrag_flag:
+                try:
+                    allowed_values, event = await reference_data_task
+                    yield event
+                except Exception as e:
+                    logger.warning(f"Reference data prefetch failed: {str(e)}")
+                    allowed_values = None
+                graph_task = self._start_stage(
+                    pipeline_started, "graph_lookup",
+                    self.graphRAGService.generate_async(rewritten_data, metadata, allowed_values=allowed_values)
+                )
+                tasks.append(graph_task)
+            else:
+                self._discard(reference_data_task)
+
+            # Step 3: Documents for the final query, reusing the speculative search when it matches
+            if same_query(search_query, message):
+                try:
+                    documents, event = await speculative_search
+                    event["speculative"] = True
+                except Exception as e:
+                    logger.warning(f"Speculative document search failed, searching again: {str(e)}")
+                    documents, event = await self._run_stage(pipeline_started, "document_search", self.search_documents(search_query, top_k, tenant_name))
+            else:
+                self._discard(speculative_search)
+                documents, event = await self._run_stage(pipeline_started, "document_search", self.search_documents(search_query, top_k, tenant_name))
+            yield event
+            logger.info(f"Total documents found in weaviate: {len(documents)} for session: {session_id}")
+
+            if graph_task is not None:
+                graphrag_response, event = await graph_task
+                yield event
+                logger.info(f"Graphrag response: {graphrag_response}")
+
+            # Step 4: Build RAG context and messages
+            policy_wording_source, schedule_of_benefits_source, general_exclusions_source = self.build_context_from_documents(documents)
+            yield {"type": "progress", "stage": "generating_response", "message": "Generating response...", "started_ms": round((time.perf_counter() - pipeline_started) * 1000)}
+            messages = self.build_messages(search_query, policy_wording_source, schedule_of_benefits_source, general_exclusions_source, memory_context, graphrag_flag, graphrag_response)
+
+            # Step 5: Stream the answer
+            stream = await self.chat_client.chat.completions.create(**self.completion_request(messages))
+            full_response = ""
+            chunk_count = 0
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    content = chunk.choices[0].delta.content
+                    full_response += content
+                    chunk_count += 1
+                    if chunk_count == 1:
+                        logger.info(f"Time to first token: {(time.perf_counter() - pipeline_started) * 1000:.0f} ms for session: {session_id}")
+                    yield {"type": "text", "content": content}
+            logger.info(f"Streaming completed. Total chunks: {chunk_count}, response length: {len(full_response)} for session: {session_id}")
+
+            # Step 6: Store the conversation in memory with session context
+            if full_response:
+                await asyncio.to_thread(
+                    self.store_conversation_memory,
+                    user_message=search_query,
+                    assistant_response=full_response,
+                    user_id=user_id,
+                    session_id=session_id
+                )
+        except Exception as e:
+            logger.error(f"Error in async enhanced_chat_completion: {str(e)} for session: {session_id}", exc_info=True)
+            yield {"type": "error", "content": f"Error generating response: {str(e)}"}
+        finally:
+            # Also reached when the client disconnects mid-stream
+            for task in tasks:
+                self._discard(task)
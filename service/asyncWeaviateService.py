@@ -0,0 +1,169 @@
+import os
+import uuid
+import asyncio
+import logging
+from typing import List, Optional
+
+from dotenv import load_dotenv
+import weaviate
+
+from service.config import Config as ServiceConfig
+from models.searchFilters import SearchFilters
+from service.searchCache import search_cache
+from service.snippet_utils import RESULT_FIELDS, object_result, return_properties_for
+from service.reranker import get_reranker, rerank_chunk_objects
+from service.searchQueries import (
+    BENEFIT_QUERY_PROPERTIES, CHUNK_QUERY_PROPERTIES, SEARCH_ALPHA, CaseSearch,
+    benefit_cache_extra, benefit_results, benefit_search_args, chunk_cache_extra, chunk_fields, chunk_search_args,
+)
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class AsyncWeaviateService:
+    """
+    Read paths of `WeaviateService` and `rag_utils.find_relevant_chunks` on Weaviate's async client.
+
+    One instance, and so one connection, is shared by the whole process: it is connected
+    at application startup and closed at shutdown. Its searches never block the event
+    loop, so async endpoints can run many of them concurrently on a single worker.
+    Query building, result shaping and cache keys come from `service.searchQueries`,
+    shared with the sync implementations; only the Weaviate calls differ.
+    """
+
+    def __init__(self, client: Optional[weaviate.WeaviateAsyncClient] = None):
+        self.client = client
+        self.collection_name = os.getenv("WEAVIATE_COLLECTION_NAME")
+
+    async def connect(self) -> None:
+        if self.client is None:
+            logger.info("Creating async Weaviate client connection")
+            self.client = ServiceConfig.buildAsyncWeaviateConnection()
+        if not self.client.is_connected():
+            await self.client.connect()
+            logger.info("Async Weaviate client connected")
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+            logger.info("Async Weaviate client closed")
+
+    async def _tenant_collection(self, tenant_name: str):
+        if self.client is None or not self.client.is_connected():
+            # Started outside the application lifespan, e.g. from a script
+            await self.connect()
+        return self.client.collections.get(self.collection_name).with_tenant(tenant_name)
+
+    async def search_documents(self, query: str, top_k: int, tenant_name: str, reranker: Optional[str] = None) -> List[dict]:
+        """Async `WeaviateService.search_documents`."""
+        tenant_collection = await self._tenant_collection(tenant_name)
+        active_reranker = get_reranker(reranker)
+
+        async def run_search() -> List[dict]:
+            response = await tenant_collection.query.hybrid(**benefit_search_args(query, top_k, active_reranker))
+            if active_reranker is None:
+                return benefit_results(query, response.objects, top_k, None)
+            return await asyncio.to_thread(benefit_results, query, response.objects, top_k, active_reranker)
+
+        return await search_cache.get_or_compute_async(
+            tenant_name, query, SEARCH_ALPHA, BENEFIT_QUERY_PROPERTIES, top_k, run_search,
+            extra=benefit_cache_extra(active_reranker)
+        )
+
+    async def find_relevant_chunks(
+        self,
+        query: str,
+        n_results: int = 3,
+        snippet: bool = False,
+        fields: Optional[List[str]] = None,
+        reranker: Optional[str] = None,
+        filters: Optional[SearchFilters] = None,
+    ) -> List[dict]:
+        """Async `rag_utils.find_relevant_chunks`; reranking runs in a worker thread."""
+        fields = chunk_fields(fields, snippet)
+        active_reranker = get_reranker(reranker)
+        tenant_collection = await self._tenant_collection("1")
+
+        async def run_search() -> List[dict]:
+            response = await tenant_collection.query.hybrid(**chunk_search_args(query, n_results, fields, snippet, active_reranker, filters))
+            if active_reranker is None:
+                return rerank_chunk_objects(None, query, response.objects, n_results, fields, snippet)
+            return await asyncio.to_thread(rerank_chunk_objects, active_reranker, query, response.objects, n_results, fields, snippet)
+
+        return await search_cache.get_or_compute_async(
+            "1", query, SEARCH_ALPHA, CHUNK_QUERY_PROPERTIES, n_results, run_search,
+            extra=chunk_cache_extra(fields, snippet, active_reranker, filters)
+        )
+
+    async def search_relevant_docs(
+        self,
+        query: str,
+        page: int,
+        page_size: int,
+        result_set_token: Optional[str] = None,
+        snippet: bool = False,
+        fields: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        group_by_case: bool = False,
+    ) -> dict:
+        """Async `WeaviateService.search_relevant_docs`; shares its result sets and cache entries."""
+        search = CaseSearch(query, page, page_size, result_set_token, snippet, fields, filters, group_by_case)
+        tenant_collection = await self._tenant_collection("1")
+
+        ranked_ids = await search.stored_ranking_async()
+        if ranked_ids is None:
+            async def rank_top_results() -> list:
+                return search.ranking((await tenant_collection.query.hybrid(**search.hybrid_args())).objects)
+
+            ranked_ids = await search_cache.get_or_compute_async(*search.cache_args(), rank_top_results, extra=search.cache_extra())
+            await search.remember_async(ranked_ids)
+
+        page_ids = search.page_ids(ranked_ids)
+        objects = (await tenant_collection.query.fetch_objects(**search.fetch_args(page_ids))).objects if page_ids else []
+        return search.response(page_ids, objects)
+
+    async def get_chunk_text(self, object_id: str, tenant_name: str = "1") -> Optional[dict]:
+        """Async `WeaviateService.get_chunk_text`."""
+        try:
+            uuid.UUID(object_id)
+        except ValueError:
+            return None
+        tenant_collection = await self._tenant_collection(tenant_name)
+        obj = await tenant_collection.query.fetch_object_by_id(object_id, return_properties=list(RESULT_FIELDS.values()))
+        if obj is None:
+            return None
+        return object_result(obj, list(RESULT_FIELDS), "", snippet=False)
+
+    async def paginate_cases(self, page: int, page_size: int, tenant_name: str = "1") -> dict:
+        """
+        Page through a tenant's chunks in storage order, without their full text.
+
+        Args:
+            page: 1-based page number
+            page_size: Chunks per page
+
+        Returns:
+            Dict with the pagination summary and the page's chunks
+        """
+        tenant_collection = await self._tenant_collection(tenant_name)
+        fields = [field for field in RESULT_FIELDS if field != "rawText"]
+        total = (await tenant_collection.aggregate.over_all(total_count=True)).total_count or 0
+        response = await tenant_collection.query.fetch_objects(
+            offset=(page - 1) * page_size,
+            limit=page_size,
+            return_properties=return_properties_for(fields, snippet=False),
+        )
+        return {
+            "status": "success",
+            "pagination": {
+                "page": page,
+                "page_size": page_size,
+                "total": total,
+                "total_pages": (total + page_size - 1) // page_size
+            },
+            "data": [object_result(obj, fields, "", snippet=False) for obj in response.objects]
+        }
+
+
+async_weaviate_service = AsyncWeaviateService()
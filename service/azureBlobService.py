@@ -6,13 +6,10 @@ from fastapi import UploadFile
 from config.dbConfig import db
 import os
 import logging
-from service.config import Config
 from fastapi import HTTPException
 
 logger = logging.getLogger(__name__)
 
-client = Config.buildWeaviateConnection()
-weaviate_collection_name = os.getenv("WEAVIATE_COLLECTION_NAME")
 load_dotenv()
 class AzureBlobService:
 
@@ -1,17 +1,11 @@
 import os
 import json
 import logging
-import shutil
-import tempfile
-import threading
-from typing import List, Dict, Any, Optional
-from openai import AzureOpenAI
+from typing import List, Dict, Any
 from dotenv import load_dotenv
 
-from service.graphRAGService import GraphRAGService
-from service.weaviateService import WeaviateService
 from models.chatModels import Message
-from mem0 import MemoryClient, Memory
+from mem0 import MemoryClient
 # from service.langchain_memory_adapter import MemoryClient, Memory
 
 import datetime
@@ -22,14 +16,28 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-class ChatService:
+STAGE_MESSAGES = {
+    "memory_search": "Searched conversation memory",
+    "query_rewrite": "Analysed the question",
+    "reference_data": "Loaded network reference data",
+    "document_search": "Searched policy documents",
+    "graph_lookup": "Searched the provider network",
+}
+
+
+def same_query(first: str, second: str) -> bool:
+    """Whether two queries would search the same, ignoring case and whitespace."""
+    return " ".join(first.split()).casefold() == " ".join(second.split()).casefold()
+
+
+class BaseChatService:
+    """
+    Configuration, prompts and Mem0 access for `AsyncChatService`.
+
+    Nothing here depends on how the model, Weaviate or Neo4j are called.
+    """
+
     def __init__(self):
-        logger.info("Initializing ChatService")
-        
-        # Add request locks to prevent concurrent processing
-        self._request_locks = {}
-        self._locks_lock = threading.Lock()
-        
         # Azure OpenAI Chat configuration
         self.chat_api_key = os.getenv("AZURE_OPENAI_EMBEDDING_API_KEY")
         self.chat_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
@@ -44,180 +52,12 @@ class ChatService:
         
  
         
-        logger.info(f"ChatService config - deployment: {self.deployment_name}, api_base: {self.openai_api_base}")
-        
-        # Initialize services
-        logger.info("Initializing WeaviateService")
-        self.weaviate_service = WeaviateService()
-        
-        self.graphRAGService = GraphRAGService(testing=True)
-
-        logger.info("Initializing Azure OpenAI client")
-        self.chat_client = AzureOpenAI(
-            api_key=self.openai_api_key,
-            azure_endpoint=self.openai_api_base,
-            api_version=self.openai_api_version
-        )
-        
+        logger.info(f"{type(self).__name__} config - deployment: {self.deployment_name}, api_base: {self.openai_api_base}")
+
         # Initialize MemoryClient (this is safe and doesn't create lock files)
         logger.info("Initializing MemoryClient")
         self.memClient = MemoryClient(api_key=self.mem_api_key, org_id="org_Om85bktrlf7dY7QvEjmLMNVNolB4SSA6Sm5Ti9Nq", project_id="proj_lu96pH2wqgk5ejKGtF9AfwpWjBHowfcIgp5C3m8m")
 
-        # Initialize Memory config with error handling to avoid lock file conflicts
-        self.memoryConfig = None
-        try:
-            logger.info("Initializing Memory config")
-            
-            # Clean up any existing Qdrant lock files
-            self._cleanup_qdrant_locks()
-            
-            self.memory_config = {
-                "llm": {
-                    "provider": "azure_openai",
-                    "config": {
-                        "model": self.deployment_name,
-                        "temperature": 0.1,
-                        "max_tokens": 2000,
-                        "azure_kwargs": {
-                            "azure_deployment": self.deployment_name,
-                            "api_version": self.openai_api_version,
-                            "azure_endpoint": self.openai_api_base,
-                            "api_key": self.openai_api_key,
-                        }
-                    }
-                }
-            }
-            
-            # Try to initialize Memory, but don't fail if it has lock issues
-            self.memoryConfig = Memory.from_config(self.memory_config)
-            logger.info("Memory config initialized successfully")
-        except Exception as e:
-            logger.warning(f"Failed to initialize Memory config (this is okay for consecutive requests): {str(e)}")
-            logger.info("Continuing without local Memory config - will use MemoryClient only")
-            self.memoryConfig = None
-        
-        logger.info("ChatService initialization completed")
-
-    def _get_request_lock(self, user_id: str, session_id: str = None) -> threading.Lock:
-        """Get or create a lock for a specific user/session combination"""
-        lock_key = f"{user_id}_{session_id}" if session_id else user_id
-        
-        with self._locks_lock:
-            if lock_key not in self._request_locks:
-                logger.info(f"Creating new request lock for: {lock_key}")
-                self._request_locks[lock_key] = threading.Lock()
-            return self._request_locks[lock_key]
-
-    def _cleanup_old_locks(self):
-        """Clean up old locks to prevent memory leaks"""
-        with self._locks_lock:
-            # Keep only the most recent locks (simple cleanup)
-            if len(self._request_locks) > 100:  # Arbitrary limit
-                logger.info("Cleaning up old request locks")
-                # For simplicity, just clear all locks
-                self._request_locks.clear()
-
-    def _cleanup_qdrant_locks(self):
-        """Clean up Qdrant lock files that might be causing conflicts"""
-        try:
-            # Common paths where Qdrant might create lock files
-            qdrant_paths = [
-                "/tmp/qdrant",
-                os.path.join(tempfile.gettempdir(), "qdrant"),
-                os.path.join(os.getcwd(), "qdrant"),
-                os.path.join(os.path.expanduser("~"), ".qdrant")
-            ]
-            
-            for path in qdrant_paths:
-                if os.path.exists(path):
-                    logger.info(f"Found Qdrant path: {path}")
-                    try:
-                        # Try to remove lock files specifically
-                        lock_file = os.path.join(path, ".lock")
-                        if os.path.exists(lock_file):
-                            logger.info(f"Removing Qdrant lock file: {lock_file}")
-                            os.remove(lock_file)
-                        
-                        # Also try to clean up the entire directory if it's empty
-                        if os.path.isdir(path) and not os.listdir(path):
-                            logger.info(f"Removing empty Qdrant directory: {path}")
-                            shutil.rmtree(path, ignore_errors=True)
-                    except Exception as e:
-                        logger.warning(f"Could not clean up Qdrant path {path}: {str(e)}")
-        except Exception as e:
-            logger.warning(f"Error during Qdrant cleanup: {str(e)}")
-
-    def cleanup(self):
-        """Cleanup method to properly close connections and clean up resources"""
-        try:
-            logger.info("Cleaning up ChatService resources")
-            
-            # Clean up request locks
-            with self._locks_lock:
-                logger.info(f"Cleaning up {len(self._request_locks)} request locks")
-                self._request_locks.clear()
-            
-            # Clean up Weaviate connection
-            if hasattr(self, 'weaviate_service') and self.weaviate_service:
-                try:
-                    self.weaviate_service.close()
-                    logger.info("Weaviate service closed successfully")
-                except Exception as e:
-                    logger.warning(f"Error closing Weaviate service: {str(e)}")
-                finally:
-                    self.weaviate_service = None
-            
-            # Clean up Qdrant locks
-            self._cleanup_qdrant_locks()
-            
-            logger.info("ChatService cleanup completed")
-        except Exception as e:
-            logger.error(f"Error during ChatService cleanup: {str(e)}")
-
-    def __del__(self):
-        """Destructor to ensure cleanup happens when object is garbage collected"""
-        try:
-            self.cleanup()
-        except Exception as e:
-            logger.warning(f"Error in ChatService destructor: {str(e)}")
-
-    def search_documents(self, query: str, top_k: int, tenant_name: str) -> List[Dict[str, Any]]:
-        """
-        Search for relevant documents using the WeaviateService.
-        
-        Args:
-            query: Search query
-            top_k: Number of top results to return
-            tenant_name: Name of the tenant
-        Returns:
-            List of relevant documents
-        """
-        logger.info(f"Searching documents - query: {query}, top_k: {top_k}, tenant: {tenant_name}")
-        try:
-            # Ensure Weaviate service is properly initialized
-            if not hasattr(self, 'weaviate_service') or self.weaviate_service is None:
-                logger.warning("Weaviate service not initialized, reinitializing")
-                self.weaviate_service = WeaviateService()
-            
-            documents = self.weaviate_service.search_documents(query, top_k, tenant_name)
-            logger.info(f"Document search completed. Found {len(documents)} documents")
-            return documents
-        except Exception as e:
-            logger.error(f"Error in search_documents: {str(e)}", exc_info=True)
-            # Try to reinitialize Weaviate service on error
-            try:
-                logger.info("Attempting to reinitialize Weaviate service after error")
-                if hasattr(self, 'weaviate_service') and self.weaviate_service:
-                    self.weaviate_service.close()
-                self.weaviate_service = WeaviateService()
-                # Retry the search
-                documents = self.weaviate_service.search_documents(query, top_k, tenant_name)
-                logger.info(f"Document search retry completed. Found {len(documents)} documents")
-                return documents
-            except Exception as retry_error:
-                logger.error(f"Error in search_documents retry: {str(retry_error)}", exc_info=True)
-                raise
-
     def build_context_from_documents(self, documents: List[Dict[str, Any]]) -> str:
         """
         Builds a context string from retrieved documents, optimized for the
@@ -461,12 +301,8 @@ class ChatService:
         logger.info("No memory content found")
         return ""
     
-    def rewrite_query_with_memory(self, message: str, memory_context: str) -> Dict[str, Any]:
-        """
-        Rewrite the user's query using memory to create a standalone query and extract structured data.
-        """
-        logger.info("Rewriting query with memory context.")
-
+    def rewrite_request(self, message: str, memory_context: str) -> Dict[str, Any]:
+        """Arguments for the chat completion that rewrites the user's query."""
         rewrite_prompt = f"""
             You are a query analysis expert. Your task is to analyze a user's message in the context of a conversation history and return a JSON object with four fields: "rewrittenQuery", "questionType", "isUserLocationQuestion", and "intent".
 
@@ -506,164 +342,67 @@ class ChatService:
             User Message: "{message}"
         """
 
+        return {
+            "model": self.rewrite_deployment_name,
+            "messages": [{"role": "system", "content": "You are a query analysis assistant that returns JSON."},
+                         {"role": "user", "content": rewrite_prompt}],
+            "max_tokens": 300,
+            "temperature": 0.0,
+            "stream": False,
+            "response_format": {"type": "json_object"}
+        }
+
+    @staticmethod
+    def default_rewritten_data(message: str) -> Dict[str, Any]:
+        """Rewrite result that keeps the original message, used when the rewrite fails."""
+        return {
+            "rewrittenQuery": message,
+            "questionType": "NonNetwork",
+            "isUserLocationQuestion": "False",
+            "intent": "New"
+        }
+
+    def parse_rewritten_data(self, response_content: str, message: str) -> Dict[str, Any]:
+        """Parse the rewrite model's JSON reply, falling back to the original message."""
+        response_content = response_content.strip()
+        logger.info(f"Raw response from rewrite model: {response_content}")
+
+        # Clean the response to ensure it's valid JSON
         try:
-            response = self.chat_client.chat.completions.create(
-                model=self.rewrite_deployment_name,
-                messages=[{"role": "system", "content": "You are a query analysis assistant that returns JSON."},
-                          {"role": "user", "content": rewrite_prompt}],
-                max_tokens=300,
-                temperature=0.0,
-                stream=False,
-                response_format={"type": "json_object"}
-            )
-
-            response_content = response.choices[0].message.content.strip()
-            logger.info(f"Raw response from rewrite model: {response_content}")
-
-            # Clean the response to ensure it's valid JSON
-            try:
-                # Find the start and end of the JSON object
-                start_index = response_content.find('{')
-                end_index = response_content.rfind('}') + 1
-                if start_index != -1 and end_index != 0:
-                    json_str = response_content[start_index:end_index]
-                    rewritten_data = json.loads(json_str)
-                else:
-                    raise json.JSONDecodeError("No JSON object found", response_content, 0)
-            except json.JSONDecodeError:
-                logger.error(f"Failed to decode JSON from response: {response_content}")
-                # Fallback to a default structure if JSON parsing fails
-                return {
-                    "rewrittenQuery": message,
-                    "questionType": "NonNetwork",
-                    "isUserLocationQuestion": "False",
-                    "intent": "New"
-                }
-
-            logger.info(f"Original query: '{message}'")
-            logger.info(f"Rewritten data: {rewritten_data}")
-            return rewritten_data
-        except Exception as e:
-            logger.error(f"Error rewriting query: {e}", exc_info=True)
-            # Fallback to original message in a structured format
-            return {
-                "rewrittenQuery": message,
-                "questionType": "NonNetwork",
-                "isUserLocationQuestion": "False",
-                "intent": "New"
-            }
-    
-    def enhanced_chat_completion(self, message: str, top_k: int, tenant_name: str, user_id: str, metadata: Optional[Dict] = None):
-        """Enhanced chat completion with session-aware RAG and memory"""
-        logger.info(f"Starting enhanced_chat_completion - user: {user_id}, message length: {len(message)}, top_k: {top_k}, tenant: {tenant_name}")
-        
-        # Extract session_id from metadata
-        session_id = metadata.get("session_id") if metadata else None
-        logger.info(f"Extracted session_id from metadata: {session_id}")
-        
-        # Get request lock for this user/session
-        request_lock = self._get_request_lock(user_id, session_id)
-        logger.info(f"Acquiring request lock for user: {user_id}, session: {session_id}")
-        
-        graphrag_response = None
-        graphrag_flag = False
-        
-        try:
-            # Acquire lock to ensure only one request is processed at a time
-            if not request_lock.acquire(timeout=30):  # 30 second timeout
-                logger.warning(f"Timeout waiting for request lock for user: {user_id}, session: {session_id}")
-                yield {"type": "error", "content": "Request timeout - please try again"}
-                return
-            
-            logger.info(f"Request lock acquired for user: {user_id}, session: {session_id}")
-            
-            # Clean up old locks periodically
-            self._cleanup_old_locks()
-            
-            # Step 1: Search for relevant memories to build context
-            logger.info("Step 1: Searching relevant memories for session: " + session_id)
-         
-            memories = self.search_relevant_memories(message, user_id, session_id)
-            
-            # Step 1.1: Build memory context
-            memory_context = self.build_memory_context(memories)
-            logger.info(f"Memory context: {memory_context} for session: {session_id}")
-            
-            # Step 2: Rewrite the user's query using memory context
-            logger.info("Step 2: Rewriting query with memory context and search query: " + message + " and session id: " + session_id)
-            rewritten_data = self.rewrite_query_with_memory(message, memory_context)
-            search_query = rewritten_data.get("rewrittenQuery", message)
-            if rewritten_data.get("questionType") == "Network":
-                graphrag_flag = True
-
-            
-            logger.info(f"Call neo4j graphrag service with graphrag flag: {graphrag_flag} and search query: {search_query}")
-            
-            if graphrag_flag:
-                graphrag_response = self.graphRAGService.generate(rewritten_data, metadata)
-                logger.info(f"Graphrag response: {graphrag_response}")
-                
-            # Step 3: Search for documents using the rewritten query
-            logger.info(f"Step 3: Searching for relevant documents with query: '{search_query}' and session id: {session_id}")
-            documents = self.search_documents(search_query, top_k, tenant_name)
-            logger.info(f"Total documents found in weaviate: {len(documents)} for session: {session_id}")
-            
-            # Step 4: Build RAG context from the retrieved documents
-            logger.info(f"Step 4: Building RAG context from documents for session: " + session_id)
-            policy_wording_source, schedule_of_benefits_source, general_exclusions_source = self.build_context_from_documents(documents)
-                
-            # Send progress indicator for response generation
-            logger.info("Step 5: Sending progress indicator for session: " + session_id)
-            yield {"type": "progress", "stage": "generating_response", "message": "Generating response..."}
-            
-            # Step 6: Build enhanced messages with all contexts
-            logger.info("Step 6: Building enhanced messages with all contexts for session: " + session_id)
-            messages = self.build_messages(search_query, policy_wording_source, schedule_of_benefits_source, general_exclusions_source, memory_context, graphrag_flag, graphrag_response)
-            logger.info(f"Build Messages user and assistant messages: {json.dumps(messages)} for session: {session_id}")
-            
-            logger.info(f"Step 7: Creating streaming chat completion for user {user_id} and session id: {session_id}")
-            # Step 7: Create streaming chat completion
-            stream = self.chat_client.chat.completions.create(
-                model=self.deployment_name,
-                messages=messages,
-                max_tokens=1500,
-                temperature=float(os.getenv("TEMPERATURE", "0.7")),
-                stream=True
-            )
-            
-            # Step 8: Stream the response and collect it simultaneously
-            logger.info("Step 8: Starting response streaming for user: " + user_id + " and session id: " + session_id)
-            full_response = ""
-            chunk_count = 0
-            for chunk in stream:
-                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    chunk_count += 1
-                    # Stream the entire chunk immediately
-                    if chunk_count % 10 == 0:  # Log every 10th chunk to avoid spam
-                        logger.info(f"Streamed {chunk_count} chunks so far")
-                    yield {"type": "text", "content": content}
-            
-            logger.info(f"Step 9: Streaming completed. Total chunks: {chunk_count}, response length: {len(full_response)} for user: " + user_id + " and session id: " + session_id)
-            
-            
-            # Step 10: Store the conversation in memory with session context
-            if full_response:
-                logger.info("Step 10: Storing conversation in memory for user: " + user_id + " and session id: " + session_id)
-                self.store_conversation_memory(
-                    user_message=search_query,
-                    assistant_response=full_response,
-                    user_id=user_id,
-                    session_id=session_id
-                )
-            
-            logger.info("Enhanced chat completion completed successfully for user: " + user_id + " and session id: " + session_id)
-            
-        except Exception as e:
-            logger.error(f"Error in enhanced_chat_completion: {str(e)} for session: {session_id}", exc_info=True)
-            yield {"type": "error", "content": f"Error generating response: {str(e)}"}
-        finally:
-            # Always release the lock
-            logger.info(f"Releasing request lock for user: {user_id}, session: {session_id}")
-            request_lock.release()
+            # Find the start and end of the JSON object
+            start_index = response_content.find('{')
+            end_index = response_content.rfind('}') + 1
+            if start_index != -1 and end_index != 0:
+                json_str = response_content[start_index:end_index]
+                rewritten_data = json.loads(json_str)
+            else:
+                raise json.JSONDecodeError("No JSON object found", response_content, 0)
+        except json.JSONDecodeError:
+            logger.error(f"Failed to decode JSON from response: {response_content}")
+            # Fallback to a default structure if JSON parsing fails
+            return self.default_rewritten_data(message)
+
+        logger.info(f"Original query: '{message}'")
+        logger.info(f"Rewritten data: {rewritten_data}")
+        return rewritten_data
+
+    def completion_request(self, messages: List[Dict]) -> Dict[str, Any]:
+        """Arguments for the streaming answer completion."""
+        return {
+            "model": self.deployment_name,
+            "messages": messages,
+            "max_tokens": 1500,
+            "temperature": float(os.getenv("TEMPERATURE", "0.7")),
+            "stream": True
+        }
+
+    @staticmethod
+    def stage_event(pipeline_started: float, stage: str, stage_started: float, finished: float) -> Dict:
+        """Progress event for a finished pipeline stage, with its start offset and duration in ms."""
+        return {
+            "type": "progress",
+            "stage": stage,
+            "message": STAGE_MESSAGES[stage],
+            "started_ms": round((stage_started - pipeline_started) * 1000),
+            "duration_ms": round((finished - stage_started) * 1000),
+        }
@@ -26,3 +26,19 @@ class Config:
             headers={ "X-Azure-Api-Key": os.getenv("AZURE_OPENAI_EMBEDDING_API_KEY")}
         )
         return client   
+
+    @staticmethod
+    def buildAsyncWeaviateConnection() -> weaviate.WeaviateAsyncClient:
+        """Async client with the same settings; call `await client.connect()` before use."""
+        return weaviate.use_async_with_custom(
+            http_host=os.getenv("WEAVIATE_HOST"),
+            http_port=os.getenv("WEAVIATE_PORT"),
+            http_secure=False,
+            grpc_host=os.getenv("WEAVIATE_GRPC_HOST"),
+            grpc_port=os.getenv("WEAVIATE_GRPC_PORT"),
+            grpc_secure=False,
+            auth_credentials=Auth.api_key(
+                os.getenv("WEAVIATE_API_KEY")
+            ),
+            headers={ "X-Azure-Api-Key": os.getenv("AZURE_OPENAI_EMBEDDING_API_KEY")}
+        )
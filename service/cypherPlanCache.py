@@ -0,0 +1,284 @@
+import os
+import re
+import time
+import random
+import hashlib
+import difflib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from service.referenceDataCache import reference_data_cache
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Appended to location questions by `GraphRAGService.graph_question`
+LOCATION_SUFFIX = re.compile(
+    r"\s*with location lattidute:\s*(?P<lat>-?\d+(?:\.\d+)?),\s*longitude:\s*(?P<lon>-?\d+(?:\.\d+)?)\s*$",
+    re.IGNORECASE,
+)
+CYPHER_COORDINATE = re.compile(r"\b(?P<name>latitude|longitude)(?P<sep>\s*:\s*)(?P<value>-?\d+(?:\.\d+)?)")
+CYPHER_STRING = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"")
+LOCATION_PARAMETERS = {"latitude": "plan_latitude", "longitude": "plan_longitude"}
+
+# Filler that does not change which Cypher answers a question
+STOPWORDS = frozenset({
+    "a", "an", "the", "please", "can", "could", "would", "you", "tell", "show", "give", "me", "i", "my",
+    "is", "are", "do", "does", "which", "what", "there", "any", "of",
+})
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class _Plan:
+    __slots__ = ("key", "cypher", "located", "tokens", "signature", "version", "expires_at", "hits")
+
+    def __init__(self, key: str, cypher: str, located: bool, tokens: List[str], signature: Tuple[int, ...], version: int, expires_at: float):
+        self.key = key
+        self.cypher = cypher
+        self.located = located
+        self.tokens = tokens
+        self.signature = signature
+        self.version = version
+        self.expires_at = expires_at
+        self.hits = 0
+
+
+class CypherPlanCache:
+    """
+    Text-to-Cypher plans that already ran, keyed on the normalized question.
+
+    The user's location is taken out of both the question and the Cypher: the question
+    loses its "with location ..." suffix and the coordinates in the Cypher become the
+    `$plan_latitude` / `$plan_longitude` parameters, bound again from the next question.
+    A location question whose Cypher does not use the coordinates as plain
+    `latitude: x` / `longitude: y` literals is not cached.
+
+    Lookups try the exact key first. Then they try near duplicates, found by MinHash
+    with LSH banding over character trigrams of the sorted words. A near duplicate is
+    used only when it is the same question up to spelling, word order and filler words.
+    Its numbers must match, and every string literal in its Cypher must appear in the
+    new question. A question that names a different region or plan therefore never
+    reuses another question's plan.
+
+    Only Cypher that executed without error and returned rows is stored. Plans are
+    dropped when the graph reference data reloads, after `ttl_seconds`, and when a
+    cached plan fails on execution.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 86400,
+        near_threshold: float = 0.7,
+        num_perm: int = 64,
+        bands: int = 16,
+        enabled: bool = True,
+        version: Callable[[], int] = lambda: 0,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.near_threshold = near_threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.enabled = enabled
+        self._version = version
+        # Fixed seed: signatures must agree between processes and restarts
+        rng = random.Random(1729)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+        self._entries: "OrderedDict[str, _Plan]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self._lock = threading.Lock()
+        self._metrics = {"exact_hits": 0, "near_hits": 0, "misses": 0, "stores": 0, "not_cacheable": 0, "evictions": 0, "expirations": 0, "discarded": 0}
+
+    @classmethod
+    def from_env(cls) -> "CypherPlanCache":
+        return cls(
+            max_entries=int(os.getenv("CYPHER_PLAN_CACHE_MAX_ENTRIES", "512")),
+            ttl_seconds=float(os.getenv("CYPHER_PLAN_CACHE_TTL_SECONDS", "86400")),
+            near_threshold=float(os.getenv("CYPHER_PLAN_NEAR_THRESHOLD", "0.7")),
+            enabled=os.getenv("CYPHER_PLAN_CACHE_ENABLED", "true").lower() != "false",
+            version=lambda: reference_data_cache.version,
+        )
+
+    @staticmethod
+    def split_location(question: str) -> Tuple[str, Optional[Tuple[float, float]]]:
+        """The question without its location suffix, and the (latitude, longitude) it carried."""
+        match = LOCATION_SUFFIX.search(question)
+        if match is None:
+            return question, None
+        return question[:match.start()], (float(match.group("lat")), float(match.group("lon")))
+
+    @staticmethod
+    def tokens(question: str) -> List[str]:
+        return [token for token in re.findall(r"\w+", question.casefold()) if token not in STOPWORDS]
+
+    def _signature(self, text: str) -> Tuple[int, ...]:
+        shingles = {text[i:i + 3] for i in range(max(1, len(text) - 2))}
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") for shingle in shingles]
+        return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms)
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    @staticmethod
+    def parameterize(cypher: str, location: Tuple[float, float]) -> Optional[str]:
+        """The Cypher with the question's coordinates replaced by parameters; None when that is not safe."""
+        expected = {"latitude": location[0], "longitude": location[1]}
+        bound = set()
+
+        def bind(match: re.Match) -> str:
+            name = match.group("name").lower()
+            if float(match.group("value")) != expected[name]:
+                return match.group(0)
+            bound.add(name)
+            return f"{match.group('name')}{match.group('sep')}${LOCATION_PARAMETERS[name]}"
+
+        template = CYPHER_COORDINATE.sub(bind, cypher)
+        if bound != set(expected) or CYPHER_COORDINATE.search(template):
+            return None
+        return template
+
+    @staticmethod
+    def _literals(cypher: str) -> FrozenSet[str]:
+        return frozenset((single or double).casefold() for single, double in CYPHER_STRING.findall(cypher) if single or double)
+
+    @staticmethod
+    def _same_words(tokens: List[str], other: List[str]) -> bool:
+        """Every word of each side is in the other, up to spelling (plurals, typos)."""
+        def covered(words, by):
+            by = set(by)
+            return all(word in by or any(difflib.SequenceMatcher(None, word, candidate).ratio() >= 0.8 for candidate in by) for word in words)
+        return covered(tokens, other) and covered(other, tokens)
+
+    def _usable(self, plan: _Plan, now: float, version: int) -> bool:
+        if plan.expires_at < now or plan.version != version:
+            self._remove(plan.key)
+            self._metrics["expirations"] += 1
+            return False
+        return True
+
+    def _remove(self, key: str) -> None:
+        plan = self._entries.pop(key, None)
+        if plan is None:
+            return
+        for band_key in self._band_keys(plan.signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def _near_duplicate(self, question: str, tokens: List[str], signature: Tuple[int, ...], located: bool, now: float, version: int) -> Optional[_Plan]:
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates |= self._buckets.get(band_key, set())
+        scored = []
+        for key in candidates:
+            plan = self._entries.get(key)
+            if plan is None or plan.located != located or not self._usable(plan, now, version):
+                continue
+            score = sum(1 for mine, theirs in zip(signature, plan.signature) if mine == theirs) / len(signature)
+            if score >= self.near_threshold:
+                scored.append((score, key, plan))
+        numbers = {token for token in tokens if any(ch.isdigit() for ch in token)}
+        text = question.casefold()
+        for _, _, plan in sorted(scored, key=lambda item: item[:2], reverse=True):
+            if numbers != {token for token in plan.tokens if any(ch.isdigit() for ch in token)}:
+                continue
+            if not all(literal in text for literal in self._literals(plan.cypher)):
+                continue
+            if self._same_words(tokens, plan.tokens):
+                return plan
+        return None
+
+    def _key(self, tokens: List[str], located: bool) -> str:
+        return f"{'located' if located else 'any'}:{' '.join(tokens)}"
+
+    def lookup(self, question: str) -> Optional[Tuple[str, Dict[str, float]]]:
+        """
+        A cached plan for the question.
+
+        Args:
+            question: The question as sent to `GraphRAGService.run`, location suffix included
+
+        Returns:
+            (cypher, parameters) to execute, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        base, location = self.split_location(question)
+        tokens = self.tokens(base)
+        if not tokens:
+            return None
+        located = location is not None
+        key = self._key(tokens, located)
+        signature = self._signature(" ".join(sorted(tokens)))
+        now, version = time.monotonic(), self._version()
+        with self._lock:
+            plan = self._entries.get(key)
+            kind = "exact_hits"
+            if plan is None or not self._usable(plan, now, version):
+                kind = "near_hits"
+                plan = self._near_duplicate(base, tokens, signature, located, now, version)
+            if plan is None:
+                self._metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(plan.key)
+            plan.hits += 1
+            self._metrics[kind] += 1
+        logger.info(f"Cypher plan cache {kind[:-1].replace('_', ' ')} for question: {base}")
+        parameters = {LOCATION_PARAMETERS["latitude"]: location[0], LOCATION_PARAMETERS["longitude"]: location[1]} if located else {}
+        return plan.cypher, parameters
+
+    def store(self, question: str, cypher: str) -> bool:
+        """
+        Remember Cypher that answered the question; call only after it executed without error.
+
+        Returns:
+            Whether the plan was cached
+        """
+        if not self.enabled:
+            return False
+        base, location = self.split_location(question)
+        tokens = self.tokens(base)
+        template = cypher if location is None else self.parameterize(cypher, location)
+        if not tokens or template is None:
+            with self._lock:
+                self._metrics["not_cacheable"] += 1
+            return False
+        located = location is not None
+        key = self._key(tokens, located)
+        plan = _Plan(key, template, located, tokens, self._signature(" ".join(sorted(tokens))), self._version(), time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = plan
+            for band_key in self._band_keys(plan.signature):
+                self._buckets.setdefault(band_key, set()).add(key)
+            self._metrics["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._metrics["evictions"] += 1
+        return True
+
+    def discard(self, question: str, cypher: str) -> None:
+        """Drop the plan that was served for the question, after it failed to execute."""
+        with self._lock:
+            for key, plan in list(self._entries.items()):
+                if plan.cypher == cypher:
+                    self._remove(key)
+                    self._metrics["discarded"] += 1
+        logger.warning(f"Discarded cached Cypher plan for question: {question}")
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {**self._metrics, "entries": len(self._entries), "enabled": self.enabled}
+
+
+cypher_plan_cache = CypherPlanCache.from_env()
@@ -0,0 +1,179 @@
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from openai import AzureOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from service.token_count import get_token_counter
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Properties the collection's `default` vector is built from
+VECTOR_SOURCE_PROPERTIES = ["rawText", "caseName"]
+
+
+class EmbeddingCache:
+    """
+    On-disk vector cache keyed by a hash of the embedded text and the model.
+
+    Vectors are stored as float32 blobs in SQLite, so re-indexing a collection or a
+    tenant reuses them instead of calling the embedding API again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(text: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # Stay under SQLite's host parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, entries: Dict[str, List[float]], model: str) -> None:
+        if not entries:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                [(key, model, array("f", vector).tobytes()) for key, vector in entries.items()]
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingService:
+    """
+    Client-side batch embeddings with the same Azure OpenAI deployment the collection's
+    `text2vec_azure_openai` vectorizer uses, so vectors land in the same space as queries.
+    """
+
+    MAX_RETRIES = 5
+
+    def __init__(
+        self,
+        batch_size: int = 64,
+        max_batch_tokens: int = 250000,
+        cache_path: Optional[str] = None,
+        use_cache: bool = True,
+    ):
+        self.deployment_id = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+        self.client = AzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_EMBEDDING_API_KEY"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_version=os.getenv("AZURE_OPENAI_EMBEDDING_VERSION")
+        )
+        self.batch_size = max(1, batch_size)
+        self.max_batch_tokens = max_batch_tokens
+        self.token_counter = get_token_counter("cl100k_base")
+        self.cache = EmbeddingCache(cache_path or os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")) if use_cache else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @staticmethod
+    def vector_text(chunk: dict) -> str:
+        """
+        Text for a chunk's `default` vector, built the way the text2vec module builds it:
+        the string values of the source properties, sorted by property name and joined
+        with spaces, without property names and without lowercasing.
+
+        This matches the server only when the collection is not configured to vectorize
+        its name; `WeaviateService.accepts_client_vectors` checks that before vectors from
+        here are uploaded.
+        """
+        return " ".join(chunk[name] for name in sorted(VECTOR_SOURCE_PROPERTIES) if isinstance(chunk.get(name), str))
+
+    def _batches(self, texts: List[str]):
+        """Group texts so each request stays within both the input and the token budget."""
+        batch, batch_tokens = [], 0
+        for index, text in enumerate(texts):
+            tokens = self.token_counter.count(text)
+            if batch and (len(batch) >= self.batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(index)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def _create(self, inputs: List[str]) -> List[List[float]]:
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                response = self.client.embeddings.create(input=inputs, model=self.deployment_id)
+                return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            except (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError) as e:
+                if attempt == self.MAX_RETRIES - 1:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"Embedding request for {len(inputs)} inputs failed ({e}); retrying in {delay}s")
+                time.sleep(delay)
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many texts, reusing cached vectors and batching the rest.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of vectors in the same order as `texts`
+        """
+        keys = [EmbeddingCache.key(text, self.deployment_id) for text in texts]
+        cached = self.cache.get_many(list(set(keys))) if self.cache is not None else {}
+        vectors: List[Optional[List[float]]] = [cached.get(key) for key in keys]
+
+        # Identical texts are embedded once
+        missing: Dict[str, int] = {}
+        for index, vector in enumerate(vectors):
+            if vector is None and keys[index] not in missing:
+                missing[keys[index]] = index
+        self.cache_hits += len(texts) - len(missing)
+        self.cache_misses += len(missing)
+
+        pending = list(missing.values())
+        embedded_by_key: Dict[str, List[float]] = {}
+        for batch in self._batches([texts[index] for index in pending]):
+            indexes = [pending[i] for i in batch]
+            embedded = self._create([texts[index] for index in indexes])
+            fresh = {keys[index]: vector for index, vector in zip(indexes, embedded)}
+            if self.cache is not None:
+                self.cache.put_many(fresh, self.deployment_id)
+            embedded_by_key.update(fresh)
+
+        if embedded_by_key:
+            vectors = [vector if vector is not None else embedded_by_key[key] for key, vector in zip(keys, vectors)]
+
+        logger.info(f"Embedded {len(texts)} texts: {len(texts) - len(missing)} from cache, {len(missing)} requested")
+        return vectors
+
+    def embed_chunks(self, chunks: List[dict]) -> List[List[float]]:
+        return self.embed_texts([self.vector_text(chunk) for chunk in chunks])
+
+    def close(self) -> None:
+        if self.cache is not None:
+            self.cache.close()
@@ -1,17 +1,42 @@
 import os
 import logging
 from dotenv import load_dotenv
+import asyncio
 import openai
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, AsyncGraphDatabase
 from langchain_neo4j import Neo4jGraph
 import json
 
 import re
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from service.referenceDataCache import reference_data_cache
+from service.cypherPlanCache import cypher_plan_cache
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CYPHER_EXAMPLES = [
+    # 1. List all Classes under Plan Care Gold DNE with Dental- Individual
+    "USER INPUT: 'list all Classes under Plan Care Gold DNE with Dental- Individual' QUERY: MATCH (off:Offering)-[:FOR_PLAN]->(pl:Plan {name:'Care Gold DNE with Dental- Individual'}), (off)-[:FOR_CLASS]->(cl:Class) RETURN DISTINCT cl.name AS className;",
+
+    # 2. Find Providers offering Class Gold under Plan Care Gold DNE with Dental- Individual in Region Dubai
+    "USER INPUT: 'find Providers offering Class Premium Healthcare Plus under Plan Care Gold DNE with Dental- Individual in Region Dubai' QUERY: MATCH (prov:Provider)-[:HAS_OFFERING]->(off:Offering)-[:FOR_PLAN]->(pl:Plan {name:'Care Gold DNE with Dental- Individual'}), (off)-[:FOR_CLASS]->(cl:Class {name:'Premium Healthcare Plus'}), (off)-[:IN_REGION]->(r:Region {name:'Dubai'}) RETURN prov.name_en AS name, off.CopayOverridePercent AS copayPercent;",
+
+    # 3. Get copay override details for a specific Provider-Plan-Class-Region combination
+    "USER INPUT: 'get copay override details for Advanced Diagnostics Center under Plan Care Gold DNE with Dental- Individual for Class Premium Healthcare Plus in Region Dubai' QUERY: MATCH (prov:Provider {name_en:'Advanced Diagnostics Center'})-[:HAS_OFFERING]->(off:Offering)-[:FOR_PLAN]->(pl:Plan {name:'Care Gold DNE with Dental- Individual'}), (off)-[:FOR_CLASS]->(cl:Class {name:'Premium Healthcare Plus'}), (off)-[:IN_REGION]->(r:Region {name:'Dubai'}) RETURN off.CopayOverridePercent AS percent, off.CopayOverrideMaxAmount AS maxAED, off.CopayOverrideAmount AS amountAED;",
+
+    # 4. List all Services provided by Provider P123
+    "USER INPUT: 'what Services does Dubai International Dental Center offer?' QUERY: MATCH (prov:Provider {name_en:'Dubai International Dental Center'})-[:SERVICES]->(srv:Service) RETURN srv.name AS service;",
+
+    # 5. List all providers that include dental service
+    "USER INPUT: 'which Providers include dental service?' QUERY: MATCH (prov:Provider)-[:SERVICES]->(srv:Service {name:'Dental'}) RETURN prov.id AS providerId, prov.name_en AS name;",
+
+    # 6. Find all Providers of type Hospital in Subregion Dubai Marina
+    "USER INPUT: 'list all Hospital Providers in Subregion 'Dubai Marina' QUERY: MATCH a=(prov:Provider)-[:HAS_TYPE]->(pt:ProviderType {name:'HOSPITAL'}) ,(prov)-[:LOCATED_IN]->(s:Subregion {name:'Dubai Marina'}) RETURN prov.id AS providerId, prov.name_en AS name;"
+    # 7. Hospital located near users location
+    "USER INPUT: 'Which hospitals are located near me?' QUERY: MATCH (prov:Provider)-[:HAS_TYPE]-(pt:ProviderType {name:'HOSPITAL'}) WITH prov, point.distance(point({latitude:24.5021, longitude:54.3941}), prov.coords) AS dist RETURN prov.id AS providerId, prov.name_en AS name, prov.address AS address, dist ORDER BY dist ASC LIMIT 5;"
+]
 
 
 class GraphRAGService:
@@ -77,19 +102,60 @@ class GraphRAGService:
             result = session.run(query)
             return [record["value"] for record in result]
 
+    def reference_data_query(self) -> str:
+        """All REFDATA_QUERIES in one statement: one row per alias, with its distinct values in order."""
+        return "\nUNION ALL\n".join(
+            f"MATCH (n:{label}) WHERE n.{prop} IS NOT NULL WITH DISTINCT n.{prop} AS value ORDER BY value "
+            f"RETURN '{alias}' AS alias, collect(value) AS values"
+            for label, prop, alias in self.REFDATA_QUERIES
+        )
+
+    def reference_fingerprint_query(self) -> str:
+        """Node counts of the reference data labels; answered from the count store without a scan."""
+        labels = sorted({label for label, _, _ in self.REFDATA_QUERIES})
+        return "\nUNION ALL\n".join(f"MATCH (n:{label}) RETURN '{label}' AS label, count(n) AS count" for label in labels)
+
+    @staticmethod
+    def fingerprint_from_records(records) -> Tuple:
+        return tuple((record["label"], record["count"]) for record in records)
+
+    def render_reference_data(self, records) -> Dict[str, str]:
+        """The allowed_values string and the Cypher system prompt built from the batched reference data rows."""
+        values = {record["alias"]: record["values"] for record in records}
+        allowed_values = "\n".join(self.allowed_values_line(alias, values.get(alias, [])) for _, _, alias in self.REFDATA_QUERIES)
+        return {
+            "allowed_values": allowed_values,
+            "system_prompt": self.get_system_message(schema=self.graph.schema, examples=CYPHER_EXAMPLES, allowed_values=allowed_values),
+        }
+
+    def reference_fingerprint(self) -> Tuple:
+        records, _, _ = self.driver.execute_query(self.reference_fingerprint_query())
+        return self.fingerprint_from_records(records)
+
+    def load_reference_data(self) -> Tuple[Dict[str, str], Tuple]:
+        # Fingerprint first, so a change landing during the load is seen by the next check
+        fingerprint = self.reference_fingerprint()
+        if reference_data_cache.loaded:
+            # The schema can have changed along with the data
+            self.graph.refresh_schema()
+        records, _, _ = self.driver.execute_query(self.reference_data_query())
+        return self.render_reference_data(records), fingerprint
+
+    def reference_data(self) -> Dict[str, str]:
+        """Cached allowed_values and rendered system prompt, reloaded on TTL or when the graph changes."""
+        return reference_data_cache.get(self.load_reference_data, self.reference_fingerprint)
+
     def build_allowed_values(self) -> str:
         """
-        Query all reference data properties and construct the allowed_values string.
+        The allowed_values string for the Cypher prompt, from the reference data cache.
         """
-        lines = []
-        for label, prop, alias in self.REFDATA_QUERIES:
-            values = self.get_distinct_values(label, prop)
-            # Filter out None and NaN values from the list before joining
-            filtered_values = [str(v) for v in values if v is not None and str(v).lower() != "nan"]
-            prop_line = f"- {alias}: {', '.join(filtered_values)}"
-            lines.append(prop_line)
+        return self.reference_data()["allowed_values"]
 
-        return "\n".join(lines)
+    @staticmethod
+    def allowed_values_line(alias: str, values: List) -> str:
+        # Filter out None and NaN values from the list before joining
+        filtered_values = [str(v) for v in values if v is not None and str(v).lower() != "nan"]
+        return f"- {alias}: {', '.join(filtered_values)}"
 
     def get_system_message(self, schema,examples:List,allowed_values:str) -> str:
         system = """
@@ -131,10 +197,17 @@ class GraphRAGService:
                  """
         return system
     
-    def construct_cypher(self,question: str,examples:List,allowed_values:str,history:Dict) -> str:
-        messages = [{"role": "system", "content": self.get_system_message(schema=self.graph.schema,examples=examples,allowed_values=allowed_values)}]
+    def cypher_system_message(self, examples: List, allowed_values: str) -> str:
+        """The precomputed system prompt when it was rendered from the same inputs, else a freshly built one."""
+        cached = reference_data_cache.peek()
+        if cached is not None and examples is CYPHER_EXAMPLES and allowed_values == cached["allowed_values"]:
+            return cached["system_prompt"]
+        return self.get_system_message(schema=self.graph.schema, examples=examples, allowed_values=allowed_values)
+
+    def cypher_messages(self,question: str,examples:List,allowed_values:str,history:List) -> List[Dict]:
+        messages = [{"role": "system", "content": self.cypher_system_message(examples, allowed_values)}]
         if history:
-            messages.append(history)
+            messages.extend(history)
         messages.append(
             {
                 "role": "user",
@@ -143,16 +216,42 @@ class GraphRAGService:
         )
         logger.info(
             [el for el in messages if not el["role"] == "system"])
-        output = self.achat(messages, model="gpt-4.1")
+        return messages
+
+    def construct_cypher(self,question: str,examples:List,allowed_values:str,history:List) -> str:
+        output = self.achat(self.cypher_messages(question, examples, allowed_values, history), model="gpt-4.1")
         return output
     
     def remove_relationship_direction(self,cypher:str) -> str:
         return cypher.replace("->", "-").replace("<-", "-")
+
+    def extract_cypher(self, output: str) -> Optional[str]:
+        """The Cypher statement in a model reply, or None when the reply has none."""
+        # finds the first string wrapped in triple backticks. Where the match include the backticks and the first group in the match is the cypher
+        match = re.search(r"```([\w\W]*?)```", output)
+
+        # If the LLM didn't any Cypher statement (error, missing context, etc..)
+        if match is None:
+            return None
+        extracted_cypher = match.group(1)
+
+        if self.ignore_relationship_direction:
+            extracted_cypher = self.remove_relationship_direction(extracted_cypher)
+        return extracted_cypher
+
+    def heal_history(self, question: str, allowed_values: str, cypher: str, error_msg: str) -> List[Dict]:
+        # Feed error back to LLM + original cypher for healing
+        return [
+            {"role": "system", "content": self.cypher_system_message(CYPHER_EXAMPLES, allowed_values)},
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": cypher},
+            {"role": "system", "content": f"Error from database: {error_msg}"}
+        ]
     
 
 
     def run(self,
-            question: str, history: List = [], heal_cypher: bool = True
+            question: str, history: List = [], heal_cypher: bool = True, allowed_values: Optional[str] = None
            ) -> Dict[str, Union[str, List[Dict[str, Any]]]]:
             # Add prefix if not part of self-heal loop
             final_question = (
@@ -160,41 +259,29 @@ class GraphRAGService:
                 if heal_cypher
                 else question
             )
-            examples = [
-                # 1. List all Classes under Plan Care Gold DNE with Dental- Individual
-                "USER INPUT: 'list all Classes under Plan Care Gold DNE with Dental- Individual' QUERY: MATCH (off:Offering)-[:FOR_PLAN]->(pl:Plan {name:'Care Gold DNE with Dental- Individual'}), (off)-[:FOR_CLASS]->(cl:Class) RETURN DISTINCT cl.name AS className;",
-
-                # 2. Find Providers offering Class Gold under Plan Care Gold DNE with Dental- Individual in Region Dubai
-                "USER INPUT: 'find Providers offering Class Premium Healthcare Plus under Plan Care Gold DNE with Dental- Individual in Region Dubai' QUERY: MATCH (prov:Provider)-[:HAS_OFFERING]->(off:Offering)-[:FOR_PLAN]->(pl:Plan {name:'Care Gold DNE with Dental- Individual'}), (off)-[:FOR_CLASS]->(cl:Class {name:'Premium Healthcare Plus'}), (off)-[:IN_REGION]->(r:Region {name:'Dubai'}) RETURN prov.name_en AS name, off.CopayOverridePercent AS copayPercent;",
-
-                # 3. Get copay override details for a specific Provider-Plan-Class-Region combination
-                "USER INPUT: 'get copay override details for Advanced Diagnostics Center under Plan Care Gold DNE with Dental- Individual for Class Premium Healthcare Plus in Region Dubai' QUERY: MATCH (prov:Provider {name_en:'Advanced Diagnostics Center'})-[:HAS_OFFERING]->(off:Offering)-[:FOR_PLAN]->(pl:Plan {name:'Care Gold DNE with Dental- Individual'}), (off)-[:FOR_CLASS]->(cl:Class {name:'Premium Healthcare Plus'}), (off)-[:IN_REGION]->(r:Region {name:'Dubai'}) RETURN off.CopayOverridePercent AS percent, off.CopayOverrideMaxAmount AS maxAED, off.CopayOverrideAmount AS amountAED;",
-
-                # 4. List all Services provided by Provider P123
-                "USER INPUT: 'what Services does Dubai International Dental Center offer?' QUERY: MATCH (prov:Provider {name_en:'Dubai International Dental Center'})-[:SERVICES]->(srv:Service) RETURN srv.name AS service;",
-
-                # 5. List all providers that include dental service
-                "USER INPUT: 'which Providers include dental service?' QUERY: MATCH (prov:Provider)-[:SERVICES]->(srv:Service {name:'Dental'}) RETURN prov.id AS providerId, prov.name_en AS name;",
-
-                # 6. Find all Providers of type Hospital in Subregion Dubai Marina
-                "USER INPUT: 'list all Hospital Providers in Subregion 'Dubai Marina' QUERY: MATCH a=(prov:Provider)-[:HAS_TYPE]->(pt:ProviderType {name:'HOSPITAL'}) ,(prov)-[:LOCATED_IN]->(s:Subregion {name:'Dubai Marina'}) RETURN prov.id AS providerId, prov.name_en AS name;"
-                # 7. Hospital located near users location
-                "USER INPUT: 'Which hospitals are located near me?' QUERY: MATCH (prov:Provider)-[:HAS_TYPE]-(pt:ProviderType {name:'HOSPITAL'}) WITH prov, point.distance(point({latitude:24.5021, longitude:54.3941}), prov.coords) AS dist RETURN prov.id AS providerId, prov.name_en AS name, prov.address AS address, dist ORDER BY dist ASC LIMIT 5;"
-            ]
-
-            allowed_values = self.build_allowed_values()
+            examples = CYPHER_EXAMPLES
+
+            # Repeat questions reuse Cypher that already ran, without calling the model
+            if heal_cypher and not history:
+                plan = cypher_plan_cache.lookup(question)
+                if plan is not None:
+                    cached_cypher, parameters = plan
+                    try:
+                        output = self.driver.execute_query(cached_cypher, parameters)
+                        logger.info(f"Cached cypher: {cached_cypher}")
+                        return {"output": output, "generated_cypher": cached_cypher}
+                    except Exception as e:
+                        logger.warning(f"Cached cypher failed, generating a new one: {str(e)}")
+                        cypher_plan_cache.discard(question, cached_cypher)
+
+            # Callers may fetch the reference data ahead of time, concurrently with other work
+            if allowed_values is None:
+                allowed_values = self.build_allowed_values()
 
             cypher =  self.construct_cypher(question=final_question, examples=examples, allowed_values=allowed_values,history=history)
-            # finds the first string wrapped in triple backticks. Where the match include the backticks and the first group in the match is the cypher
-            match = re.search(r"```([\w\W]*?)```", cypher)
-
-            # If the LLM didn't any Cypher statement (error, missing context, etc..)
-            if match is None:
+            extracted_cypher = self.extract_cypher(cypher)
+            if extracted_cypher is None:
                 return {"output": [{"message": cypher}], "generated_cypher": None}
-            extracted_cypher = match.group(1)
-
-            if self.ignore_relationship_direction:
-                extracted_cypher = self.remove_relationship_direction(extracted_cypher)
 
             logger.info(
                 f"Generated cypher: {extracted_cypher}")
@@ -206,18 +293,14 @@ class GraphRAGService:
                 logging.error(f"Driver error: {error_msg}")
 
                 if heal_cypher:
-                    # Feed error back to LLM + original cypher for healing
-                    heal_history = [
-                        {"role": "system", "content": self.get_system_message(schema=self.graph.schema,examples=examples,allowed_values=allowed_values)},
-                        {"role": "user", "content": question},
-                        {"role": "assistant", "content": extracted_cypher},
-                        {"role": "system", "content": f"Error from database: {error_msg}"}
-                    ]
-                    return self.run(question, history=heal_history, heal_cypher=False)
+                    heal_history = self.heal_history(question, allowed_values, extracted_cypher, error_msg)
+                    return self.run(question, history=heal_history, heal_cypher=False, allowed_values=allowed_values)
 
                 # If already healed once, just return the error
                 return {"output": [{"message": error_msg}], "generated_cypher": extracted_cypher }
             logger.info(f"Cypher output: {output}")
+            if getattr(output, "records", None):
+                cypher_plan_cache.store(question, extracted_cypher)
 
             return {
                 "output": output,
@@ -245,7 +328,7 @@ class GraphRAGService:
 
         return results_json
 
-    def useNLP(self,user_question, neo4j_results):
+    def nlp_messages(self, user_question, neo4j_results) -> List[Dict]:
         system_prompt = """
     You are a helpful assistant that takes a user's original question and the corresponding structured Neo4j query results, and responds in a natural, human-readable format.
 
@@ -280,18 +363,16 @@ class GraphRAGService:
             {"role": "user", "content": f"User Question: {user_question}\n\nQuery Results: {neo4j_results}"}
         ]
         logger.info(f"Messages for explanation: {messages}")
-        response = self.achat(messages)
+        return messages
+
+    def useNLP(self,user_question, neo4j_results):
+        response = self.achat(self.nlp_messages(user_question, neo4j_results))
         return response
 
-    def generate(self, rewritten_data: Dict,metadata:Dict, heal_cypher: bool = True,) -> str:
-        """
-        Generate a response based on the request.
-        This function handles the chat completion and streaming of responses.
-        """
-        user_question = rewritten_data.get("rewrittenQuery", ""
-                                           )
+    def graph_question(self, rewritten_data: Dict, metadata: Dict) -> str:
+        """The rewritten question, with the user's location appended for location questions."""
+        user_question = rewritten_data.get("rewrittenQuery", "")
         if not user_question:
-            logger.error("No user question provided in the request.")
             return ""
         locationQuestion = rewritten_data.get("isUserLocationQuestion", "")
         lattitude = metadata.get("lattitude", "24.5021")
@@ -299,10 +380,22 @@ class GraphRAGService:
         if(locationQuestion == "True"):
             user_question += f" with location lattidute: {lattitude}, longitude:{longitude}"
             logger.info("User question is related to location, add location from metadata ")
+        return user_question
+
+    def generate(self, rewritten_data: Dict,metadata:Dict, heal_cypher: bool = True, allowed_values: Optional[str] = None) -> str:
+        """
+        Generate a response based on the request.
+        This function handles the chat completion and streaming of responses.
+        `allowed_values` is the output of `build_allowed_values`; it is fetched here when not given.
+        """
+        user_question = self.graph_question(rewritten_data, metadata)
+        if not user_question:
+            logger.error("No user question provided in the request.")
+            return ""
             
         logger.info(f"Generating response for question: {user_question}")
         try:
-            graph_rag_output =  self.run(user_question, history=[])
+            graph_rag_output =  self.run(user_question, history=[], heal_cypher=heal_cypher, allowed_values=allowed_values)
             logger.info("Graph RAG output:%s", graph_rag_output)
             neo4j_results = self.extract_records(graph_rag_output)
             logger.info(f"Extracted Neo4j results: {neo4j_results}")
@@ -318,3 +411,113 @@ class GraphRAGService:
             logger.error(f"Error generating response: {str(e)}")
             return ""
 
+
+class AsyncGraphRAGService(GraphRAGService):
+    """
+    `GraphRAGService` on the async Neo4j driver and `AsyncAzureOpenAI`.
+
+    Prompts, Cypher extraction, healing and the reference data cache are shared with the
+    sync service. The graph schema is still read through the sync `Neo4jGraph`, at
+    startup and when the reference data is reloaded.
+    """
+
+    def __init__(self, testing: bool = False):
+        super().__init__(testing=testing)
+        self.async_driver = AsyncGraphDatabase.driver(
+            os.environ["NEO4J_URI"],
+            auth=(os.environ["NEO4J_USERNAME"], os.environ["NEO4J_PASSWORD"]),
+        )
+        # Same endpoint and credentials the module-level client of `achat` resolves
+        self.async_chat_client = openai.AsyncAzureOpenAI(
+            api_key=self.openai_api_key,
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        )
+
+    async def achat_async(self, messages: List, model: str = None, temperature: int = 0, config: dict = {}) -> str:
+        model = model or self.deployment_name
+        response = await self.async_chat_client.chat.completions.create(
+            model=model,
+            temperature=temperature,
+            messages=messages,
+            **config,
+        )
+        return response.choices[0].message.content
+
+    async def reference_fingerprint_async(self) -> Tuple:
+        records, _, _ = await self.async_driver.execute_query(self.reference_fingerprint_query())
+        return self.fingerprint_from_records(records)
+
+    async def load_reference_data_async(self) -> Tuple[Dict[str, str], Tuple]:
+        fingerprint = await self.reference_fingerprint_async()
+        if reference_data_cache.loaded:
+            await asyncio.to_thread(self.graph.refresh_schema)
+        records, _, _ = await self.async_driver.execute_query(self.reference_data_query())
+        return self.render_reference_data(records), fingerprint
+
+    async def build_allowed_values_async(self) -> str:
+        """Async `build_allowed_values`; shares the reference data cache with the sync service."""
+        reference_data = await reference_data_cache.get_async(self.load_reference_data_async, self.reference_fingerprint_async)
+        return reference_data["allowed_values"]
+
+    async def run_async(self, question: str, history: List = [], heal_cypher: bool = True, allowed_values: Optional[str] = None) -> Dict[str, Any]:
+        """Async `run`."""
+        final_question = "Question to be converted to Cypher: " + question if heal_cypher else question
+        if heal_cypher and not history:
+            plan = cypher_plan_cache.lookup(question)
+            if plan is not None:
+                cached_cypher, parameters = plan
+                try:
+                    output = await self.async_driver.execute_query(cached_cypher, parameters)
+                    logger.info(f"Cached cypher: {cached_cypher}")
+                    return {"output": output, "generated_cypher": cached_cypher}
+                except Exception as e:
+                    logger.warning(f"Cached cypher failed, generating a new one: {str(e)}")
+                    cypher_plan_cache.discard(question, cached_cypher)
+        if allowed_values is None:
+            allowed_values = await self.build_allowed_values_async()
+
+        cypher = await self.achat_async(self.cypher_messages(final_question, CYPHER_EXAMPLES, allowed_values, history), model="gpt-4.1")
+        extracted_cypher = self.extract_cypher(cypher)
+        if extracted_cypher is None:
+            return {"output": [{"message": cypher}], "generated_cypher": None}
+
+        logger.info(f"Generated cypher: {extracted_cypher}")
+        try:
+            output = await self.async_driver.execute_query(extracted_cypher)
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Driver error: {error_msg}")
+            if heal_cypher:
+                heal_history = self.heal_history(question, allowed_values, extracted_cypher, error_msg)
+                return await self.run_async(question, history=heal_history, heal_cypher=False, allowed_values=allowed_values)
+            return {"output": [{"message": error_msg}], "generated_cypher": extracted_cypher}
+        logger.info(f"Cypher output: {output}")
+        if getattr(output, "records", None):
+            cypher_plan_cache.store(question, extracted_cypher)
+        return {"output": output, "generated_cypher": extracted_cypher}
+
+    async def generate_async(self, rewritten_data: Dict, metadata: Dict, heal_cypher: bool = True, allowed_values: Optional[str] = None) -> str:
+        """Async `generate`."""
+        user_question = self.graph_question(rewritten_data, metadata)
+        if not user_question:
+            logger.error("No user question provided in the request.")
+            return ""
+
+        logger.info(f"Generating response for question: {user_question}")
+        try:
+            graph_rag_output = await self.run_async(user_question, history=[], heal_cypher=heal_cypher, allowed_values=allowed_values)
+            neo4j_results = self.extract_records(graph_rag_output)
+            if self.testing:
+                explanation = await self.achat_async(self.nlp_messages(user_question, neo4j_results))
+                logger.info(f"Generated explanation: {explanation}")
+                return explanation
+            return neo4j_results
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            return ""
+
+    async def close_async(self) -> None:
+        await self.async_driver.close()
+        await self.async_chat_client.close()
+        self.driver.close()
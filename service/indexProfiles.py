@@ -0,0 +1,113 @@
+import os
+import logging
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+from weaviate.classes import config as Config
+from weaviate.collections.classes.config_vector_index import _VectorIndexConfigCreate as VectorIndexConfig
+from weaviate.collections.classes.config_base import _QuantizerConfigCreate as QuantizerConfig
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Vector index profiles: name -> (index type, compression)
+#   hnsw-bq   HNSW with binary quantization and rescoring; the original schema
+#   hnsw      HNSW on full vectors; most memory, best recall
+#   hnsw-pq   HNSW with product quantization, trained once the shard holds pq_training_limit vectors
+#   flat-bq   Brute force over BQ codes with rescoring; no graph to build, for small tenants
+#   flat      Brute force on full vectors; exact
+#   dynamic   Flat with BQ until a tenant reaches dynamic_threshold objects, then HNSW with BQ.
+#             Each tenant switches on its own. The server needs ASYNC_INDEXING=true.
+INDEX_PROFILES = {
+    "hnsw-bq": ("hnsw", "bq"),
+    "hnsw": ("hnsw", None),
+    "hnsw-pq": ("hnsw", "pq"),
+    "flat-bq": ("flat", "bq"),
+    "flat": ("flat", None),
+    "dynamic": ("dynamic", "bq"),
+}
+
+DEFAULT_INDEX_PROFILE = "hnsw-bq"
+BQ_RESCORE_LIMIT = 200
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+
+def index_profile_name(profile: Optional[str] = None) -> str:
+    """Profile to use: `profile`, else the WEAVIATE_INDEX_PROFILE env var, else the default."""
+    name = (profile or os.getenv("WEAVIATE_INDEX_PROFILE") or DEFAULT_INDEX_PROFILE).lower()
+    if name not in INDEX_PROFILES:
+        raise ValueError(f"Unknown index profile '{name}'. Choose from {sorted(INDEX_PROFILES)}")
+    return name
+
+
+def _quantizer(compression: Optional[str], rescore_limit: int, pq_training_limit: Optional[int]) -> Optional[QuantizerConfig]:
+    if compression == "bq":
+        return Config.Configure.VectorIndex.Quantizer.bq(rescore_limit=rescore_limit)
+    if compression == "pq":
+        return Config.Configure.VectorIndex.Quantizer.pq(training_limit=pq_training_limit)
+    return None
+
+
+def vector_index_config(
+    profile: Optional[str] = None,
+    ef: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    max_connections: Optional[int] = None,
+    rescore_limit: int = BQ_RESCORE_LIMIT,
+    pq_training_limit: Optional[int] = None,
+    dynamic_threshold: Optional[int] = None,
+) -> VectorIndexConfig:
+    """
+    Build the vector index configuration for a profile.
+
+    HNSW parameters left as None fall back to the WEAVIATE_HNSW_EF, WEAVIATE_HNSW_EF_CONSTRUCTION
+    and WEAVIATE_HNSW_MAX_CONNECTIONS env vars, then to Weaviate's defaults (dynamic ef,
+    efConstruction 128, maxConnections 32). They are ignored by the flat profiles.
+
+    Args:
+        profile: Name from INDEX_PROFILES; defaults to WEAVIATE_INDEX_PROFILE
+        ef: Query-time candidate list size; -1 lets Weaviate pick it from the limit
+        ef_construction: Build-time candidate list size
+        max_connections: Graph edges per node
+        rescore_limit: Full-vector candidates rescored after a BQ search
+        pq_training_limit: Vectors per shard before PQ is trained (WEAVIATE_PQ_TRAINING_LIMIT)
+        dynamic_threshold: Objects per tenant before a dynamic index switches to HNSW (WEAVIATE_DYNAMIC_THRESHOLD)
+
+    Returns:
+        Configuration to pass as `vector_index_config` when creating a collection
+    """
+    index_type, compression = INDEX_PROFILES[index_profile_name(profile)]
+    quantizer = _quantizer(compression, rescore_limit, pq_training_limit if pq_training_limit is not None else _env_int("WEAVIATE_PQ_TRAINING_LIMIT"))
+
+    def hnsw() -> VectorIndexConfig:
+        return Config.Configure.VectorIndex.hnsw(
+            ef=ef if ef is not None else _env_int("WEAVIATE_HNSW_EF"),
+            ef_construction=ef_construction if ef_construction is not None else _env_int("WEAVIATE_HNSW_EF_CONSTRUCTION"),
+            max_connections=max_connections if max_connections is not None else _env_int("WEAVIATE_HNSW_MAX_CONNECTIONS"),
+            quantizer=quantizer,
+        )
+
+    if index_type == "hnsw":
+        return hnsw()
+    if index_type == "flat":
+        return Config.Configure.VectorIndex.flat(quantizer=quantizer)
+    return Config.Configure.VectorIndex.dynamic(
+        threshold=dynamic_threshold if dynamic_threshold is not None else _env_int("WEAVIATE_DYNAMIC_THRESHOLD"),
+        hnsw=hnsw(),
+        flat=Config.Configure.VectorIndex.flat(quantizer=quantizer),
+    )
+
+
+def index_signature(index_config) -> Tuple[str, Optional[str]]:
+    """(index type, compression) of a vector index config read back from Weaviate."""
+    index_type = type(index_config).__name__.lower()
+    if "dynamic" in index_type:
+        # Compression is set on the flat and HNSW halves; the flat half is what a new tenant uses
+        return "dynamic", index_signature(index_config.flat)[1] if getattr(index_config, "flat", None) else None
+    quantizer = type(getattr(index_config, "quantizer", None)).__name__.lower()
+    compression = next((name for name in ("bq", "pq", "sq") if name in quantizer), None)
+    return ("flat" if "flat" in index_type else "hnsw"), compression
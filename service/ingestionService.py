@@ -0,0 +1,524 @@
+import os
+import json
+import queue
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from service.token_count import EMBEDDING_TOKEN_LIMIT, get_token_counter
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+PAGE_BREAK = "\f"
+
+
+class IngestionCheckpoint:
+    """
+    Persists the ingestion cursor to a small JSON file so an interrupted run
+    can resume from the last fully written page instead of page_start.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def run_key(doc_type: str, page_size: int, jurisdiction_code: Optional[str]) -> str:
+        return f"{doc_type}:{jurisdiction_code or '*'}:{page_size}"
+
+    def _read_all(self) -> Dict[str, Any]:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable ingestion checkpoint {self.path}: {e}")
+            return {}
+
+    def load(self, run_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._read_all().get(run_key)
+
+    def save(self, run_key: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            data = self._read_all()
+            data[run_key] = {**state, "updated_at": datetime.utcnow().isoformat()}
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+    def clear(self, run_key: str) -> None:
+        with self._lock:
+            data = self._read_all()
+            if data.pop(run_key, None) is not None:
+                tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+                tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+                os.replace(tmp_path, self.path)
+
+
+class KnownHashCache:
+    """
+    Append-only local set of document hashes known to be present in both Mongo
+    and Weaviate. Lets repeated ingests skip known content without querying
+    either store. Entries are namespaced by tenant and org.
+    """
+
+    def __init__(self, path: str, namespace: str):
+        self.path = Path(path)
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._hashes = set()
+        if self.path.exists():
+            prefix = f"{namespace}:"
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith(prefix):
+                        self._hashes.add(line[len(prefix):].strip())
+            logger.info(f"Loaded {len(self._hashes)} known document hashes from {self.path}")
+
+    def __contains__(self, md5Hash: str) -> bool:
+        return md5Hash in self._hashes
+
+    def add_many(self, hashes) -> None:
+        with self._lock:
+            new_hashes = [h for h in hashes if h not in self._hashes]
+            if not new_hashes:
+                return
+            self._hashes.update(new_hashes)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(f"{self.namespace}:{h}\n" for h in new_hashes)
+
+    @staticmethod
+    def clear(path: Optional[str] = None) -> None:
+        cache_path = Path(path or os.getenv("INGEST_HASH_CACHE_PATH", "ingest_known_hashes.txt"))
+        if cache_path.exists():
+            cache_path.unlink()
+            logger.info(f"Cleared known document hash cache {cache_path}")
+
+
+class _PageTracker:
+    """
+    Tracks outstanding files per page. Pages can finish out of order, so the
+    checkpoint only advances over the contiguous run of completed pages. A page
+    with a failed file never counts as completed for the checkpoint, so a resumed
+    run starts at the first such page and retries it.
+    """
+
+    def __init__(self, first_page: int, on_advance, on_complete):
+        self._lock = threading.Lock()
+        self._pending: Dict[int, int] = {}
+        self._sealed = set()
+        self._completed = set()
+        self.failed_pages = set()
+        self._next_page = first_page
+        self._on_advance = on_advance
+        self._on_complete = on_complete
+
+    def add(self, page: int, count: int = 1) -> None:
+        with self._lock:
+            self._pending[page] = self._pending.get(page, 0) + count
+
+    def seal(self, page: int) -> None:
+        with self._lock:
+            self._sealed.add(page)
+            self._maybe_complete(page)
+
+    def done(self, page: int, failed: bool = False) -> None:
+        with self._lock:
+            if failed:
+                self.failed_pages.add(page)
+            self._pending[page] -= 1
+            self._maybe_complete(page)
+
+    def _maybe_complete(self, page: int) -> None:
+        if page not in self._sealed or self._pending.get(page, 0) > 0:
+            return
+        self._sealed.discard(page)
+        self._pending.pop(page, None)
+        self._completed.add(page)
+        self._on_complete(page)
+        advanced = None
+        while self._next_page in self._completed and self._next_page not in self.failed_pages:
+            self._completed.discard(self._next_page)
+            advanced = self._next_page
+            self._next_page += 1
+        if advanced is not None:
+            self._on_advance(advanced)
+
+
+class IngestionService:
+    """
+    Bounded producer/consumer pipeline for bulk case ingestion.
+
+    Each page is read by an I/O pool and hashed on a CPU pool. Existence is
+    then resolved for the whole page at once: first against a local cache of
+    known hashes, then with a single Mongo `$in` query and a single Weaviate
+    `contains_any` aggregation. New documents are tokenized and split on the
+    CPU pool, and a single writer thread batches chunks from many documents
+    into Weaviate uploads. At most `max_pages_in_flight` pages are held in
+    memory at any time.
+    """
+
+    TOKEN_LIMIT = EMBEDDING_TOKEN_LIMIT
+
+    def __init__(
+        self,
+        doc_type: str,
+        source_model,
+        record_model,
+        weaviate_service,
+        blob_service,
+        io_workers: int = 8,
+        cpu_workers: int = 4,
+        write_batch_size: int = 200,
+        max_pages_in_flight: int = 2,
+        checkpoint_path: Optional[str] = None,
+        use_hash_cache: bool = True,
+        hash_cache_path: Optional[str] = None,
+        tenant_id: int = 1,
+        org_id: int = 1,
+        embedding_service=None,
+        prune_stale: bool = False,
+    ):
+        self.doc_type = doc_type
+        self.source_model = source_model
+        self.record_model = record_model
+        self.weaviate_service = weaviate_service
+        self.blob_service = blob_service
+        self.embedding_service = embedding_service
+        self.prune_stale = prune_stale
+        self.io_workers = max(1, io_workers)
+        self.cpu_workers = max(1, cpu_workers)
+        self.write_batch_size = max(1, write_batch_size)
+        self.max_pages_in_flight = max(1, max_pages_in_flight)
+        self.checkpoint = IngestionCheckpoint(checkpoint_path or os.getenv("INGEST_CHECKPOINT_PATH", "ingest_checkpoint.json"))
+        self.tenant_id = tenant_id
+        self.org_id = org_id
+        self.hash_cache = KnownHashCache(
+            hash_cache_path or os.getenv("INGEST_HASH_CACHE_PATH", "ingest_known_hashes.txt"),
+            namespace=f"{tenant_id}:{org_id}"
+        ) if use_hash_cache else None
+
+        self.container_name = os.getenv("DECISION_CONTAINER_NAME") if doc_type == 'decision' else os.getenv("APPEAL_CONTAINER_NAME")
+        self.local_path = os.getenv("LOCAL_PATH")
+        self.token_counter = get_token_counter("cl100k_base")
+
+        self._results_lock = threading.Lock()
+        self.processed_files: List[dict] = []
+        self.skipped_files: List[dict] = []
+
+        # Hashes claimed by a document that is being checked or written, across all pages in flight
+        self._in_flight_lock = threading.Lock()
+        self._in_flight_hashes = set()
+
+    # ------------------------------------------------------------------ #
+    # Bookkeeping
+    # ------------------------------------------------------------------ #
+
+    def _record_processed(self, md_path: str, reason: str = "Successfully ingested") -> None:
+        with self._results_lock:
+            self.processed_files.append({"filename": md_path, "reason": reason})
+
+    def _record_skipped(self, md_path: str, reason: str) -> None:
+        with self._results_lock:
+            self.skipped_files.append({"filename": md_path, "reason": reason})
+
+    def _finish(self, item: dict, failed: bool = False) -> None:
+        """Mark an item handled; failed items keep the checkpoint from moving past their page."""
+        if item.pop("claimed", False):
+            with self._in_flight_lock:
+                self._in_flight_hashes.discard(item["md5Hash"])
+        self._tracker.done(item["page"], failed)
+
+    def _claim(self, items: List[dict]) -> List[dict]:
+        """
+        Claim the hashes of a page's items; returns the items whose hash another item already holds.
+
+        A hash stays claimed until its item finishes, i.e. after its records are written. Claiming
+        before the existence queries means a copy on a later page either waits on the claim or
+        finds the committed records.
+        """
+        duplicates = []
+        with self._in_flight_lock:
+            for item in items:
+                if item["md5Hash"] in self._in_flight_hashes:
+                    duplicates.append(item)
+                else:
+                    self._in_flight_hashes.add(item["md5Hash"])
+                    item["claimed"] = True
+        return duplicates
+
+    def _remember(self, hashes) -> None:
+        if self.hash_cache is not None:
+            self.hash_cache.add_many(hashes)
+
+    # ------------------------------------------------------------------ #
+    # Stages
+    # ------------------------------------------------------------------ #
+
+    def _page_stream(self, page_size: int, jurisdiction_code: Optional[str], continuation_token: Optional[str], skip_pages: int):
+        """Keyset-paginated page stream; `skip_pages` is only used when there is no token to resume from."""
+        if self.doc_type == 'decision':
+            self.source_model.ensure_keyset_index()
+            return self.source_model.stream_decision_pages(page_size, jurisdiction_code, continuation_token, skip_pages)
+        return self.source_model.stream_appeal_pages(page_size, continuation_token, skip_pages)
+
+    def _local_file_path(self, md_path: str) -> Path:
+        db_path_clean = md_path.lstrip("/\\").replace("\\", "/")
+        return Path(self.local_path) / self.container_name / Path(db_path_clean)
+
+    @staticmethod
+    def _hash(full_text: str) -> str:
+        return hashlib.md5(full_text.encode('UTF-8')).hexdigest()
+
+    @staticmethod
+    def _split_pages(full_text: str) -> Optional[List[str]]:
+        """Pages of a converted judgment, when the conversion kept PDF page breaks as form feeds."""
+        return full_text.split(PAGE_BREAK) if PAGE_BREAK in full_text else None
+
+    def _build_chunks(self, full_text: str, doc, full_pdf_blob_path: str, md5Hash: str) -> List[dict]:
+        pages = self._split_pages(full_text)
+        if self.token_counter.exceeds(full_text, self.TOKEN_LIMIT, key=md5Hash):
+            return self.weaviate_service.chunk_and_embed_document(full_text, self.doc_type, doc, full_pdf_blob_path, md5Hash, self.org_id, pages=pages)
+        return self.weaviate_service.create_document_chunk(full_text, self.doc_type, doc, full_pdf_blob_path, md5Hash, self.org_id, pages=pages)
+
+    def _load_item(self, item: dict) -> Optional[dict]:
+        """I/O worker: read one markdown file and hash it on the CPU pool."""
+        doc, pdf_path, md_path = item["doc"], item["pdf_path"], item["md_path"]
+        try:
+            logger.info(f"Processing document: {doc.id} with pdf_path: {pdf_path} and md_path: {md_path}")
+            full_text = self.blob_service.fetch_files_locally(self._local_file_path(md_path))
+            if full_text is None:
+                logger.error(f"File content not found for md_path: {md_path}")
+                self._record_skipped(md_path, "File not found in Azure Blob Storage")
+                self._finish(item)
+                return None
+
+            md5Hash = self._cpu_pool.submit(self._hash, full_text).result()
+            item["full_text"] = full_text
+            item["md5Hash"] = md5Hash
+            item["document_record"] = {
+                "parentDocumentId": doc.id,
+                "documentHash": md5Hash,
+                "filename": md_path,
+                "blobUrl": f"{self.container_name}/{md_path}",
+                "clientId": self.tenant_id,
+                "orgId": self.org_id,
+                "type": self.doc_type,
+                "uploadedById": self.tenant_id,
+                "uploadedByName": "Meganexus"
+            }
+            return item
+        except Exception as e:
+            logger.error(f"Error processing file {md_path}: {e}")
+            self._record_skipped(md_path, str(e))
+            self._finish(item, failed=True)
+            return None
+
+    def _resolve_existing(self, hashes: set):
+        """Resolve which hashes already exist, with one round trip per store for the whole page."""
+        known = {h for h in hashes if self.hash_cache is not None and h in self.hash_cache}
+        unknown = list(hashes - known)
+        in_mongo, in_weaviate = set(), set()
+        if unknown:
+            in_mongo = self.record_model.get_existing_hashes(unknown, self.tenant_id, self.org_id)
+            in_weaviate = self.weaviate_service.get_existing_hashes(unknown, str(self.tenant_id))
+        logger.info(f"Dedup: {len(hashes)} hashes, {len(known)} cached, {len(in_mongo)} in mongo, {len(in_weaviate)} in weaviate")
+        return known, in_mongo, in_weaviate
+
+    def _prepare_write(self, item: dict, create_record: bool) -> None:
+        """CPU worker: tokenize and split one new document, then hand it to the writer."""
+        md_path = item["md_path"]
+        try:
+            full_text = item.pop("full_text")
+            full_pdf_blob_path = f"{self.container_name}/{item['pdf_path']}"
+            chunks = self._build_chunks(full_text, item["doc"], full_pdf_blob_path, item["md5Hash"])
+            self._write_queue.put({
+                "item": item,
+                "chunks": chunks,
+                "document_record": item["document_record"] if create_record else None,
+            })
+        except Exception as e:
+            logger.error(f"Error processing file {md_path}: {e}")
+            self._record_skipped(md_path, str(e))
+            self._finish(item, failed=True)
+
+    def _dispatch_page(self, items: List[dict]) -> None:
+        for item in self._claim(items):
+            # Same content as a document of this or an earlier page that is still in flight
+            logger.info(f"Document already ingested: {item['md_path']}")
+            self._record_skipped(item["md_path"], "Already ingested")
+            self._finish(item)
+        items = [item for item in items if item.get("claimed")]
+        known, in_mongo, in_weaviate = self._resolve_existing({item["md5Hash"] for item in items})
+
+        missing_records = []
+        for item in items:
+            md5Hash, md_path = item["md5Hash"], item["md_path"]
+            if md5Hash in known:
+                logger.info(f"Document already ingested: {md_path}")
+                self._record_skipped(md_path, "Already ingested")
+                self._finish(item)
+                continue
+
+            if md5Hash in in_weaviate:
+                if md5Hash not in in_mongo:
+                    logger.info(f"Document already exists in weaviate but not in caseRecordModel: {md_path}")
+                    missing_records.append(item)
+                    continue
+                logger.info(f"Document already exists in caseRecordModel and weaviate: {md_path}")
+                self._remember([md5Hash])
+                self._record_skipped(md_path, "Already ingested")
+                self._finish(item)
+                continue
+
+            if md5Hash in in_mongo:
+                logger.info(f"Document already exists in caseRecordModel but not in weaviate: {md_path}")
+            self._cpu_pool.submit(self._prepare_write, item, md5Hash not in in_mongo)
+
+        if missing_records:
+            try:
+                created = self.record_model.create_document_records([item["document_record"] for item in missing_records])
+                reason = "Already ingested" if created else "Failed to create document records"
+            except Exception as e:
+                logger.error(f"Error creating document records: {e}")
+                created, reason = False, str(e)
+            if created:
+                self._remember(item["md5Hash"] for item in missing_records)
+            for item in missing_records:
+                self._record_skipped(item["md_path"], reason)
+                self._finish(item, failed=not created)
+
+    def _flush(self, pending: List[dict]) -> None:
+        chunks = [chunk for entry in pending for chunk in entry["chunks"]]
+        try:
+            use_vectors = self.embedding_service is not None and self.weaviate_service.accepts_client_vectors()
+            vectors = self.embedding_service.embed_chunks(chunks) if use_vectors else None
+            self.weaviate_service.upload_documents(chunks, str(self.tenant_id), vectors=vectors, prune_stale=self.prune_stale)
+            records = [entry["document_record"] for entry in pending if entry["document_record"]]
+            records_created = self.record_model.create_document_records(records) if records else True
+        except Exception as e:
+            logger.error(f"Error uploading batch of {len(pending)} documents: {e}")
+            for entry in pending:
+                self._record_skipped(entry["item"]["md_path"], str(e))
+                self._finish(entry["item"], failed=True)
+            return
+
+        if not records_created:
+            # The chunks are in Weaviate; the next run finds them there and only creates the records
+            logger.error(f"Error creating document records for batch of {len(pending)} documents")
+            for entry in [entry for entry in pending if entry["document_record"]]:
+                self._record_skipped(entry["item"]["md_path"], "Failed to create document record")
+                self._finish(entry["item"], failed=True)
+            pending = [entry for entry in pending if not entry["document_record"]]
+
+        self._remember(entry["item"]["md5Hash"] for entry in pending)
+        for entry in pending:
+            self._record_processed(entry["item"]["md_path"])
+            logger.info(f"Uploaded document: {entry['item']['md_path']} to weaviate and id: {entry['item']['doc'].id}")
+            self._finish(entry["item"])
+
+    def _write_loop(self) -> None:
+        """Single writer: groups prepared documents into Weaviate batches."""
+        pending: List[dict] = []
+        pending_chunks = 0
+        while True:
+            try:
+                entry = self._write_queue.get(timeout=1.0)
+            except queue.Empty:
+                entry = None
+
+            if entry is _STOP:
+                break
+            if entry is not None:
+                pending.append(entry)
+                pending_chunks += len(entry["chunks"])
+
+            # Flush on a full batch, or when the pipeline has gone quiet
+            if pending and (pending_chunks >= self.write_batch_size or entry is None):
+                self._flush(pending)
+                pending, pending_chunks = [], 0
+
+        if pending:
+            self._flush(pending)
+
+    # ------------------------------------------------------------------ #
+    # Entry point
+    # ------------------------------------------------------------------ #
+
+    def run(self, page_start: int, page_end: int, page_size: int, jurisdiction_code: Optional[str] = None, resume: bool = True) -> dict:
+        run_key = IngestionCheckpoint.run_key(self.doc_type, page_size, jurisdiction_code)
+        continuation_token = None
+        if resume:
+            state = self.checkpoint.load(run_key)
+            if state and state.get("last_completed_page", 0) >= page_start:
+                logger.info(f"Resuming {run_key} after checkpointed page {state['last_completed_page']}")
+                page_start = state["last_completed_page"] + 1
+                continuation_token = state.get("continuation_token")
+
+        pages_in_flight = threading.BoundedSemaphore(self.max_pages_in_flight)
+        page_tokens: Dict[int, str] = {}
+
+        def on_advance(page: int) -> None:
+            self.checkpoint.save(run_key, {"last_completed_page": page, "continuation_token": page_tokens.get(page)})
+            for done_page in [p for p in list(page_tokens) if p <= page]:
+                page_tokens.pop(done_page, None)
+
+        self._tracker = _PageTracker(page_start, on_advance, on_complete=lambda page: pages_in_flight.release())
+        with self._in_flight_lock:
+            self._in_flight_hashes.clear()
+        self._write_queue: queue.Queue = queue.Queue(maxsize=self.cpu_workers * 4)
+        writer = threading.Thread(target=self._write_loop, name="ingest-writer", daemon=True)
+        writer.start()
+
+        logger.info(f"Starting ingestion process for {self.doc_type} documents from page {page_start} to {page_end} (page size: {page_size}, io workers: {self.io_workers}, cpu workers: {self.cpu_workers})")
+        stream = self._page_stream(page_size, jurisdiction_code, continuation_token, skip_pages=0 if continuation_token else page_start - 1)
+        exhausted = False
+        page = page_start
+        try:
+            # The I/O pool is entered last so it drains before the CPU pool it submits to shuts down
+            with ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix="ingest-cpu") as cpu_pool, \
+                    ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="ingest-io") as io_pool:
+                self._cpu_pool = cpu_pool
+                while page <= page_end:
+                    pages_in_flight.acquire()
+                    logger.info(f"Processing page {page} of {self.doc_type} documents")
+                    documents, token = next(stream, (None, None))
+                    if not documents:
+                        logger.info("No more documents to process")
+                        pages_in_flight.release()
+                        exhausted = True
+                        break
+
+                    page_tokens[page] = token
+                    items = [
+                        {"doc": doc, "pdf_path": pdf_path, "md_path": md_path, "page": page}
+                        for doc in documents if doc.md_file_paths
+                        for pdf_path, md_path in doc.md_file_paths.items()
+                    ]
+                    self._tracker.add(page, len(items))
+                    loaded = [item for item in io_pool.map(self._load_item, items) if item is not None]
+                    if loaded:
+                        self._dispatch_page(loaded)
+                    self._tracker.seal(page)
+                    page += 1
+        finally:
+            stream.close()
+            self._write_queue.put(_STOP)
+            writer.join()
+
+        if self._tracker.failed_pages:
+            logger.warning(f"Pages {sorted(self._tracker.failed_pages)} had failed documents; the checkpoint stays before page {min(self._tracker.failed_pages)} so a resumed run retries them")
+        elif exhausted or page > page_end:
+            self.checkpoint.clear(run_key)
+
+        return {
+            "processed": len(self.processed_files),
+            "skipped": len(self.skipped_files)
+        }
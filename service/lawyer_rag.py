@@ -11,9 +11,10 @@ from functools import wraps
 import time
 # from .. import count_tokens
 from service.lawyer_prompt import lawyer_query_system_prompt, lawyer_query_prompt, lawyer_filter_system_prompt, lawyer_filter_human_prompt, lawyer_decision_system_prompt, lawyer_judge_prompt, lawyer_final_ruling_system_prompt, lawyer_final_ruling_human_prompt, lawyer_classification_system_prompt, lawyer_classification_prompt
-from service.rag_utils import find_relevant_chunks, get_llm_response
+from service.rag_utils import find_relevant_chunks_multi, get_llm_response
 from service.models import JudicialAnalysis, Issues, FilteredArticles, FinalRuling
 from service.format_utils import format_relevant_cases
+from models.searchFilters import SearchFilters
 
 def retry_operation(max_attempts=3, delay_seconds=2):
     def decorator(func):
@@ -64,10 +65,10 @@ def get_case_entity(table_client, case_id: str):
     return table_client.get_entity('cases', case_id)
 
 @retry_operation()
-def search_with_retry(search_term: str, n_results: int = 5):
-    return find_relevant_chunks(search_term, n_results=n_results)
+def search_many_with_retry(search_terms: List[str], n_results: int = 5, filters: Optional[SearchFilters] = None):
+    return find_relevant_chunks_multi(search_terms, n_results=n_results, filters=filters)
 
-def run_lawyer_rag(plaintiff_case_text: str, defendant_case_text: str, case_id: str, table_client) -> dict:
+def run_lawyer_rag(plaintiff_case_text: str, defendant_case_text: str, case_id: str, table_client, filters: Optional[SearchFilters] = None) -> dict:
     try:
         # Get case entity to retrieve case number
         case_entity = get_case_entity(table_client, case_id)
@@ -103,10 +104,11 @@ def run_lawyer_rag(plaintiff_case_text: str, defendant_case_text: str, case_id:
         logging.info(f"[API INFO] Retrieved relevant cases")
         
         # Agent 3
+        # All issues are searched at once; a case retrieved for several issues is listed once
+        search_terms = [issue.search_term for issue in issues_result.issues]
+        results_by_issue = search_many_with_retry(search_terms, n_results=2, filters=filters)
         query_results = []
-        for issue in issues_result.issues:
-            search_results = search_with_retry(issue.search_term, n_results=2)
-            # search_results_metadata = [{"id": r["id"], **r["metadata"]} for r in search_results]
+        for issue, search_results in zip(issues_result.issues, results_by_issue):
             query_results.append({"query": issue.search_term, "description": issue.issue, "results": search_results})
             
         relevant_cases_formatted = format_relevant_cases(query_results)
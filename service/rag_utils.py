@@ -1,10 +1,16 @@
 from openai import AzureOpenAI
-from typing import List
+from typing import List, Optional
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from service.config import Config
+from service.weaviateConnection import weaviate_connection
+from service.searchCache import search_cache
+from service.asyncWeaviateService import async_weaviate_service
+from models.searchFilters import SearchFilters
+from service.reranker import get_reranker, rerank_chunk_objects
+from service.searchQueries import CHUNK_QUERY_PROPERTIES, SEARCH_ALPHA, chunk_cache_extra, chunk_fields, chunk_search_args
 
 load_dotenv()
 
@@ -27,9 +33,12 @@ llm_client = AzureOpenAI(
     api_version=chat_api_version
 )
 
-client = Config.buildWeaviateConnection()
 weaviate_collection_name = os.getenv("WEAVIATE_COLLECTION_NAME")
 
+# Concurrent searches per find_relevant_chunks_multi call, and how many hits each fetches per result kept
+MULTI_QUERY_MAX_WORKERS = int(os.getenv("MULTI_QUERY_MAX_WORKERS", "8"))
+MULTI_QUERY_OVERFETCH = 2
+
 def embed_text(text: str) -> List[float]:
         """
         Generate embeddings for a text using Azure OpenAI.
@@ -44,38 +53,117 @@ def embed_text(text: str) -> List[float]:
             logging.error(f"[API ERROR][embed_text] Error generating embeddings: {str(e)}")
             raise
         
-def find_relevant_chunks(query: str, n_results: int = 3) -> List[dict]:
+def find_relevant_chunks(
+    query: str,
+    n_results: int = 3,
+    snippet: bool = False,
+    fields: Optional[List[str]] = None,
+    reranker: Optional[str] = None,
+    filters: Optional[SearchFilters] = None,
+) -> List[dict]:
     """
     Find relevant chunks for a query using similarity search.
+
+    Args:
+        query: Search text
+        n_results: Number of chunks to return
+        snippet: Return a short highlighted `snippet` instead of the chunk's full `rawText`;
+            the full text can be fetched later by the returned `id`
+        fields: Result fields to return (see `RESULT_FIELDS`); defaults to rawText, caseName
+            and jurisdictionCode, or caseName and jurisdictionCode in snippet mode
+        reranker: Reranker name (see `get_reranker`); defaults to the RERANKER env var. When
+            one is active, RERANK_OVERFETCH times as many candidates are fetched and the best
+            `n_results` by its score are returned, each with a `rerankScore`
+        filters: Structured restrictions, applied as a Weaviate pre-filter
     """
     # query_vector = embed_text(query)
     
-    policy_collection = client.collections.get(weaviate_collection_name)
-    tenant_collection = policy_collection.with_tenant("1")
-    
-    # logger.info(f"Performing hybrid search in '{self.policy_benefit_collection_name}' collection...")
-                
-    response = tenant_collection.query.hybrid(
-        query=query,
-        limit=n_results,
-        alpha=0.7,
-        query_properties=["rawText", "caseName", "jurisdictionCode"]
+    fields = chunk_fields(fields, snippet)
+    active_reranker = get_reranker(reranker)
+
+    def run_search() -> List[dict]:
+        policy_collection = weaviate_connection.get_client().collections.get(weaviate_collection_name)
+        tenant_collection = policy_collection.with_tenant("1")
+        response = tenant_collection.query.hybrid(**chunk_search_args(query, n_results, fields, snippet, active_reranker, filters))
+        
+        # Format results with the rich, structured data
+        return rerank_chunk_objects(active_reranker, query, response.objects, n_results, fields, snippet)
+
+    return search_cache.get_or_compute(
+        "1", query, SEARCH_ALPHA, CHUNK_QUERY_PROPERTIES, n_results, run_search,
+        extra=chunk_cache_extra(fields, snippet, active_reranker, filters)
     )
-    
-    # logger.info(f"Search completed. Found {len(response.objects)} potential benefit results.")
-    
-    # Format results with the rich, structured data
-    results = []
-    for obj in response.objects:
-        properties = obj.properties
-        result = {
-            "rawText": properties.get("rawText"),
-            "caseName": properties.get("caseName"),
-            "jurisdictionCode": properties.get("jurisdictionCode")
-        }
-        results.append(result)
-
-    # logger.info(f"Policy benefit search completed successfully. Returning {len(results)} structured results.")
+
+async def find_relevant_chunks_async(
+    query: str,
+    n_results: int = 3,
+    snippet: bool = False,
+    fields: Optional[List[str]] = None,
+    reranker: Optional[str] = None,
+    filters: Optional[SearchFilters] = None,
+) -> List[dict]:
+    """`find_relevant_chunks` on the shared async Weaviate client, for async endpoints."""
+    return await async_weaviate_service.find_relevant_chunks(
+        query, n_results=n_results, snippet=snippet, fields=fields, reranker=reranker, filters=filters
+    )
+
+def find_relevant_chunks_multi(
+    queries: List[str],
+    n_results: int = 3,
+    dedupe: bool = True,
+    max_workers: int = MULTI_QUERY_MAX_WORKERS,
+    snippet: bool = False,
+    fields: Optional[List[str]] = None,
+    reranker: Optional[str] = None,
+    filters: Optional[SearchFilters] = None,
+) -> List[List[dict]]:
+    """
+    Run several chunk searches concurrently and return one result list per query.
+
+    Identical queries are searched once. The searches share the module's Weaviate
+    client, whose gRPC channel multiplexes them. With `dedupe`, a chunk returned for
+    several queries is kept only once, by whichever query ranks it highest (ties go
+    to the earlier query); each search over-fetches so queries that lose a chunk can
+    still fill `n_results` from their next hits.
+
+    Args:
+        queries: Search texts, e.g. one per issue
+        n_results: Number of chunks to return per query
+        dedupe: Drop chunks already returned for another query
+        max_workers: Maximum concurrent searches
+        snippet, fields, reranker, filters: As for `find_relevant_chunks`
+
+    Returns:
+        Result lists in the same order as `queries`, each shaped like `find_relevant_chunks`
+    """
+    if not queries:
+        return []
+    unique_queries = list(dict.fromkeys(queries))
+    fetch_limit = n_results * MULTI_QUERY_OVERFETCH if dedupe and len(queries) > 1 else n_results
+
+    def search(query: str) -> List[dict]:
+        return find_relevant_chunks(query, n_results=fetch_limit, snippet=snippet, fields=fields, reranker=reranker, filters=filters)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_queries))), thread_name_prefix="chunk-search") as pool:
+        hits_by_query = dict(zip(unique_queries, pool.map(search, unique_queries)))
+
+    if not dedupe:
+        return [hits_by_query[query][:n_results] for query in queries]
+
+    # Hand out hits rank by rank so a shared chunk goes to the query that ranks it highest
+    results: List[List[dict]] = [[] for _ in queries]
+    seen = set()
+    for rank in range(fetch_limit):
+        for index, query in enumerate(queries):
+            hits = hits_by_query[query]
+            if len(results[index]) >= n_results or rank >= len(hits):
+                continue
+            hit = hits[rank]
+            if hit["id"] not in seen:
+                seen.add(hit["id"])
+                results[index].append(hit)
+
+    logging.info(f"Searched {len(unique_queries)} distinct queries for {len(queries)} inputs; {len(seen)} unique chunks returned")
     return results
 
     # def fetch_article_text(self, article_id: str) -> dict:
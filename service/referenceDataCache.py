@@ -0,0 +1,174 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class ReferenceDataCache:
+    """
+    Graph reference data, and what is rendered from it, kept between requests.
+
+    The value is loaded on first use and reloaded when it is `ttl` seconds old. In
+    between, every `check_interval` seconds a cheap fingerprint (node counts) is compared
+    with the one taken at load time, and a difference reloads early. Edits that leave the
+    counts unchanged are picked up at the next TTL reload.
+
+    Only one caller loads at a time. Callers that arrive during a reload keep using the
+    previous value instead of waiting; only the very first load is waited for. A failed
+    reload keeps the previous value and is retried after `check_interval`.
+    """
+
+    def __init__(self, ttl: float = 3600, check_interval: float = 60):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._value: Any = None
+        self._fingerprint: Any = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._retry_at = 0.0
+        # Bumped on every load, so caches derived from this data can tell when it changed
+        self.version = 0
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._metrics = {
+            "hits": 0, "loads": 0, "ttl_reloads": 0, "change_reloads": 0, "checks": 0, "failures": 0,
+            "last_load_ms": None, "total_load_ms": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "ReferenceDataCache":
+        return cls(
+            ttl=float(os.getenv("GRAPH_REFDATA_TTL_SECONDS", "3600")),
+            check_interval=float(os.getenv("GRAPH_REFDATA_CHECK_SECONDS", "60")),
+        )
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def peek(self) -> Any:
+        """The current value, without checking whether it is due for a reload."""
+        return self._value
+
+    def _due(self) -> Optional[str]:
+        """Why the value needs work now: "load", "ttl" or "check"; None when it is fresh."""
+        now = time.monotonic()
+        if self._value is None:
+            return "load"
+        if now < self._retry_at:
+            return None
+        if now - self._loaded_at >= self.ttl:
+            return "ttl"
+        if now - self._checked_at >= self.check_interval:
+            return "check"
+        return None
+
+    def _hit(self) -> Any:
+        self._metrics["hits"] += 1
+        return self._value
+
+    def _checked(self, fingerprint: Any) -> bool:
+        """Record a fingerprint check; True when the data changed since it was loaded."""
+        self._metrics["checks"] += 1
+        self._checked_at = time.monotonic()
+        return fingerprint != self._fingerprint
+
+    def _store(self, value: Any, fingerprint: Any, reason: str, started: float) -> Any:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._value, self._fingerprint = value, fingerprint
+        self._loaded_at = self._checked_at = time.monotonic()
+        self.version += 1
+        self._metrics["loads"] += 1
+        if reason == "ttl":
+            self._metrics["ttl_reloads"] += 1
+        elif reason == "change":
+            self._metrics["change_reloads"] += 1
+        self._metrics["last_load_ms"] = round(elapsed_ms, 1)
+        self._metrics["total_load_ms"] += elapsed_ms
+        logger.info(f"Loaded graph reference data ({reason}) in {elapsed_ms:.0f} ms")
+        return value
+
+    def _failed(self, e: Exception) -> Any:
+        self._metrics["failures"] += 1
+        if self._value is None:
+            raise e
+        logger.warning(f"Reloading graph reference data failed, keeping the previous value: {str(e)}")
+        self._retry_at = time.monotonic() + self.check_interval
+        return self._value
+
+    def get(self, load: Callable[[], Tuple[Any, Any]], fingerprint: Callable[[], Any]) -> Any:
+        """
+        The cached value, loading or reloading it first when due.
+
+        Args:
+            load: Returns the value and the fingerprint of the data it was built from
+            fingerprint: Returns the current fingerprint
+        """
+        if self._due() is None:
+            return self._hit()
+        if not self._lock.acquire(blocking=self._value is None):
+            return self._hit()
+        try:
+            reason = self._due()
+            if reason is None:
+                return self._hit()
+            if reason == "check":
+                try:
+                    if not self._checked(fingerprint()):
+                        return self._hit()
+                except Exception as e:
+                    return self._failed(e)
+                reason = "change"
+            started = time.perf_counter()
+            try:
+                value, current = load()
+            except Exception as e:
+                return self._failed(e)
+            return self._store(value, current, reason, started)
+        finally:
+            self._lock.release()
+
+    async def get_async(self, load: Callable[[], Awaitable[Tuple[Any, Any]]], fingerprint: Callable[[], Awaitable[Any]]) -> Any:
+        """Async `get`, for loaders that use the async Neo4j driver."""
+        if self._due() is None:
+            return self._hit()
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        if self._async_lock.locked() and self._value is not None:
+            return self._hit()
+        async with self._async_lock:
+            reason = self._due()
+            if reason is None:
+                return self._hit()
+            if reason == "check":
+                try:
+                    if not self._checked(await fingerprint()):
+                        return self._hit()
+                except Exception as e:
+                    return self._failed(e)
+                reason = "change"
+            started = time.perf_counter()
+            try:
+                value, current = await load()
+            except Exception as e:
+                return self._failed(e)
+            return self._store(value, current, reason, started)
+
+    def metrics(self) -> dict:
+        return {
+            **self._metrics,
+            "total_load_ms": round(self._metrics["total_load_ms"], 1),
+            "loaded": self.loaded,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self.loaded else None,
+            "since_check_seconds": round(time.monotonic() - self._checked_at, 1) if self.loaded else None,
+        }
+
+
+reference_data_cache = ReferenceDataCache.from_env()
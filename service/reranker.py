@@ -0,0 +1,173 @@
+import os
+import math
+import logging
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from service.snippet_utils import query_terms, object_result, WORD_PATTERN
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:  # Optional; the lexical reranker needs nothing extra
+    CrossEncoder = None
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Candidates fetched per result kept when a reranker is active
+RERANK_OVERFETCH = int(os.getenv("RERANK_OVERFETCH", "4"))
+
+
+def chunk_text(result: dict) -> str:
+    """Text a chunk is scored on: its case name followed by its body."""
+    return " ".join(part for part in (result.get("caseName"), result.get("rawText")) if part)
+
+
+def benefit_text(result: dict) -> str:
+    """Text a `search_documents` result is scored on."""
+    return " ".join(result.get(key) or "" for key in ("title", "section", "description", "notes", "rawText")).strip()
+
+
+class Reranker:
+    """
+    Reorders hybrid search candidates by a local relevance score.
+
+    Subclasses implement `score`, which scores a whole batch of candidate texts against
+    one query at once. `rerank` keeps the `top_k` best candidates and records the
+    score on each as `rerankScore`.
+    """
+
+    name = "none"
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        raise NotImplementedError
+
+    def order(self, query: str, texts: Sequence[str], top_k: int) -> List[Tuple[int, float]]:
+        """(candidate index, score) of the `top_k` best candidates, best first."""
+        if not texts:
+            return []
+        scores = self.score(query, texts)
+        # Ties keep the hybrid order
+        best = sorted(range(len(texts)), key=lambda i: (-scores[i], i))[:top_k]
+        return [(i, round(float(scores[i]), 6)) for i in best]
+
+    def rerank(self, query: str, candidates: List[dict], top_k: int, text: Callable[[dict], str] = chunk_text) -> List[dict]:
+        reranked = []
+        for i, score in self.order(query, [text(candidate) for candidate in candidates], top_k):
+            candidate = dict(candidates[i])
+            candidate["rerankScore"] = score
+            reranked.append(candidate)
+        return reranked
+
+
+class LexicalReranker(Reranker):
+    """
+    BM25 over the candidate set, fused with the hybrid rank.
+
+    Document frequencies come from the candidates themselves, so no index is needed.
+    The hybrid order is kept as a prior through reciprocal-rank fusion, which stops a
+    single repeated term from overriding the vector similarity entirely.
+    """
+
+    name = "lexical"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, rank_weight: float = 0.5, rank_constant: int = 10):
+        self.k1 = k1
+        self.b = b
+        self.rank_weight = rank_weight
+        self.rank_constant = rank_constant
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        terms = query_terms(query)
+        documents = [Counter(word.lower() for word in WORD_PATTERN.findall(text)) for text in texts]
+        lengths = [sum(document.values()) for document in documents]
+        average_length = (sum(lengths) / len(lengths)) or 1.0
+        frequencies = {term: sum(1 for document in documents if term in document) for term in terms}
+
+        bm25 = []
+        for document, length in zip(documents, lengths):
+            total = 0.0
+            for term in terms:
+                count = document.get(term)
+                if not count:
+                    continue
+                idf = math.log(1 + (len(documents) - frequencies[term] + 0.5) / (frequencies[term] + 0.5))
+                total += idf * count * (self.k1 + 1) / (count + self.k1 * (1 - self.b + self.b * length / average_length))
+            bm25.append(total)
+
+        # Fuse BM25 rank with the incoming hybrid rank
+        bm25_rank = {i: rank for rank, i in enumerate(sorted(range(len(bm25)), key=lambda i: (-bm25[i], i)))}
+        return [
+            (1 - self.rank_weight) / (self.rank_constant + bm25_rank[i] + 1) + self.rank_weight / (self.rank_constant + i + 1)
+            for i in range(len(texts))
+        ]
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Cross-encoder relevance scores on CPU via `sentence_transformers`.
+
+    Candidate texts are truncated to `max_chars` before scoring; the model truncates
+    to its own token window anyway, and shorter inputs keep CPU latency predictable.
+    """
+
+    name = "cross-encoder"
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: int = 16, max_chars: int = 2000):
+        if CrossEncoder is None:
+            raise ImportError("sentence_transformers is required for the cross-encoder reranker")
+        self.model_name = model_name or os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+        self.batch_size = batch_size
+        self.max_chars = max_chars
+        self.model = CrossEncoder(self.model_name, device="cpu")
+        # The model is shared between request threads
+        self._lock = threading.Lock()
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        pairs = [(query, text[:self.max_chars]) for text in texts]
+        with self._lock:
+            scores = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        return [float(score) for score in scores]
+
+
+def rerank_chunk_objects(reranker: Optional[Reranker], query: str, objects: list, top_k: int, fields: List[str], snippet: bool) -> List[dict]:
+    """
+    Shape chunk search hits into results, best `top_k` first.
+
+    Without a reranker the hybrid order is kept. With one, hits are scored on their
+    properties before projection, so rawText is used even when it is not returned.
+    """
+    if reranker is None:
+        return [object_result(obj, fields, query, snippet) for obj in objects[:top_k]]
+    results = []
+    for i, score in reranker.order(query, [chunk_text(obj.properties) for obj in objects], top_k):
+        result = object_result(objects[i], fields, query, snippet)
+        result["rerankScore"] = score
+        results.append(result)
+    return results
+
+
+@lru_cache(maxsize=None)
+def get_reranker(name: Optional[str] = None) -> Optional[Reranker]:
+    """
+    Reranker by name ("none", "lexical" or "cross-encoder"); defaults to the RERANKER env var.
+
+    Returns None when reranking is off. Falls back to the lexical reranker when the
+    cross-encoder cannot be loaded.
+    """
+    name = (name or os.getenv("RERANKER", "none")).lower()
+    if name in ("", "none", "off", "false"):
+        return None
+    if name == "lexical":
+        return LexicalReranker()
+    if name == "cross-encoder":
+        try:
+            return CrossEncoderReranker()
+        except Exception as e:
+            logger.warning(f"Cross-encoder reranker unavailable ({e}); using the lexical reranker")
+            return LexicalReranker()
+    raise ValueError(f"Unknown reranker '{name}'")
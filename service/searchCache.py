@@ -0,0 +1,330 @@
+import os
+import json
+import asyncio
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+try:
+    import redis
+except ImportError:  # Optional shared backend
+    redis = None
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+async def _off_loop(shared, fn: Callable, *args) -> Any:
+    """Run `fn` in a worker thread when it talks to the synchronous Redis client `shared`."""
+    # Without Redis only a short in-process lock is taken; not worth a thread hop
+    if shared is None:
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+class SearchCache:
+    """
+    Result cache for hybrid searches, keyed on (tenant, normalized query, alpha, properties, limit).
+
+    Entries live in an in-process LRU with a TTL and, when a Redis URL is configured, in
+    Redis as well so several workers share results. Every tenant has a generation number
+    that is part of the key; bumping it on writes makes all of the tenant's entries
+    unreachable at once, locally and in Redis.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300, redis_url: Optional[str] = None, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "shared_hits": 0, "evictions": 0, "expirations": 0, "invalidations": 0, "errors": 0}
+
+        self._redis = None
+        if redis_url:
+            if redis is None:
+                logger.warning("SEARCH_CACHE_REDIS_URL is set but the redis package is not installed; using the local cache only")
+            else:
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+
+    @classmethod
+    def from_env(cls) -> "SearchCache":
+        return cls(
+            max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300")),
+            redis_url=os.getenv("SEARCH_CACHE_REDIS_URL"),
+            enabled=os.getenv("SEARCH_CACHE_ENABLED", "true").lower() != "false",
+        )
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(query.split()).casefold()
+
+    def _generation(self, tenant: str) -> int:
+        if self._redis is not None:
+            try:
+                return int(self._redis.get(f"search:gen:{tenant}") or 0)
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"Search cache could not read generation for tenant {tenant}: {e}")
+        with self._lock:
+            return self._generations.get(tenant, 0)
+
+    def make_key(self, tenant: str, query: str, alpha: Optional[float], properties: Optional[Iterable[str]], limit: int, extra: Optional[dict] = None) -> str:
+        payload = json.dumps({
+            "query": self.normalize_query(query),
+            "alpha": alpha,
+            "properties": sorted(properties) if properties else None,
+            "limit": limit,
+            "extra": extra,
+        }, sort_keys=True, default=str)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"search:{tenant}:{self._generation(tenant)}:{digest}"
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._metrics[name] += amount
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        # Callers may mutate result dicts; never hand out the cached ones
+        if isinstance(value, list):
+            return [dict(item) if isinstance(item, dict) else item for item in value]
+        return value
+
+    def _get_local(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._metrics["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put_local(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+
+    def get_or_compute(
+        self,
+        tenant: str,
+        query: str,
+        alpha: Optional[float],
+        properties: Optional[Iterable[str]],
+        limit: int,
+        compute: Callable[[], Any],
+        extra: Optional[dict] = None,
+    ) -> Any:
+        """
+        Return the cached result for this search, or run `compute` and cache what it returns.
+
+        Args:
+            tenant: Tenant the search runs against; invalidation is per tenant
+            query: Search text, normalized for case and whitespace
+            alpha: Hybrid alpha
+            properties: Query properties
+            limit: Result limit
+            compute: Runs the search on a miss
+            extra: Any other parameters that change the result, e.g. the returned fields
+        """
+        if not self.enabled:
+            return compute()
+
+        key = self.make_key(tenant, query, alpha, properties, limit, extra)
+        found, value = self._lookup(key)
+        if found:
+            return value
+        value = compute()
+        self._store(key, value)
+        return self._copy(value)
+
+    async def get_or_compute_async(
+        self,
+        tenant: str,
+        query: str,
+        alpha: Optional[float],
+        properties: Optional[Iterable[str]],
+        limit: int,
+        compute: Callable[[], Awaitable[Any]],
+        extra: Optional[dict] = None,
+    ) -> Any:
+        """
+        Same as `get_or_compute`, for searches made with the async Weaviate client.
+
+        The Redis client is synchronous, so with a shared backend its round trips run in
+        worker threads instead of on the event loop.
+        """
+        if not self.enabled:
+            return await compute()
+
+        key = await _off_loop(self._redis, self.make_key, tenant, query, alpha, properties, limit, extra)
+        found, value = await _off_loop(self._redis, self._lookup, key)
+        if found:
+            return value
+        value = await compute()
+        await _off_loop(self._redis, self._store, key, value)
+        return self._copy(value)
+
+    def _lookup(self, key: str) -> Tuple[bool, Any]:
+        entry = self._get_local(key)
+        if entry is not None:
+            self._count("hits")
+            return True, self._copy(entry[1])
+
+        if self._redis is not None:
+            try:
+                shared = self._redis.get(key)
+                if shared is not None:
+                    value = json.loads(shared)
+                    self._put_local(key, value)
+                    self._count("hits")
+                    self._count("shared_hits")
+                    return True, self._copy(value)
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"Search cache read from Redis failed: {e}")
+
+        self._count("misses")
+        return False, None
+
+    def _store(self, key: str, value: Any) -> None:
+        self._put_local(key, value)
+        if self._redis is not None:
+            try:
+                self._redis.setex(key, int(self.ttl_seconds), json.dumps(value, default=str))
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"Search cache write to Redis failed: {e}")
+
+    def invalidate_tenant(self, tenant: str) -> None:
+        """Make every cached search for `tenant` unreachable."""
+        prefix = f"search:{tenant}:"
+        with self._lock:
+            self._generations[tenant] = self._generations.get(tenant, 0) + 1
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+            self._metrics["invalidations"] += 1
+        if self._redis is not None:
+            try:
+                self._redis.incr(f"search:gen:{tenant}")
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"Search cache could not bump generation for tenant {tenant}: {e}")
+        logger.info(f"Invalidated search cache for tenant {tenant}")
+
+    def invalidate_all(self) -> None:
+        """Invalidate every tenant, e.g. after the collection is deleted."""
+        with self._lock:
+            tenants = {key.split(":", 2)[1] for key in self._entries} | set(self._generations)
+        if self._redis is not None:
+            try:
+                tenants |= {key.decode().rsplit(":", 1)[1] for key in self._redis.scan_iter(match="search:gen:*")}
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"Search cache could not list tenants in Redis: {e}")
+        for tenant in tenants:
+            self.invalidate_tenant(tenant)
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["entries"] = len(self._entries)
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = round(metrics["hits"] / lookups, 4) if lookups else 0.0
+        metrics["backend"] = "redis" if self._redis is not None else "local"
+        metrics["enabled"] = self.enabled
+        return metrics
+
+
+class ResultSetStore:
+    """
+    Server-side ranked ID lists for paginated searches, addressed by an opaque token.
+
+    The first page of a search stores its ranked object IDs here; later pages look the
+    list up by token and fetch only their own objects. Sets expire after `ttl_seconds`
+    and the least recently used are dropped beyond `max_sets`. With a Redis URL the
+    sets are shared between workers.
+    """
+
+    def __init__(self, max_sets: int = 512, ttl_seconds: float = 900, redis_url: Optional[str] = None):
+        self.max_sets = max_sets
+        self.ttl_seconds = ttl_seconds
+        self._sets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5) if redis_url and redis is not None else None
+
+    @classmethod
+    def from_env(cls) -> "ResultSetStore":
+        return cls(
+            max_sets=int(os.getenv("RESULT_SET_MAX_SETS", "512")),
+            ttl_seconds=float(os.getenv("RESULT_SET_TTL_SECONDS", "900")),
+            redis_url=os.getenv("SEARCH_CACHE_REDIS_URL"),
+        )
+
+    def put(self, ids: List[str], query: str) -> str:
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._sets[token] = (time.monotonic() + self.ttl_seconds, ids, query)
+            while len(self._sets) > self.max_sets:
+                self._sets.popitem(last=False)
+        if self._redis is not None:
+            try:
+                self._redis.setex(f"resultset:{token}", int(self.ttl_seconds), json.dumps({"ids": ids, "query": query}))
+            except Exception as e:
+                logger.warning(f"Result set write to Redis failed: {e}")
+        return token
+
+    def get(self, token: str) -> Optional[Tuple[List[str], str]]:
+        """Return (ids, query) for a live token, or None if it is unknown or expired."""
+        with self._lock:
+            entry = self._sets.get(token)
+            if entry is not None:
+                expires_at, ids, query = entry
+                if expires_at >= time.monotonic():
+                    self._sets.move_to_end(token)
+                    return ids, query
+                del self._sets[token]
+        if self._redis is not None:
+            try:
+                shared = self._redis.get(f"resultset:{token}")
+                if shared is not None:
+                    payload = json.loads(shared)
+                    return payload["ids"], payload["query"]
+            except Exception as e:
+                logger.warning(f"Result set read from Redis failed: {e}")
+        return None
+
+    async def put_async(self, ids: List[str], query: str) -> str:
+        """`put` for the async search path; Redis writes run off the event loop."""
+        return await _off_loop(self._redis, self.put, ids, query)
+
+    async def get_async(self, token: str) -> Optional[Tuple[List[str], str]]:
+        """`get` for the async search path; Redis reads run off the event loop."""
+        return await _off_loop(self._redis, self.get, token)
+
+
+def result_set_key(query: str, filter_key: Optional[dict] = None, mode: Optional[str] = None) -> str:
+    """What a result set was ranked for; a token is only reused for the same query, filters and mode."""
+    key = query if filter_key is None else f"{query}\n{json.dumps(filter_key, sort_keys=True)}"
+    return key if mode is None else f"{key}\n{mode}"
+
+
+search_cache = SearchCache.from_env()
+result_sets = ResultSetStore.from_env()
@@ -0,0 +1,240 @@
+"""
+Query building and result shaping shared by the sync (`WeaviateService`, `rag_utils`) and
+async (`AsyncWeaviateService`) search paths. Callers only run the Weaviate calls, awaited
+or not, and hand the returned objects back here.
+"""
+import logging
+from typing import List, Optional
+
+from fastapi import HTTPException
+from weaviate.classes.query import Filter, MetadataQuery
+
+from models.searchFilters import SearchFilters, to_weaviate_filter, filters_cache_key
+from service.searchCache import result_sets, result_set_key
+from service.snippet_utils import RESULT_FIELDS, project_result, resolve_fields, return_properties_for
+from service.reranker import RERANK_OVERFETCH, Reranker, benefit_text
+
+logger = logging.getLogger(__name__)
+
+SEARCH_ALPHA = 0.7
+BENEFIT_QUERY_PROPERTIES = ["rawText", "notes", "section"]
+# jurisdictionCode is FIELD-tokenized and restricted through filters, not keyword-scored
+CHUNK_QUERY_PROPERTIES = ["rawText", "caseName"]
+BENEFIT_FIELDS = ["rawText", "section", "title", "description", "notes", "filename", "coverage_network", "coverage_nonNetwork"]
+# Chunks ranked per case search result set
+TOP_RESULTS_LIMIT = 300
+# Hits ranked per query before collapsing them to one per case
+GROUPED_HITS_LIMIT = 1000
+
+
+# ---------------------------------------------------------------------- #
+# Policy benefit search (chat)
+# ---------------------------------------------------------------------- #
+
+def benefit_search_args(query: str, top_k: int, reranker: Optional[Reranker]) -> dict:
+    """Keyword arguments for `query.hybrid`; over-fetches when a reranker is active."""
+    return {
+        "query": query,
+        "limit": top_k * RERANK_OVERFETCH if reranker else top_k,
+        "alpha": SEARCH_ALPHA,
+        "query_properties": BENEFIT_QUERY_PROPERTIES,
+        "return_metadata": MetadataQuery(score=True),
+    }
+
+
+def benefit_results(query: str, objects: list, top_k: int, reranker: Optional[Reranker]) -> List[dict]:
+    """Shape benefit hits into results, reranked to the best `top_k` when a reranker is given."""
+    results = [{field: obj.properties.get(field) for field in BENEFIT_FIELDS} for obj in objects]
+    if reranker is not None:
+        results = reranker.rerank(query, results, top_k, text=benefit_text)
+    return results
+
+
+def benefit_cache_extra(reranker: Optional[Reranker]) -> dict:
+    return {"view": "policyBenefit", "reranker": reranker.name if reranker else None}
+
+
+# ---------------------------------------------------------------------- #
+# Chunk search (find_relevant_chunks)
+# ---------------------------------------------------------------------- #
+
+def chunk_fields(fields: Optional[List[str]], snippet: bool) -> List[str]:
+    default_fields = ["caseName", "jurisdictionCode"] if snippet else ["rawText", "caseName", "jurisdictionCode"]
+    return resolve_fields(fields, default_fields)
+
+
+def chunk_search_args(query: str, n_results: int, fields: List[str], snippet: bool, reranker: Optional[Reranker], filters: Optional[SearchFilters]) -> dict:
+    return {
+        "query": query,
+        "limit": n_results * RERANK_OVERFETCH if reranker else n_results,
+        "alpha": SEARCH_ALPHA,
+        "query_properties": CHUNK_QUERY_PROPERTIES,
+        "filters": to_weaviate_filter(filters),
+        # The reranker scores rawText even when it is not returned
+        "return_properties": return_properties_for(fields, snippet or reranker is not None),
+    }
+
+
+def chunk_cache_extra(fields: List[str], snippet: bool, reranker: Optional[Reranker], filters: Optional[SearchFilters]) -> dict:
+    return {
+        "view": "chunks", "fields": fields, "snippet": snippet,
+        "reranker": reranker.name if reranker else None, "filters": filters_cache_key(filters),
+    }
+
+
+# ---------------------------------------------------------------------- #
+# Paginated case search (search_relevant_docs)
+# ---------------------------------------------------------------------- #
+
+def collapse_by_parent(objects, limit: int) -> List[list]:
+    """
+    Collapse ranked hits to one per `parentDocumentId`, keeping rank order.
+
+    Returns:
+        `[best chunk id, hit count]` per case, for at most `limit` cases
+    """
+    groups = {}
+    collapsed = []
+    for obj in objects:
+        parent = obj.properties.get("parentDocumentId") or str(obj.uuid)
+        entry = groups.get(parent)
+        if entry is not None:
+            entry[1] += 1
+            continue
+        entry = [str(obj.uuid), 1]
+        groups[parent] = entry
+        collapsed.append(entry)
+    return collapsed[:limit]
+
+
+class CaseSearch:
+    """
+    One request of `search_relevant_docs`: its result set, its page and the response.
+
+    The caller ranks the query when `stored_ranking` has nothing (through the search
+    cache, with `hybrid_args` and `ranking`) and keeps the ranking with `remember`. It
+    then fetches the objects of `page_ids` with `fetch_args` and builds the response
+    with `response`.
+
+    Raises:
+        HTTPException: 400 for unknown fields, 404 for a page past the end
+    """
+
+    def __init__(
+        self,
+        query: str,
+        page: int,
+        page_size: int,
+        result_set_token: Optional[str] = None,
+        snippet: bool = False,
+        fields: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        group_by_case: bool = False,
+    ):
+        default_fields = [field for field in RESULT_FIELDS if not (snippet and field == "rawText")]
+        try:
+            self.fields = resolve_fields(fields, default_fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        self.query = query
+        self.page = page
+        self.page_size = page_size
+        self.result_set_token = result_set_token
+        self.snippet = snippet
+        self.filters = filters
+        self.group_by_case = group_by_case
+        self.filter_key = filters_cache_key(filters)
+        self.set_key = result_set_key(query, self.filter_key, "cases" if group_by_case else None)
+        self.hit_counts = {}
+        self.total_records = 0
+
+    def stored_ranking(self) -> Optional[list]:
+        """The ranking behind the request's token, when the token is known and was made for this search."""
+        return self._matching(result_sets.get(self.result_set_token) if self.result_set_token else None)
+
+    async def stored_ranking_async(self) -> Optional[list]:
+        return self._matching(await result_sets.get_async(self.result_set_token) if self.result_set_token else None)
+
+    def _matching(self, stored: Optional[tuple]) -> Optional[list]:
+        if stored is not None and stored[1] == self.set_key:
+            return stored[0]
+        if self.result_set_token:
+            logger.info("Result set token is unknown or expired; ranking the query again")
+        return None
+
+    def hybrid_args(self) -> dict:
+        return {
+            "query": self.query,
+            "alpha": SEARCH_ALPHA,
+            "query_properties": CHUNK_QUERY_PROPERTIES,
+            "filters": to_weaviate_filter(self.filters),
+            # Top 300 chunks, or enough hits to fill 300 cases
+            "limit": GROUPED_HITS_LIMIT if self.group_by_case else TOP_RESULTS_LIMIT,
+            "return_properties": ["parentDocumentId"] if self.group_by_case else [],
+        }
+
+    def ranking(self, objects: list) -> list:
+        logger.info(f"Retrieved {len(objects)} object IDs from Weaviate")
+        if self.group_by_case:
+            return collapse_by_parent(objects, TOP_RESULTS_LIMIT)
+        return [str(obj.uuid) for obj in objects]
+
+    def cache_args(self) -> tuple:
+        """Positional (tenant, query, alpha, properties, limit) for the search cache."""
+        return "1", self.query, SEARCH_ALPHA, CHUNK_QUERY_PROPERTIES, TOP_RESULTS_LIMIT
+
+    def cache_extra(self) -> dict:
+        return {"view": "caseSearchGroups" if self.group_by_case else "caseSearchIds", "filters": self.filter_key}
+
+    def remember(self, ranked: list) -> None:
+        self.result_set_token = result_sets.put(ranked, self.set_key)
+
+    async def remember_async(self, ranked: list) -> None:
+        self.result_set_token = await result_sets.put_async(ranked, self.set_key)
+
+    def page_ids(self, ranked: list) -> List[str]:
+        """IDs of the requested page, in ranking order."""
+        # Grouped result sets hold [best chunk id, hit count] per case
+        if self.group_by_case:
+            self.hit_counts = dict(ranked)
+            ranked = [entry[0] for entry in ranked]
+
+        self.total_records = len(ranked)
+        total_pages = (self.total_records + self.page_size - 1) // self.page_size if self.total_records > 0 else 0
+        start_index = (self.page - 1) * self.page_size
+        if start_index >= self.total_records and self.total_records > 0:
+            raise HTTPException(status_code=404, detail=f"Page {self.page} is out of range. Maximum page is {total_pages}")
+        return ranked[start_index:start_index + self.page_size]
+
+    def fetch_args(self, page_ids: List[str]) -> dict:
+        return {
+            "filters": Filter.by_id().contains_any(page_ids),
+            "limit": len(page_ids),
+            "return_properties": return_properties_for(self.fields, self.snippet),
+        }
+
+    def response(self, page_ids: List[str], objects: list) -> dict:
+        objects_by_id = {str(obj.uuid): obj.properties for obj in objects}
+        results = []
+        for object_id in page_ids:
+            properties = objects_by_id.get(object_id)
+            if properties is None:
+                # Deleted since the result set was ranked
+                continue
+            result = {"id": object_id}
+            result.update(project_result(properties, self.fields, self.query, self.snippet))
+            if self.group_by_case:
+                result["hitCount"] = self.hit_counts[object_id]
+            results.append(result)
+
+        response = {
+            "query": self.query[:100] + "..." if len(self.query) > 100 else self.query,
+            "page": self.page,
+            "page_size": self.page_size,
+            "total_records": self.total_records,
+            "result_set_token": self.result_set_token,
+            "results": results
+        }
+        if self.group_by_case:
+            response["total_hits"] = sum(self.hit_counts.values())
+        return response
@@ -0,0 +1,226 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class SessionBusyError(Exception):
+    """A session already has as many requests queued as it may; answered with 429."""
+
+
+class _Session:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Runs admitted for the session that have not finished, including the running one
+        self.pending = 0
+
+
+class _SharedRun:
+    """
+    Output of one chat completion, replayed to every request attached to it.
+
+    A single producer task publishes chunks; each subscriber replays them from the start
+    and then follows new ones. The producer is cancelled once every subscriber has left.
+    """
+
+    def __init__(self, key: Tuple[str, str]):
+        self.key = key
+        self.admitted_at = time.monotonic()
+        self.chunks = []
+        self.done = False
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk) -> None:
+        self.chunks.append(chunk)
+        self._wake()
+
+    def finish(self) -> None:
+        self.done = True
+        self._wake()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncIterator:
+        position = 0
+        while True:
+            while position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+class SessionTicket:
+    """One admitted request. Stream it with `stream()`; `release()` is safe to call more than once."""
+
+    def __init__(self, run: _SharedRun, coalesced: bool):
+        self.run = run
+        self.coalesced = coalesced
+        self._released = False
+        run.subscribers += 1
+
+    async def stream(self) -> AsyncIterator:
+        try:
+            async for chunk in self.run.follow():
+                yield chunk
+        finally:
+            self.release()
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self.run.subscribers -= 1
+        if self.run.subscribers == 0 and self.run.task is not None and not self.run.task.done():
+            logger.info(f"No clients left for chat run {self.run.key[0]}; cancelling it")
+            self.run.task.cancel()
+
+
+class SessionScheduler:
+    """
+    Per-session admission and ordering for chat requests, on the event loop.
+
+    Requests of one session run one at a time, in arrival order. Waiting for a turn is
+    an `asyncio.Lock` wait, so a queued request holds no thread. A session may have at
+    most `max_queue_depth` runs waiting behind the running one; further requests are
+    rejected at admission with `SessionBusyError` so the endpoint can answer 429 before
+    streaming starts.
+
+    When `coalesce` is on, a request whose message matches one admitted for the same
+    session less than `coalesce_window` seconds earlier, and still queued or running,
+    attaches to that run and receives the same chunks instead of calling the model again.
+    The window only covers double submits; a message deliberately sent again later (e.g.
+    "yes" or "continue") gets its own run, answered with the conversation state at its turn.
+
+    The session table is an LRU bounded by `max_sessions`. Only idle sessions are
+    evicted; sessions with a queued or running request are kept even past the bound.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_queue_depth: int = 2, wait_timeout: float = 30, coalesce: bool = True, coalesce_window: float = 2):
+        self.max_sessions = max_sessions
+        self.max_queue_depth = max_queue_depth
+        self.wait_timeout = wait_timeout
+        self.coalesce = coalesce
+        self.coalesce_window = coalesce_window
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._runs: Dict[Tuple[str, str], _SharedRun] = {}
+        self._metrics = {"admitted": 0, "rejected": 0, "coalesced": 0, "timed_out": 0, "cancelled": 0, "evicted": 0}
+
+    @classmethod
+    def from_env(cls) -> "SessionScheduler":
+        return cls(
+            max_sessions=int(os.getenv("CHAT_MAX_SESSIONS", "1000")),
+            max_queue_depth=int(os.getenv("CHAT_SESSION_QUEUE_DEPTH", "2")),
+            wait_timeout=float(os.getenv("CHAT_SESSION_WAIT_SECONDS", "30")),
+            coalesce=os.getenv("CHAT_COALESCE_DUPLICATES", "true").lower() == "true",
+            coalesce_window=float(os.getenv("CHAT_COALESCE_WINDOW_SECONDS", "2")),
+        )
+
+    @staticmethod
+    def session_key(user_id: str, session_id: Optional[str] = None) -> str:
+        return f"{user_id}_{session_id}" if session_id else user_id
+
+    def admit(self, session_key: str, message: str, start: Callable[[], AsyncIterator]) -> SessionTicket:
+        """
+        Admit a request and schedule its run.
+
+        Args:
+            session_key: Requests with the same key run one at a time
+            message: The user message, used to coalesce double submits
+            start: Called once the session's turn comes; returns the chunks to stream
+
+        Returns:
+            Ticket to stream the run's chunks from
+
+        Raises:
+            SessionBusyError: The session's queue is full
+        """
+        run_key = (session_key, " ".join(message.split()).casefold())
+        existing = self._runs.get(run_key)
+        if self.coalesce and existing is not None and time.monotonic() - existing.admitted_at <= self.coalesce_window:
+            self._metrics["coalesced"] += 1
+            logger.info(f"Coalescing double-submitted message for session {session_key}")
+            return SessionTicket(existing, coalesced=True)
+
+        session = self._sessions.get(session_key)
+        if session is None:
+            session = self._sessions[session_key] = _Session()
+            self._evict_idle()
+        self._sessions.move_to_end(session_key)
+        if session.pending > self.max_queue_depth:
+            self._metrics["rejected"] += 1
+            raise SessionBusyError(f"Session {session_key} already has {session.pending} requests in progress")
+
+        session.pending += 1
+        self._metrics["admitted"] += 1
+        run = _SharedRun(run_key)
+        if self.coalesce:
+            self._runs[run_key] = run
+        ticket = SessionTicket(run, coalesced=False)
+        run.task = asyncio.create_task(self._produce(session, run, start))
+        return ticket
+
+    async def _produce(self, session: _Session, run: _SharedRun, start: Callable[[], AsyncIterator]) -> None:
+        try:
+            try:
+                await asyncio.wait_for(session.lock.acquire(), timeout=self.wait_timeout)
+            except asyncio.TimeoutError:
+                self._metrics["timed_out"] += 1
+                logger.warning(f"Timeout waiting for the turn of session {run.key[0]}")
+                run.publish({"type": "error", "content": "Request timeout - please try again"})
+                return
+            try:
+                async for chunk in start():
+                    run.publish(chunk)
+            finally:
+                session.lock.release()
+        except asyncio.CancelledError:
+            self._metrics["cancelled"] += 1
+            raise
+        except Exception as e:
+            logger.error(f"Chat run for session {run.key[0]} failed: {str(e)}", exc_info=True)
+            run.publish({"type": "error", "content": f"Error generating response: {str(e)}"})
+        finally:
+            session.pending -= 1
+            run.finish()
+            if self._runs.get(run.key) is run:
+                del self._runs[run.key]
+
+    def _evict_idle(self) -> None:
+        excess = len(self._sessions) - self.max_sessions
+        if excess <= 0:
+            return
+        for key in list(self._sessions):
+            session = self._sessions[key]
+            if session.pending == 0 and not session.lock.locked():
+                del self._sessions[key]
+                self._metrics["evicted"] += 1
+                excess -= 1
+                if excess == 0:
+                    break
+
+    def metrics(self) -> dict:
+        return {
+            **self._metrics,
+            "sessions": len(self._sessions),
+            "running": sum(1 for session in self._sessions.values() if session.lock.locked()),
+            "queued": sum(max(0, session.pending - 1) for session in self._sessions.values()),
+            "in_flight_runs": len(self._runs),
+        }
+
+
+session_scheduler = SessionScheduler.from_env()
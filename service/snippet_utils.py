@@ -0,0 +1,130 @@
+import re
+from typing import List, Optional
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with",
+}
+
+MAX_WORD_WIDENING = 30
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct, lower-cased query words worth highlighting, longest first."""
+    terms = {word.lower() for word in WORD_PATTERN.findall(query) if len(word) > 1 and word.lower() not in STOP_WORDS}
+    return sorted(terms, key=len, reverse=True)
+
+
+def make_snippet(text: Optional[str], query: str, max_chars: int = 320, highlight: tuple = ("<mark>", "</mark>")) -> str:
+    """
+    Build a short passage of `text` around the span that best matches `query`.
+
+    The window of at most `max_chars` characters covering the most distinct query terms
+    (then the most occurrences) is chosen, widened to word boundaries, and every term
+    occurrence inside it is wrapped in `highlight`. Falls back to the start of the text
+    when no term occurs.
+    """
+    if not text:
+        return ""
+    terms = query_terms(query)
+    matches = []
+    if terms:
+        pattern = re.compile(r"\b(" + "|".join(re.escape(term) for term in terms) + r")\b", re.IGNORECASE)
+        matches = [(m.start(), m.end(), m.group(0).lower()) for m in pattern.finditer(text)]
+
+    if not matches:
+        start, end = 0, min(len(text), max_chars)
+    else:
+        # Sliding window over match positions: maximize distinct terms, then occurrences
+        best = (0, 0, 0, 0)
+        counts = {}
+        left = 0
+        for right, (_, right_end, term) in enumerate(matches):
+            counts[term] = counts.get(term, 0) + 1
+            while right_end - matches[left][0] > max_chars:
+                left_term = matches[left][2]
+                counts[left_term] -= 1
+                if not counts[left_term]:
+                    del counts[left_term]
+                left += 1
+            score = (len(counts), right - left + 1)
+            if score > best[:2]:
+                best = (score[0], score[1], left, right)
+        _, _, left, right = best
+        match_start, match_end = matches[left][0], matches[right][1]
+        padding = (max_chars - (match_end - match_start)) // 2
+        start = max(0, match_start - padding)
+        end = min(len(text), start + max_chars)
+        start = max(0, min(start, end - max_chars))
+
+    # Widen to word boundaries so no word is cut in half; cap it for long unbroken tokens such as URLs
+    floor, ceiling = max(0, start - MAX_WORD_WIDENING), min(len(text), end + MAX_WORD_WIDENING)
+    while start > floor and not text[start - 1].isspace():
+        start -= 1
+    while end < ceiling and not text[end].isspace():
+        end += 1
+
+    open_mark, close_mark = highlight
+    passage = []
+    position = start
+    for match_start, match_end, _ in matches:
+        if match_start < start or match_end > end:
+            continue
+        passage.append(text[position:match_start])
+        passage.append(open_mark + text[match_start:match_end] + close_mark)
+        position = match_end
+    passage.append(text[position:end])
+
+    snippet = " ".join("".join(passage).split())
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+
+# Result field name -> Weaviate property it is read from
+RESULT_FIELDS = {
+    "rawText": "rawText",
+    "caseName": "caseName",
+    "jurisdictionCode": "jurisdictionCode",
+    "pdfBlobUrl": "blobUrl",
+    "pageStart": "pageStart",
+    "pageEnd": "pageEnd",
+    "parentDocumentId": "parentDocumentId",
+}
+
+
+def resolve_fields(fields: Optional[List[str]], default: List[str]) -> List[str]:
+    """Validate requested result fields, falling back to `default` when none are given."""
+    if not fields:
+        return list(default)
+    unknown = [field for field in fields if field not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown result fields {unknown}; expected any of {list(RESULT_FIELDS)}")
+    return list(dict.fromkeys(fields))
+
+
+def return_properties_for(fields: List[str], snippet: bool) -> List[str]:
+    """Weaviate properties to fetch for `fields`; snippets need rawText even when it is not returned."""
+    properties = [RESULT_FIELDS[field] for field in fields]
+    if snippet and "rawText" not in properties:
+        properties.append("rawText")
+    return properties
+
+
+def project_result(properties: dict, fields: List[str], query: str, snippet: bool, snippet_chars: int = 320) -> dict:
+    """
+    Shape one result: the requested fields, plus a highlighted `snippet` in snippet mode.
+
+    In snippet mode `rawText` is only returned when it was explicitly requested.
+    """
+    result = {field: properties.get(RESULT_FIELDS[field]) for field in fields}
+    if snippet:
+        result["snippet"] = make_snippet(properties.get("rawText"), query, max_chars=snippet_chars)
+    return result
+
+
+def object_result(obj, fields: List[str], query: str, snippet: bool) -> dict:
+    """`project_result` for a Weaviate object, with its `id` first."""
+    result = {"id": str(obj.uuid)}
+    result.update(project_result(obj.properties, fields, query, snippet))
+    return result
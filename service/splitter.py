@@ -1,6 +1,8 @@
-from typing import List, Tuple
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
 from langchain_core.documents import Document as Chunk
 import logging
+from service.token_count import get_encoding
 
 class SuperRecursiveSplitter:
     """
@@ -9,17 +11,24 @@ class SuperRecursiveSplitter:
     This class implements a recursive splitting algorithm that divides text into chunks
     based on a list of separators, while attempting to maintain a target chunk size.
 
+    With placeholders and reconstruction enabled (the default), splitting works on
+    `(start, end)` offsets into the original text and each chunk is sliced once, so
+    chunks are exact substrings. Chunk boundaries are the same as those of the
+    placeholder-encoding implementation, which is kept for the other modes.
+
     Attributes:
         separators (List[str]): A list of string separators to use for splitting text.
-        target_chunk_size (int): The desired size for each chunk of text.
+        target_chunk_size (int): The desired size for each chunk of text, in `length_unit`.
         separator_placeholders (bool): If True, replace separators with placeholders.
-        overlap (int): The number of characters to overlap between adjacent chunks.
+        overlap (int): The number of characters (or tokens) to overlap between adjacent chunks.
+        length_unit (str): "chars" to measure sizes in characters, "tokens" to measure them in tokens.
         chunks (List[str]): The resulting list of text chunks after splitting.
+        spans (List[Tuple[int, int]]): The `(start, end)` offset of each chunk before overlap is added.
         verbosity (int): Controls the verbosity of output (0 for no output, 1 for verbose output).
 
     """
 
-    def __init__(self, separators: List[str], target_chunk_size: int, separator_placeholders: bool = True, overlap: int = 0, verbosity: int = 0, reconstruct: bool = True):
+    def __init__(self, separators: List[str], target_chunk_size: int, separator_placeholders: bool = True, overlap: int = 0, verbosity: int = 0, reconstruct: bool = True, length_unit: str = "chars", encoding_name: str = "cl100k_base"):
         """
         Initialize the DWRecursiveSplitter.
 
@@ -29,12 +38,17 @@ class SuperRecursiveSplitter:
             separator_placeholders (bool, optional): If True, replace separators with placeholders. Defaults to True.
             overlap (int, optional): The number of characters to overlap between adjacent chunks. Defaults to 0.
             verbosity (int, optional): Controls the verbosity of output (0 for no output, 1 for verbose output). Defaults to 0.
+            length_unit (str, optional): "chars" or "tokens"; the unit of `target_chunk_size` and `overlap`. Defaults to "chars".
+            encoding_name (str, optional): tiktoken encoding used when `length_unit` is "tokens". Defaults to "cl100k_base".
         """
+        if length_unit not in ("chars", "tokens"):
+            raise ValueError(f"length_unit must be 'chars' or 'tokens', got {length_unit!r}")
         self.separators = separators
         self.target_chunk_size = target_chunk_size
         self.separator_placeholders = separator_placeholders
         self.overlap = abs(overlap)
         self.chunks = []
+        self.spans = []
         self.verbosity = verbosity
         self.pages = []
         self.placeholder_map = {
@@ -45,6 +59,8 @@ class SuperRecursiveSplitter:
             " ": "~S"
         }
         self.reconstruct = reconstruct
+        self.length_unit = length_unit
+        self.encoding_name = encoding_name
     
     def split_and_merge(self, parts: List[str], sep: str) -> List[str]:
         """
@@ -122,6 +138,178 @@ class SuperRecursiveSplitter:
         
         return overlapped_chunks
     
+    def _uses_span_engine(self) -> bool:
+        if self.length_unit == "tokens":
+            return True
+        return self.separator_placeholders and self.reconstruct and all(sep in self.placeholder_map for sep in self.separators)
+
+    def _token_starts(self, text: str) -> List[int]:
+        """Character offset at which each token of `text` starts, from a single encode."""
+        encoding = get_encoding(self.encoding_name)
+        _, offsets = encoding.decode_with_offsets(encoding.encode_ordinary(text))
+        return offsets
+
+    def split_spans(self, text: str, token_starts: Optional[List[int]] = None) -> List[Tuple[int, int]]:
+        """
+        Compute chunk boundaries as `(start, end)` offsets into `text`.
+
+        In character mode the size of a span is measured the way the placeholder
+        encoding measured it: every separator a split replaced counts as its
+        placeholder length, and each join in the final merge counts one extra
+        character. This keeps boundaries identical to the placeholder implementation
+        without building encoded text.
+
+        In token mode the text is encoded once and the size of a span is the number
+        of tokens starting inside it, so merging only adds up counts. The budget is
+        reduced by the overlap on both sides, and spans that no separator can bring
+        under the budget are cut at token boundaries.
+
+        Args:
+            text (str): The input text to be split.
+            token_starts (List[int], optional): Token start offsets of `text`, when the caller already encoded it.
+
+        Returns:
+            List[Tuple[int, int]]: Contiguous spans covering the whole text.
+        """
+        use_tokens = self.length_unit == "tokens"
+        target = self.target_chunk_size
+        # Start offsets of separators replaced so far, and prefix sums of their size adjustment
+        marks: List[Tuple[int, int]] = []
+        mark_positions: List[int] = []
+        mark_totals: List[int] = [0]
+
+        if use_tokens:
+            target = max(1, target - 2 * self.overlap)
+            if token_starts is None:
+                token_starts = self._token_starts(text)
+
+            def measure(start: int, end: int) -> int:
+                return bisect_left(token_starts, end) - bisect_left(token_starts, start)
+        else:
+            def measure(start: int, end: int) -> int:
+                lo = bisect_left(mark_positions, start)
+                hi = bisect_left(mark_positions, end)
+                return (end - start) + mark_totals[hi] - mark_totals[lo]
+
+        # Replaced separators are blanked out here so later separators cannot match inside them
+        search_text = text
+        chunks = [(0, len(text), measure(0, len(text)))]
+        for sep_no, sep in enumerate(self.separators, start=1):
+            if self.verbosity == 1:
+                escaped_sep = sep.replace('\n', '\\n')
+                print(rf"Separator #{sep_no}: '{escaped_sep}' (placeholder = {self.placeholder_map.get(sep, '~')})")
+            adjustment = 0 if use_tokens else len(self.placeholder_map.get(sep, "~")) - len(sep)
+            new_marks = []
+            new_chunks = []
+            for start, end, size in chunks:
+                if size <= target:
+                    new_chunks.append((start, end, size))
+                    continue
+
+                pieces = []
+                position = start
+                parts = search_text[start:end].split(sep)
+                for i, part in enumerate(parts):
+                    part_end = position + len(part)
+                    if i < len(parts) - 1:
+                        new_marks.append(part_end)
+                        part_end += len(sep)
+                        pieces.append((position, part_end, measure(position, part_end) + adjustment))
+                    else:
+                        pieces.append((position, part_end, measure(position, part_end)))
+                    position = part_end
+
+                current_start, current_end, current_size = start, start, 0
+                for piece_start, piece_end, piece_size in pieces:
+                    if piece_size > target:
+                        if current_end > current_start:
+                            new_chunks.append((current_start, current_end, current_size))
+                        new_chunks.append((piece_start, piece_end, piece_size))
+                        current_start, current_end, current_size = piece_end, piece_end, 0
+                    elif current_size + piece_size <= target:
+                        if current_end == current_start:
+                            current_start = piece_start
+                        current_end = piece_end
+                        current_size += piece_size
+                    else:
+                        if current_end > current_start:
+                            new_chunks.append((current_start, current_end, current_size))
+                        current_start, current_end, current_size = piece_start, piece_end, piece_size
+                if current_end > current_start:
+                    new_chunks.append((current_start, current_end, current_size))
+
+            chunks = new_chunks
+            if new_marks:
+                blank = "\0" * len(sep)
+                segments = []
+                previous = 0
+                for mark in new_marks:
+                    segments.append(search_text[previous:mark])
+                    segments.append(blank)
+                    previous = mark + len(sep)
+                segments.append(search_text[previous:])
+                search_text = "".join(segments)
+
+                if adjustment:
+                    marks = sorted(marks + [(mark, adjustment) for mark in new_marks])
+                    mark_positions = [mark for mark, _ in marks]
+                    mark_totals = [0]
+                    for _, mark_adjustment in marks:
+                        mark_totals.append(mark_totals[-1] + mark_adjustment)
+
+            if self.verbosity == 1:
+                print(f"\tChunk splitting for this separator is complete. Total chunks now = {len(chunks)}")
+            if all(size <= target for _, _, size in chunks):
+                break
+
+        if use_tokens:
+            chunks = [cut for chunk in chunks for cut in self._cut_at_tokens(chunk, target, token_starts)]
+
+        join_cost = 0 if use_tokens else 1
+        spans = []
+        current_start, current_end, current_size = 0, 0, 0
+        for start, end, size in chunks:
+            if current_size + size <= target:
+                if current_end > current_start:
+                    current_end = end
+                    current_size += size + join_cost
+                else:
+                    current_start, current_end, current_size = start, end, size
+            else:
+                if current_end > current_start:
+                    spans.append((current_start, current_end))
+                current_start, current_end, current_size = start, end, size
+        if current_end > current_start:
+            spans.append((current_start, current_end))
+
+        if self.verbosity == 1:
+            print(f"FINAL NUMBER OF CHUNKS: {len(spans)}")
+        return spans
+
+    @staticmethod
+    def _cut_at_tokens(chunk: Tuple[int, int, int], target: int, token_starts: List[int]) -> List[Tuple[int, int, int]]:
+        """Cut a span that is still over budget into pieces of `target` tokens."""
+        start, end, size = chunk
+        if size <= target:
+            return [chunk]
+        first = bisect_left(token_starts, start)
+        cuts = [start] + [token_starts[first + i] for i in range(target, size, target)] + [end]
+        return [(a, b, min(target, size - i * target)) for i, (a, b) in enumerate(zip(cuts, cuts[1:]))]
+
+    def _overlap_spans(self, text: str, spans: List[Tuple[int, int]], token_starts: List[int]) -> List[str]:
+        """Token-mode overlap: extend each span by `overlap` tokens into its neighbours."""
+        if self.overlap == 0:
+            return [text[start:end] for start, end in spans]
+        chunks = []
+        for i, (start, end) in enumerate(spans):
+            if i > 0:
+                start = max(spans[i - 1][0], token_starts[max(0, bisect_left(token_starts, start) - self.overlap)])
+            if i < len(spans) - 1:
+                following = bisect_left(token_starts, end) + self.overlap
+                end = min(spans[i + 1][1], token_starts[following] if following < len(token_starts) else len(text))
+            chunks.append(text[start:end])
+        return chunks
+
     def split_into_chunks(self, text: str) -> List[str]:
         """
         Split the input text into chunks based on the specified separators and target chunk size.
@@ -132,6 +320,30 @@ class SuperRecursiveSplitter:
         Returns:
             List[str]: A list of text chunks.
         """
+        if not self._uses_span_engine():
+            return self._split_into_chunks_placeholder(text)
+
+        if self.length_unit == "tokens":
+            # One encode serves both the span sizes and the overlap boundaries
+            token_starts = self._token_starts(text)
+            self.spans = self.split_spans(text, token_starts)
+            self.chunks = self._overlap_spans(text, self.spans, token_starts)
+        else:
+            self.spans = self.split_spans(text)
+            self.chunks = self.add_overlap([text[start:end] for start, end in self.spans])
+        return self.chunks
+
+    def _split_into_chunks_placeholder(self, text: str) -> List[str]:
+        """
+        Placeholder-encoding implementation, used when placeholders or reconstruction are disabled.
+
+        Args:
+            text (str): The input text to be split into chunks.
+
+        Returns:
+            List[str]: A list of text chunks.
+        """
+        self.spans = []
         chunks = [text]
         if self.verbosity == 1:
             print("Beginning with 1 block of text, and split by each separator.")
@@ -217,60 +429,60 @@ class SuperRecursiveSplitter:
         return processed_text
 
 
-    def map_chunks_to_pages(self, pages_text: List[str]) -> List[List[int]]:
+    def map_chunks_to_pages(self, pages_text: List[str], text_offset: int = 0, separator_length: int = 0) -> List[List[int]]:
         """
         Map the chunks to their corresponding pages in the original text.
 
+        Page boundaries are found by bisecting the cumulative page offsets, so mapping
+        costs O(log pages) per chunk. Chunk offsets come from `self.spans` when the span
+        engine produced them, otherwise they are reconstructed from chunk lengths.
+
         Args:
             pages_text (List[str]): A list of strings, where each string represents a page of text.
+            text_offset (int, optional): Offset of the split text within the concatenated pages,
+                e.g. the number of leading characters stripped before splitting. Defaults to 0.
+            separator_length (int, optional): Length of the separator the pages were joined with
+                in the split text, e.g. 1 for form feeds. Defaults to 0.
 
         Returns:
-            List[List[int]]: A list where each contains a list of page numbers that the chunk spans.
+            List[List[int]]: A list where each contains a list of 1-based page numbers that the chunk spans.
         """
         page_starts = [0]  # Track the starting index of each page in the concatenated text
-        cumulative_length = 0
         for text in pages_text:
-            cumulative_length += len(text)
-            page_starts.append(cumulative_length)
-        
+            page_starts.append(page_starts[-1] + len(text) + separator_length)
+        last_page = len(pages_text)
+
         if self.verbosity == 1:
             print(f"{len(pages_text)} pages: {page_starts=}\n")
+
+        if self.spans and len(self.spans) == len(self.chunks):
+            offsets = self.spans
+        else:
+            offsets = []
+            total_length = 0
+            for cn, chunk in enumerate(self.chunks):
+                # Calculate the actual start and end indices, accounting for overlap
+                start_idx = 0 if cn == 0 else total_length - self.overlap
+                offsets.append((start_idx, start_idx + len(chunk)))
+                if cn == 0 or cn == len(self.chunks) - 1:
+                    total_length += len(chunk) - self.overlap
+                else:
+                    total_length += len(chunk) - 2 * self.overlap
+
         chunk_page_map = []
-        total_length = 0
-        for cn, chunk in enumerate(self.chunks):
+        for cn, (start_idx, end_idx) in enumerate(offsets):
+            start_idx += text_offset
+            end_idx = max(start_idx, end_idx + text_offset - 1)  # Last character of the chunk
+            start_page = min(bisect_right(page_starts, start_idx), last_page)
+            end_page = min(bisect_right(page_starts, end_idx), last_page)
             if self.verbosity == 1:
-                logging.info(f"MappingChunk {cn+1} (length = {len(chunk)})")
-            # Calculate the actual start and end indices, accounting for overlap
-            if cn == 0:
-                start_idx = 0
-            else:
-                start_idx = total_length - self.overlap
-            
-            clean_chunk = chunk
-            end_idx = start_idx + len(clean_chunk)
-            
-            if self.verbosity == 1:
-                logging.info(f"\t{start_idx=}, {end_idx=}")
-            
-            # Find the start and end pages
-            start_page = next((i for i, start in enumerate(page_starts) if start > start_idx), len(page_starts) - 1)
-            end_page = next((i for i, start in enumerate(page_starts) if start > end_idx), len(page_starts) - 1)
-            
-            if self.verbosity == 1:
-                logging.info(f"\t{start_page=}, {end_page=}")
-            
-            # Add the chunk and its page range to the map
+                logging.info(f"MappingChunk {cn+1}: {start_idx=}, {end_idx=}, {start_page=}, {end_page=}")
             chunk_page_map.append(list(range(start_page, end_page + 1)))
-            
-            if cn == 0 or cn == len(self.chunks) - 1:
-                total_length += len(clean_chunk) - self.overlap
-            else:
-                total_length += len(clean_chunk) - 2 * self.overlap
 
         self.pages = chunk_page_map
-        
+
         return chunk_page_map
-    
+
     def create_documents(self, additional_metadata: dict = None):
         """
         Create a list of Document objects from chunks and their corresponding page numbers.
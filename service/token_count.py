@@ -1,20 +1,150 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional
+
 import tiktoken
 
+# Input limit of the Azure OpenAI embedding deployment, in tokens
+EMBEDDING_TOKEN_LIMIT = 8000
+
+# Text is counted in segments of roughly this many characters when checking a threshold
+_SEGMENT_CHARS = 16384
+
+# A newline followed by a non-whitespace character. No cl100k_base pre-token spans
+# this position, so segments split here encode to exactly the same tokens as the whole.
+_SEGMENT_BOUNDARY = re.compile(r"(?<=\n)(?=\S)")
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = "cl100k_base") -> tiktoken.Encoding:
+    """Load a tiktoken encoding once per process."""
+    return tiktoken.get_encoding(encoding_name)
+
+
+@lru_cache(maxsize=None)
+def encoding_for_model(model: str) -> tiktoken.Encoding:
+    """Resolve the encoding for a model once per process, falling back to cl100k_base."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        print(f"Warning: model {model} not found. Using cl100k_base encoding.")
+        return get_encoding("cl100k_base")
+
+
+class TokenCounter:
+    """
+    Thread-safe token counter bound to one encoding.
+
+    Counts are memoized by content hash, threshold checks stop encoding as soon
+    as the limit is passed, and batches are encoded with tiktoken's own thread pool.
+    """
+
+    def __init__(self, encoding: tiktoken.Encoding, cache_size: int = 4096):
+        self.encoding = encoding
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_key(text: str) -> str:
+        return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[int]:
+        with self._lock:
+            count = self._cache.get(key)
+            if count is not None:
+                self._cache.move_to_end(key)
+            return count
+
+    def _remember(self, key: str, count: int) -> None:
+        with self._lock:
+            self._cache[key] = count
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def count(self, text: str, key: Optional[str] = None) -> int:
+        """
+        Count the tokens in `text`.
+
+        Args:
+            text: The text to count
+            key: Precomputed content hash of `text`, e.g. the document md5, to skip rehashing
+
+        Returns:
+            int: Number of tokens
+        """
+        key = key or self.content_key(text)
+        count = self._cached(key)
+        if count is None:
+            count = len(self.encoding.encode_ordinary(text))
+            self._remember(key, count)
+        return count
+
+    def exceeds(self, text: str, limit: int, key: Optional[str] = None) -> bool:
+        """
+        Check whether `text` has more than `limit` tokens without encoding all of it.
+
+        Every token covers at least one UTF-8 byte, so short texts are answered
+        without encoding. Longer texts are encoded segment by segment and the
+        check returns as soon as the running count passes the limit.
+        """
+        if len(text) * 4 <= limit or len(text.encode("utf-8")) <= limit:
+            return False
+
+        key = key or self.content_key(text)
+        count = self._cached(key)
+        if count is not None:
+            return count > limit
+
+        total = 0
+        start = 0
+        while start < len(text):
+            end = len(text)
+            if end - start > _SEGMENT_CHARS:
+                boundary = _SEGMENT_BOUNDARY.search(text, start + _SEGMENT_CHARS)
+                end = boundary.start() if boundary else len(text)
+            total += len(self.encoding.encode_ordinary(text[start:end]))
+            if total > limit:
+                return True
+            start = end
+
+        # The whole text was encoded, so the count is exact and worth keeping
+        self._remember(key, total)
+        return False
+
+    def count_batch(self, texts: List[str], num_threads: int = 8) -> List[int]:
+        """Count tokens for many texts, encoding cache misses in parallel."""
+        keys = [self.content_key(text) for text in texts]
+        counts = [self._cached(key) for key in keys]
+        missing = [i for i, count in enumerate(counts) if count is None]
+        if missing:
+            encoded = self.encoding.encode_ordinary_batch([texts[i] for i in missing], num_threads=num_threads)
+            for i, tokens in zip(missing, encoded):
+                counts[i] = len(tokens)
+                self._remember(keys[i], counts[i])
+        return counts
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(encoding_name: str = "cl100k_base") -> TokenCounter:
+    """Shared per-process TokenCounter for an encoding."""
+    return TokenCounter(get_encoding(encoding_name))
+
+
 def count_tokens(text: str, model: str = "gpt-4-0125-preview") -> int:
     """
     Count the number of tokens in a string for a specific model.
-    
+
     Args:
         text: The text to count tokens for
         model: The model to use for counting (defaults to GPT-4 Turbo)
-    
+
     Returns:
         int: Number of tokens
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(text))
-    except KeyError:
-        print(f"Warning: model {model} not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
-        return len(encoding.encode(text))
\ No newline at end of file
+    encoding = encoding_for_model(model)
+    return len(encoding.encode(text))
@@ -0,0 +1,119 @@
+import os
+import logging
+import threading
+from typing import Callable, Optional
+
+import weaviate
+from dotenv import load_dotenv
+
+from service.config import Config as ServiceConfig
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class WeaviateConnectionManager:
+    """
+    Process-wide owner of the sync Weaviate client.
+
+    The client is opened on first use rather than at import, and shared by every service:
+    its HTTP session pool and gRPC channel already multiplex concurrent requests. A
+    background thread checks liveness every `check_interval` seconds and reconnects when
+    the check fails, so operations no longer ping the server before each call. Callers
+    that see a connection error between checks can `reconnect()` directly.
+    """
+
+    def __init__(self, check_interval: float = 30, factory: Callable[[], weaviate.WeaviateClient] = ServiceConfig.buildWeaviateConnection):
+        self.check_interval = check_interval
+        self._factory = factory
+        self._client: Optional[weaviate.WeaviateClient] = None
+        self._healthy = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+        self._metrics = {"connects": 0, "reconnects": 0, "failed_checks": 0}
+
+    @classmethod
+    def from_env(cls) -> "WeaviateConnectionManager":
+        return cls(check_interval=float(os.getenv("WEAVIATE_HEALTH_CHECK_INTERVAL", "30")))
+
+    def get_client(self) -> weaviate.WeaviateClient:
+        """The shared client, connecting (or reconnecting after a failed check) if needed."""
+        client = self._client
+        if client is not None and self._healthy:
+            return client
+        with self._lock:
+            if self._client is None or not self._healthy:
+                self._connect_locked()
+            self._start_monitor_locked()
+            return self._client
+
+    def _connect_locked(self) -> None:
+        previous = self._client
+        logger.info("Reconnecting shared Weaviate client" if previous is not None else "Opening shared Weaviate client")
+        self._client = self._factory()
+        self._healthy = True
+        self._metrics["reconnects" if previous is not None else "connects"] += 1
+        if previous is not None:
+            try:
+                previous.close()
+            except Exception as e:
+                logger.warning(f"Error closing previous Weaviate client: {e}")
+
+    def reconnect(self) -> weaviate.WeaviateClient:
+        """Replace the shared client now, e.g. after an operation failed with a connection error."""
+        with self._lock:
+            self._connect_locked()
+            return self._client
+
+    def _start_monitor_locked(self) -> None:
+        if self.check_interval <= 0 or (self._monitor is not None and self._monitor.is_alive()):
+            return
+        self._stop.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="weaviate-liveness", daemon=True)
+        self._monitor.start()
+
+    def _monitor_loop(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            client = self._client
+            if client is None:
+                continue
+            try:
+                live = client.is_live()
+            except Exception as e:
+                logger.warning(f"Weaviate liveness check failed: {e}")
+                live = False
+            if live:
+                continue
+            self._metrics["failed_checks"] += 1
+            self._healthy = False
+            try:
+                with self._lock:
+                    if not self._healthy:
+                        self._connect_locked()
+                logger.info("Shared Weaviate client reconnected after a failed liveness check")
+            except Exception as e:
+                # The next get_client() call retries
+                logger.error(f"Weaviate reconnect failed: {e}")
+
+    def close(self) -> None:
+        """Stop the liveness thread and close the shared client, e.g. at application shutdown."""
+        self._stop.set()
+        monitor = self._monitor
+        if monitor is not None and monitor is not threading.current_thread():
+            monitor.join(timeout=5)
+        with self._lock:
+            if self._client is not None:
+                try:
+                    self._client.close()
+                except Exception as e:
+                    logger.warning(f"Error closing Weaviate client: {e}")
+            self._client = None
+            self._healthy = False
+            self._monitor = None
+
+    def metrics(self) -> dict:
+        return dict(self._metrics, connected=self._client is not None, healthy=self._healthy)
+
+
+weaviate_connection = WeaviateConnectionManager.from_env()
@@ -1,7 +1,7 @@
 import uuid
 import re
 import logging
-from typing import Tuple, Optional, Any, List
+from typing import Tuple, Optional, Any, List, Set
 from datetime import datetime
 from dotenv import load_dotenv
 import requests
@@ -17,22 +17,54 @@ from weaviate.collections.classes.config_base import _QuantizerConfigCreate as Q
 from io import BytesIO
 import docx
 from pypdf import PdfReader
-from service.config import Config as ServiceConfig
-from weaviate.classes.query import MetadataQuery
+from service.weaviateConnection import WeaviateConnectionManager, weaviate_connection
+from service.indexProfiles import INDEX_PROFILES, index_profile_name, index_signature, vector_index_config
+from weaviate.classes.aggregate import GroupByAggregate
+from weaviate.util import generate_uuid5
 from .policy_parser import PolicyBenefitParser
 from service.splitter import SuperRecursiveSplitter
+from service.token_count import EMBEDDING_TOKEN_LIMIT
+from service.embeddingService import VECTOR_SOURCE_PROPERTIES
+from models.searchFilters import SearchFilters
+from service.searchCache import search_cache
+from service.reranker import get_reranker
+from service.snippet_utils import RESULT_FIELDS, object_result
+from service.searchQueries import (
+    BENEFIT_QUERY_PROPERTIES, SEARCH_ALPHA, TOP_RESULTS_LIMIT, CaseSearch, benefit_cache_extra, benefit_results, benefit_search_args,
+)
 from datetime import datetime, time
+from time import sleep
 import hashlib
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-client = ServiceConfig.buildWeaviateConnection()
 weaviate_collection_name = os.getenv("WEAVIATE_COLLECTION_NAME")
 load_dotenv()
 
+# Properties added after the collection was first deployed; created on existing collections at startup
+ADDED_PROPERTIES = [
+    Config.Property(name="pageStart", data_type=Config.DataType.INT),
+    Config.Property(name="pageEnd", data_type=Config.DataType.INT),
+    Config.Property(name="chunkIndex", data_type=Config.DataType.INT, index_range_filters=True),
+]
+
+# Indexes search filters rely on: property -> (index_filterable, index_range_filters)
+FILTER_INDEXES = {
+    "type": (True, False),
+    "jurisdictionCode": (True, False),
+    "category": (True, False),
+    "decisionDate": (True, True),
+    "publishedDate": (True, True),
+}
+
+UPLOAD_MAX_RETRIES = 3
+
+# Collections already checked or created by this process
+_ensured_collections: Set[str] = set()
+
 class WeaviateService:
-    def __init__(self):
+    def __init__(self, connection: Optional[WeaviateConnectionManager] = None):
         logger.info("Initializing WeaviateService")
         
         self.connection_string = os.getenv("CONNECTION_STRING")
@@ -47,52 +79,61 @@ class WeaviateService:
         
         logger.info(f"WeaviateService config - collection: {self.policy_benefit_collection_name}, endpoint: {self.azure_endpoint}")
         
-        logger.info("Building Weaviate connection")
-        self.client = None
-        self._ensure_connection()
+        # Shared, health-checked client; services never open their own
+        self.connection = connection or weaviate_connection
+        self._known_tenants = set()
+        self._client_vectors = {}
         
-        logger.info("Ensuring collection exists")
-        self.create_policy_benefit_class(self.client)
+        if self.policy_benefit_collection_name not in _ensured_collections:
+            logger.info("Ensuring collection exists")
+            self.create_policy_benefit_class(self.client)
+            _ensured_collections.add(self.policy_benefit_collection_name)
         
         logger.info("WeaviateService initialization completed")
 
+    @property
+    def client(self) -> weaviate.WeaviateClient:
+        return self.connection.get_client()
+
     def _ensure_connection(self):
-        """Ensure Weaviate client is connected, reconnect if necessary"""
+        """Ensure Weaviate client is connected; liveness is checked in the background by the connection manager"""
         try:
-            if self.client is None:
-                logger.info("Creating new Weaviate client connection")
-                self.client = ServiceConfig.buildWeaviateConnection()
-                return
-            
-            # Check if client is still connected
-            if not self.client.is_live():
-                logger.warning("Weaviate client connection lost. Reconnecting...")
-                self.client = ServiceConfig.buildWeaviateConnection()
-                logger.info("Weaviate client reconnected successfully")
+            self.connection.get_client()
         except Exception as e:
             logger.error(f"Error ensuring Weaviate connection: {str(e)}", exc_info=True)
             raise
 
-    def create_policy_benefit_class(self, client: weaviate.WeaviateClient):
-        """Creates the unified 'PolicyBenefit' collection in Weaviate if it doesn't exist."""
-        logger.info(f"Checking for collection: {self.policy_benefit_collection_name}")
+    def reconnect(self):
+        """Replace the shared client after an operation failed with a connection error"""
+        logger.warning("Reconnecting shared Weaviate client")
+        self.connection.reconnect()
+
+    def create_policy_benefit_class(self, client: weaviate.WeaviateClient, collection_name: Optional[str] = None, index_profile: Optional[str] = None):
+        """
+        Creates the unified 'PolicyBenefit' collection (or `collection_name` with the same schema) in Weaviate if it doesn't exist.
+
+        The vector index follows `index_profile` (see `service.indexProfiles`), defaulting to
+        WEAVIATE_INDEX_PROFILE. Existing collections keep their index.
+        """
+        collection_name = collection_name or self.policy_benefit_collection_name
+        logger.info(f"Checking for collection: {collection_name}")
         self._ensure_connection()
         
-        if not client.collections.exists(self.policy_benefit_collection_name):
-            logger.info(f"Collection {self.policy_benefit_collection_name} does not exist, creating it")
+        if not client.collections.exists(collection_name):
+            logger.info(f"Collection {collection_name} does not exist, creating it")
             client.collections.create(
-                name=self.policy_benefit_collection_name,
+                name=collection_name,
                 description="Unified collection for all document types",
                 vectorizer_config=[
                     Config.Configure.NamedVectors.text2vec_azure_openai(
                         name="default",
-                        source_properties=["rawText", "caseName"], # vectorize the raw text
+                        source_properties=VECTOR_SOURCE_PROPERTIES, # vectorize the raw text
                         base_url=self.azure_endpoint,
                         resource_name=self.resource_name,
                         deployment_id=self.deployment_id,
-                        vector_index_config=Config.Configure.VectorIndex.hnsw(
-                            quantizer=Config.Configure.VectorIndex.Quantizer.bq(rescore_limit=200)
-                        )
+                        # Keeps the vectorizer input reproducible by `EmbeddingService.vector_text`
+                        vectorize_collection_name=False,
+                        vector_index_config=vector_index_config(index_profile)
                     )
                 ],
                 generative_config=Config.Configure.Generative.azure_openai(
@@ -101,27 +142,124 @@ class WeaviateService:
                 ),
                 multi_tenancy_config=Config.Configure.multi_tenancy(enabled=True),
                 properties=[
-                    Config.Property(name="type", data_type=Config.DataType.TEXT),
+                    Config.Property(name="type", data_type=Config.DataType.TEXT, tokenization=Config.Tokenization.FIELD, index_filterable=True),
                     Config.Property(name="parentDocumentId", data_type=Config.DataType.TEXT),
-                    Config.Property(name="rawText", data_type=Config.DataType.TEXT),
+                    # Searched, never filtered on
+                    Config.Property(name="rawText", data_type=Config.DataType.TEXT, index_filterable=False),
                     Config.Property(name="caseName", data_type=Config.DataType.TEXT),
                     Config.Property(name="caseDetails", data_type=Config.DataType.TEXT),
                     Config.Property(name="from", data_type=Config.DataType.TEXT_ARRAY),
-                    Config.Property(name="publishedDate", data_type=Config.DataType.DATE),
-                    Config.Property(name="category", data_type=Config.DataType.TEXT_ARRAY),
+                    Config.Property(name="publishedDate", data_type=Config.DataType.DATE, index_filterable=True, index_range_filters=True),
+                    Config.Property(name="category", data_type=Config.DataType.TEXT_ARRAY, index_filterable=True),
                     Config.Property(name="subCategory", data_type=Config.DataType.TEXT_ARRAY),
                     Config.Property(name="landmark", data_type=Config.DataType.TEXT),
-                    Config.Property(name="decisionDate", data_type=Config.DataType.DATE),
+                    Config.Property(name="decisionDate", data_type=Config.DataType.DATE, index_filterable=True, index_range_filters=True),
                     Config.Property(name="country", data_type=Config.DataType.TEXT),
-                    Config.Property(name="jurisdictionCode", data_type=Config.DataType.TEXT),
+                    Config.Property(name="jurisdictionCode", data_type=Config.DataType.TEXT, tokenization=Config.Tokenization.FIELD, index_filterable=True),
                     Config.Property(name="blobUrl", data_type=Config.DataType.TEXT),
                     Config.Property(name="md5Hash", data_type=Config.DataType.TEXT),
-                    Config.Property(name="orgId", data_type=Config.DataType.INT)
+                    Config.Property(name="orgId", data_type=Config.DataType.INT),
+                    *ADDED_PROPERTIES
                 ]
             )
-            logger.info(f"Collection {self.policy_benefit_collection_name} created successfully")
+            logger.info(f"Collection {collection_name} created successfully")
         else:
-            logger.info(f"Collection {self.policy_benefit_collection_name} already exists")
+            logger.info(f"Collection {collection_name} already exists")
+            collection = client.collections.get(collection_name)
+            self._add_missing_properties(collection)
+            self._check_filter_indexes(collection)
+            self._check_index_profile(collection, index_profile)
+
+    def _add_missing_properties(self, collection) -> None:
+        """Add properties introduced after the collection was created; existing objects read them as null."""
+        try:
+            existing = {prop.name for prop in collection.config.get().properties}
+            for prop in ADDED_PROPERTIES:
+                if prop.name not in existing:
+                    logger.info(f"Adding property {prop.name} to collection {self.policy_benefit_collection_name}")
+                    collection.config.add_property(prop)
+        except Exception as e:
+            logger.error(f"Error adding missing properties to {self.policy_benefit_collection_name}: {str(e)}", exc_info=True)
+
+    def _check_filter_indexes(self, collection) -> List[str]:
+        """
+        Warn about filtered properties created without the indexes filters need.
+
+        Weaviate cannot add these indexes to existing properties, so such collections
+        have to be copied into a new one with `migrate_collection`.
+        """
+        missing = []
+        try:
+            for prop in collection.config.get().properties:
+                wanted = FILTER_INDEXES.get(prop.name)
+                if wanted is None:
+                    continue
+                filterable, range_filters = wanted
+                if (filterable and not prop.index_filterable) or (range_filters and not prop.index_range_filters):
+                    missing.append(prop.name)
+            if missing:
+                logger.warning(f"Collection {collection.name} lacks filter indexes on {missing}; filtered searches on them will be slower until it is migrated")
+        except Exception as e:
+            logger.error(f"Error checking filter indexes on {collection.name}: {str(e)}", exc_info=True)
+        return missing
+
+    def _check_index_profile(self, collection, index_profile: Optional[str] = None) -> bool:
+        """Warn when an existing collection's vector index differs from the configured profile."""
+        try:
+            profile = index_profile_name(index_profile)
+            vector_config = collection.config.get().vector_config or {}
+            if "default" not in vector_config:
+                return True
+            actual = index_signature(vector_config["default"].vector_index_config)
+            if actual != INDEX_PROFILES[profile]:
+                logger.warning(f"Collection {collection.name} has a {actual[0]} index with {actual[1] or 'no'} compression, not index profile {profile}; migrate it to apply the profile")
+                return False
+        except Exception as e:
+            logger.error(f"Error checking the vector index of {collection.name}: {str(e)}", exc_info=True)
+        return True
+
+    def migrate_collection(self, target_collection_name: str, batch_size: int = 200, index_profile: Optional[str] = None) -> dict:
+        """
+        Copy every tenant's objects, with their vectors and IDs, into a new collection with the current schema.
+
+        Used to pick up index changes that cannot be applied in place, including a
+        different vector index profile. Nothing is
+        re-embedded. The source collection is left untouched; point
+        WEAVIATE_COLLECTION_NAME at the target once the copy has been checked.
+
+        Args:
+            target_collection_name: Collection to create and fill
+            batch_size: Objects per insert batch
+            index_profile: Vector index profile for the target; defaults to WEAVIATE_INDEX_PROFILE
+
+        Returns:
+            Per-tenant object counts and the number of failed inserts
+        """
+        if target_collection_name == self.policy_benefit_collection_name:
+            raise ValueError("Target collection must differ from the source collection")
+        logger.info(f"Migrating collection {self.policy_benefit_collection_name} to {target_collection_name}")
+        self._ensure_connection()
+        source = self.client.collections.get(self.policy_benefit_collection_name)
+        self.create_policy_benefit_class(self.client, target_collection_name, index_profile)
+        target = self.client.collections.get(target_collection_name)
+
+        copied, failed = {}, 0
+        for tenant_name in source.tenants.get():
+            if not target.tenants.exists(tenant_name):
+                target.tenants.create([weaviate.classes.tenants.Tenant(name=tenant_name)])
+            target_tenant = target.with_tenant(tenant_name)
+            count = 0
+            with target_tenant.batch.fixed_size(batch_size=batch_size) as batch:
+                for obj in source.with_tenant(tenant_name).iterator(include_vector=True):
+                    batch.add_object(properties=obj.properties, uuid=obj.uuid, vector=obj.vector)
+                    count += 1
+            failed += len(target_tenant.batch.failed_objects)
+            copied[tenant_name] = count
+            logger.info(f"Copied {count} objects for tenant {tenant_name}")
+
+        search_cache.invalidate_all()
+        logger.info(f"Migration to {target_collection_name} finished: {sum(copied.values())} objects, {failed} failed")
+        return {"source": self.policy_benefit_collection_name, "target": target_collection_name, "copied": copied, "failed": failed}
 
     @staticmethod
     def process_document(fileUrl: str, contentType: str) -> Tuple[str, Optional[List[str]]]:
@@ -202,9 +340,44 @@ class WeaviateService:
             logger.error(f"Failed to create policy benefit chunks for {filename}: {e}", exc_info=True)
             return []
 
-    def upload_documents(self, chunks: List[dict], tenant_name: str) -> None:
+    @staticmethod
+    def chunk_uuid(tenant_name: str, md5Hash: str, chunkIndex: int) -> str:
+        """Deterministic object ID, so re-uploading a chunk overwrites it instead of duplicating it."""
+        return generate_uuid5(f"{tenant_name}:{md5Hash}:{chunkIndex}")
+
+    def accepts_client_vectors(self, collection_name: Optional[str] = None) -> bool:
+        """
+        Whether vectors from `EmbeddingService` are interchangeable with the ones the collection's
+        vectorizer computes. Collections created before the vectorizer stopped vectorizing the
+        collection name, or with other source properties, are left to vectorize server-side.
+        """
+        collection_name = collection_name or self.policy_benefit_collection_name
+        if collection_name not in self._client_vectors:
+            try:
+                self._ensure_connection()
+                vectorizer = self.client.collections.get(collection_name).config.get().vector_config["default"].vectorizer
+                compatible = (
+                    vectorizer.model.get("vectorizeClassName") is False
+                    and sorted(vectorizer.source_properties or []) == sorted(VECTOR_SOURCE_PROPERTIES)
+                )
+            except Exception as e:
+                logger.warning(f"Could not read the vectorizer config of '{collection_name}'; not using client-side vectors: {e}")
+                return False
+            if not compatible:
+                logger.warning(f"Collection '{collection_name}' vectorizes its name or other properties; client-side vectors are not used for it")
+            self._client_vectors[collection_name] = compatible
+        return self._client_vectors[collection_name]
+
+    def upload_documents(self, chunks: List[dict], tenant_name: str, vectors: Optional[List[List[float]]] = None, prune_stale: bool = False) -> None:
         """
-        Uploads a batch of structured document objects to the unified 'PolicyBenefit' collection.
+        Upserts a batch of structured document objects into the unified 'PolicyBenefit' collection.
+
+        Object IDs are UUIDv5 values of (tenant, md5Hash, chunkIndex), so retries and re-ingests
+        overwrite existing objects. Only objects reported in `batch.failed_objects` are retried,
+        with exponential backoff; an error is raised if any still fail.
+        When `vectors` is given and the collection `accepts_client_vectors`, each object is
+        stored with its precomputed `default` vector and the server-side vectorizer is skipped. With `prune_stale`, chunks of the same
+        documents left over from an earlier, longer chunking are deleted.
         """
         logger.info(f"Uploading {len(chunks)} document chunks to '{self.policy_benefit_collection_name}' for tenant: {tenant_name}")
         try:
@@ -214,39 +387,65 @@ class WeaviateService:
             if not collection.tenants.exists(tenant_name):
                 logger.info(f"Creating new tenant: {tenant_name} in collection {self.policy_benefit_collection_name}")
                 collection.tenants.create([weaviate.classes.tenants.Tenant(name=tenant_name)])
+            self._known_tenants.add(tenant_name)
             
             tenant_collection = collection.with_tenant(tenant_name)
-
-            with tenant_collection.batch.dynamic() as batch:
-                for chunk_properties in chunks:
-                    batch.add_object(
-                        properties=chunk_properties,
-                        uuid=uuid.uuid4()
-                    )
-            failed_objects = tenant_collection.batch.failed_objects
-            if failed_objects:
+            if vectors and not self.accepts_client_vectors():
+                vectors = None
+
+            objects = {}
+            chunk_counts = {}
+            for index, chunk_properties in enumerate(chunks):
+                md5Hash = chunk_properties.get("md5Hash")
+                if md5Hash:
+                    chunkIndex = chunk_properties.get("chunkIndex")
+                    if chunkIndex is None:
+                        chunkIndex = chunk_counts.get(md5Hash, 0)
+                    chunk_counts[md5Hash] = max(chunk_counts.get(md5Hash, 0), chunkIndex + 1)
+                    object_id = self.chunk_uuid(tenant_name, md5Hash, chunkIndex)
+                else:
+                    object_id = str(uuid.uuid4())
+                objects[object_id] = (chunk_properties, {"default": vectors[index]} if vectors else None)
+
+            pending = list(objects)
+            for attempt in range(UPLOAD_MAX_RETRIES + 1):
+                if attempt:
+                    delay = 2 ** (attempt - 1)
+                    logger.warning(f"Retrying {len(pending)} failed objects in {delay}s (attempt {attempt}/{UPLOAD_MAX_RETRIES})")
+                    sleep(delay)
+                with tenant_collection.batch.dynamic() as batch:
+                    for object_id in pending:
+                        properties, vector = objects[object_id]
+                        batch.add_object(properties=properties, uuid=object_id, vector=vector)
+                failed_objects = tenant_collection.batch.failed_objects
+                if not failed_objects:
+                    break
                 logger.error(f"Number of failed imports: {len(failed_objects)}")
-                logger.error(f"First failed object: {failed_objects[0]}")
-
-                md5_hashes = [chunk.get("md5Hash") for chunk in chunks if chunk.get("md5Hash")]
+                logger.error(f"First failed object: {failed_objects[0].message}")
+                pending = [str(failed.object_.uuid) for failed in failed_objects]
+            else:
+                raise RuntimeError(f"{len(pending)} of {len(objects)} objects failed to upload after {UPLOAD_MAX_RETRIES} retries")
 
-                if md5_hashes:
-                    logger.info(f"Deleting failed batch using md5Hashes: {md5_hashes}")
+            if prune_stale and chunk_counts:
+                for md5Hash, count in chunk_counts.items():
                     tenant_collection.data.delete_many(
-                        where=weaviate.classes.query.Filter.by_property("md5Hash").contains_any(md5_hashes)
+                        where=Query.Filter.by_property("md5Hash").equal(md5Hash) & Query.Filter.by_property("chunkIndex").greater_or_equal(count)
                     )
-                    logger.info("Successfully deleted failed batch.")
             
             logger.info(f"Successfully uploaded batch for {len(chunks)} document chunks.")
 
         except Exception as e:
             logger.error(f"Error uploading document chunks: {str(e)}", exc_info=True)
             raise
+        finally:
+            # Even a failed batch may have written some objects
+            search_cache.invalidate_tenant(tenant_name)
 
-    def search_documents(self, query: str, top_k: int, tenant_name: str) -> List[dict]:
+    def search_documents(self, query: str, top_k: int, tenant_name: str, reranker: Optional[str] = None) -> List[dict]:
         """
         Search for relevant policy benefits using semantic similarity.
         This method is now configured to search the structured 'PolicyBenefit' collection.
+        With a reranker (see `get_reranker`), candidates are over-fetched and the best `top_k` kept.
         """
         logger.info(f"Searching for policy benefits - query: '{query[:50]}...', top_k: {top_k}, tenant: {tenant_name}")
         try:
@@ -255,33 +454,18 @@ class WeaviateService:
             policy_collection = self.client.collections.get(self.policy_benefit_collection_name)
             tenant_collection = policy_collection.with_tenant(tenant_name)
             
-            logger.info(f"Performing hybrid search in '{self.policy_benefit_collection_name}' collection...")
-                        
-            response = tenant_collection.query.hybrid(
-                query=query,
-                limit=top_k,
-                alpha=0.7,
-                query_properties=["rawText", "notes", "section"],
-                return_metadata=MetadataQuery(score=True)
+            active_reranker = get_reranker(reranker)
+
+            def run_search() -> List[dict]:
+                logger.info(f"Performing hybrid search in '{self.policy_benefit_collection_name}' collection...")
+                response = tenant_collection.query.hybrid(**benefit_search_args(query, top_k, active_reranker))
+                logger.info(f"Search completed. Found {len(response.objects)} potential benefit results.")
+                return benefit_results(query, response.objects, top_k, active_reranker)
+
+            results = search_cache.get_or_compute(
+                tenant_name, query, SEARCH_ALPHA, BENEFIT_QUERY_PROPERTIES, top_k, run_search,
+                extra=benefit_cache_extra(active_reranker)
             )
-            
-            logger.info(f"Search completed. Found {len(response.objects)} potential benefit results.")
-            
-            # Format results with the rich, structured data
-            results = []
-            for obj in response.objects:
-                properties = obj.properties
-                result = {
-                    "rawText": properties.get("rawText"),
-                    "section": properties.get("section"),
-                    "title": properties.get("title"),
-                    "description": properties.get("description"),
-                    "notes": properties.get("notes"),
-                    "filename": properties.get("filename"),
-                    "coverage_network": properties.get("coverage_network"),
-                    "coverage_nonNetwork": properties.get("coverage_nonNetwork")
-                }
-                results.append(result)
 
             logger.info(f"Policy benefit search completed successfully. Returning {len(results)} structured results.")
             return results
@@ -318,25 +502,63 @@ class WeaviateService:
         except Exception as e:
             logger.warning(f"An error occurred while checking existence in '{self.policy_benefit_collection_name}'. Assuming document does not exist. Error: {e}")
             return False
-        
-    def chunk_and_embed_document(self, full_text: str, doc_type: str, doc, full_pdf_blob_path: str, md5Hash: str, orgId: int) -> List[dict]:
+
+    def get_existing_hashes(self, md5Hashes: List[str], tenant_name: str) -> Set[str]:
+        """
+        Return the subset of the given hashes that already have chunks for the tenant.
+        Uses one `contains_any` filter grouped by md5Hash, so the cost is a single
+        round trip regardless of how many chunks each document has.
+        """
+        if not md5Hashes:
+            return set()
+        logger.info(f"Checking existence of {len(md5Hashes)} documents for tenant: {tenant_name}")
+        try:
+            self._ensure_connection()
+            collection = self.client.collections.get(self.policy_benefit_collection_name)
+
+            if tenant_name not in self._known_tenants:
+                if not collection.tenants.exists(tenant_name):
+                    logger.info(f"Tenant {tenant_name} does not exist in {self.policy_benefit_collection_name}. Concluding no documents exist.")
+                    return set()
+                self._known_tenants.add(tenant_name)
+
+            response = collection.with_tenant(tenant_name).aggregate.over_all(
+                filters=Query.Filter.by_property("md5Hash").contains_any(list(md5Hashes)),
+                group_by=GroupByAggregate(prop="md5Hash", limit=len(md5Hashes)),
+                total_count=True
+            )
+            return {group.grouped_by.value for group in response.groups if group.total_count}
+
+        except Exception as e:
+            logger.warning(f"An error occurred while checking existence in '{self.policy_benefit_collection_name}'. Assuming documents do not exist. Error: {e}")
+            return set()
+
+    def chunk_and_embed_document(self, full_text: str, doc_type: str, doc, full_pdf_blob_path: str, md5Hash: str, orgId: int, pages: Optional[List[str]] = None, page_separator: str = "\f") -> List[dict]:
         """
         Chunk and embed a document, handling pages if present, using parallel processing.
+
+        When `pages` is given, `full_text` is `page_separator.join(pages)`, and each chunk
+        records the page range it came from.
         """
         logger.info(f"Starting chunk and embed document")
 
         doc_splitter = SuperRecursiveSplitter(
             separators=["\n\n", "\n", ".", ",", " "],
-            target_chunk_size=20000,
+            target_chunk_size=EMBEDDING_TOKEN_LIMIT,
             separator_placeholders=True,
             overlap=0,
             reconstruct=True,
-            verbosity=0
+            verbosity=0,
+            length_unit="tokens"
         )
         
         logger.info("Splitting document into chunks")
         chunks = doc_splitter.split_into_chunks(full_text)
         logger.info(f"Document split into {len(chunks)} chunks")
+
+        page_ranges = [None] * len(chunks)
+        if pages:
+            page_ranges = doc_splitter.map_chunks_to_pages(pages, separator_length=len(page_separator))
                 
         # Process chunks in batches
         BATCH_SIZE = 8
@@ -349,7 +571,7 @@ class WeaviateService:
             logger.info(f"Processing batch {batch_num} with {len(batch)} chunks")
             
             try:                
-                for chunk in batch:                    
+                for chunkIndex, (chunk, page_range) in enumerate(zip(batch, page_ranges[i:i + BATCH_SIZE]), start=i):                    
                     if doc_type == 'decision':
                         chunk_obj = {
                             "type": "decision",
@@ -364,6 +586,9 @@ class WeaviateService:
                             "blobUrl": f"{full_pdf_blob_path}",
                             "md5Hash": md5Hash,
                             "orgId": orgId,
+                            "pageStart": page_range[0] if page_range else None,
+                            "pageEnd": page_range[-1] if page_range else None,
+                            "chunkIndex": chunkIndex,
                         }
                     else:
                         chunk_obj = {
@@ -381,6 +606,9 @@ class WeaviateService:
                             "blobUrl": f"{full_pdf_blob_path}",
                             "md5Hash": md5Hash,
                             "orgId": orgId,
+                            "pageStart": page_range[0] if page_range else None,
+                            "pageEnd": page_range[-1] if page_range else None,
+                            "chunkIndex": chunkIndex,
                             }
                    
                     embedded_chunks.append(chunk_obj)
@@ -392,8 +620,9 @@ class WeaviateService:
         logger.info(f"Document chunking completed")
         return embedded_chunks
 
-    def create_document_chunk(self, full_text: str, doc_type: str, doc, full_pdf_blob_path: str, md5Hash: str, orgId: int) -> List[dict]:
+    def create_document_chunk(self, full_text: str, doc_type: str, doc, full_pdf_blob_path: str, md5Hash: str, orgId: int, pages: Optional[List[str]] = None) -> List[dict]:
         logger.info(f"Creating a single document chunk for file: {doc.id}")
+        page_start, page_end = (1, len(pages)) if pages else (None, None)
         
         # md5Hash = hashlib.md5(full_text.encode('UTF-8')).hexdigest()
         
@@ -411,6 +640,9 @@ class WeaviateService:
                 "blobUrl": f"{full_pdf_blob_path}",
                 "md5Hash": md5Hash,
                 "orgId": orgId,
+                "pageStart": page_start,
+                "pageEnd": page_end,
+                "chunkIndex": 0,
             }
         else:
             chunk_obj = {
@@ -428,102 +660,94 @@ class WeaviateService:
                 "blobUrl": f"{full_pdf_blob_path}",
                 "md5Hash": md5Hash,
                 "orgId": orgId,
+                "pageStart": page_start,
+                "pageEnd": page_end,
+                "chunkIndex": 0,
             }
         
         return [chunk_obj]
 
 
     def close(self):
-        logger.info("Closing Weaviate client connection")
-        if self.client:
-            try:
-                self.client.close()
-                logger.info("Weaviate client connection closed successfully")
-            except Exception as e:
-                logger.warning(f"Error closing Weaviate client: {str(e)}")
-        self.client = None
+        # The client is shared by every service and closed by the connection manager at shutdown
+        logger.info("Releasing WeaviateService")
 
     def delete_collection(self):
         logger.info(f"Deleting collection: {self.policy_benefit_collection_name}")
         self._ensure_connection()
         self.client.collections.delete(self.policy_benefit_collection_name)
+        self._known_tenants.clear()
+        _ensured_collections.discard(self.policy_benefit_collection_name)
+        search_cache.invalidate_all()
         logger.info("Collection deleted successfully")
 
     
-    def search_relevant_docs(self, query: str, page: int, page_size: int) -> dict:
+    def search_relevant_docs(
+        self,
+        query: str,
+        page: int,
+        page_size: int,
+        result_set_token: Optional[str] = None,
+        snippet: bool = False,
+        fields: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        group_by_case: bool = False,
+    ) -> dict:
         """
         Find top 300 most relevant chunks for a query and paginate through them.
+
+        The first request ranks the top 300 object IDs once and keeps them server-side
+        behind `result_set_token`. Requests that pass the token back only fetch the
+        properties of the objects on the requested page. An unknown or expired token
+        transparently starts a new result set.
+
+        In snippet mode each result carries a short highlighted `snippet` instead of the
+        chunk's full `rawText`, which `get_chunk_text` returns on demand. `fields` limits
+        the returned properties (see `RESULT_FIELDS`). `filters` restrict the search with a
+        Weaviate pre-filter; a result set token only pages the filters it was created with.
+
+        With `group_by_case`, up to GROUPED_HITS_LIMIT hits are ranked and collapsed by
+        `parentDocumentId`, so pages list cases: each result is the case's best chunk with
+        a `hitCount` of its matching chunks, and `total_records` counts cases.
         """
 
-        policy_collection = client.collections.get(weaviate_collection_name)
-        tenant_collection = policy_collection.with_tenant("1")
+        tenant_collection = self.client.collections.get(weaviate_collection_name).with_tenant("1")
+        search = CaseSearch(query, page, page_size, result_set_token, snippet, fields, filters, group_by_case)
 
         try:
-            # Fetch top 300 most relevant records
-            TOP_RESULTS_LIMIT = 300
-            
-            logger.info(f"Fetching top {TOP_RESULTS_LIMIT} most relevant records...")
-            
-            response = tenant_collection.query.hybrid(
-                query=query,
-                alpha=0.7,
-                query_properties=["rawText", "caseName", "jurisdictionCode"],
-                limit=TOP_RESULTS_LIMIT,  # Get exactly top 300
-            )
-            
-            logger.info(f"Retrieved {len(response.objects)} objects from Weaviate")
-            
-            # Process all fetched results
-            all_results = []
-            for obj in response.objects:
-                properties = obj.properties
-                                
-                result = {
-                    "rawText": properties.get("rawText"),
-                    "caseName": properties.get("caseName"),
-                    "jurisdictionCode": properties.get("jurisdictionCode"),
-                    "pdfBlobUrl": properties.get("blobUrl"),
-                }
-                all_results.append(result)
-
-            # # Sort by relevance score (highest first) - Weaviate should already be sorted
-            # all_results.sort(key=lambda x: x["relevanceScore"], reverse=True)
-            
-            # # Remove relevance scores from results if you don't want to expose them
-            # for result in all_results:
-            #     result.pop("relevanceScore", None)
+            ranked_ids = search.stored_ranking()
+            if ranked_ids is None:
+                def rank_top_results() -> list:
+                    logger.info(f"Ranking top {TOP_RESULTS_LIMIT} most relevant records...")
+                    return search.ranking(tenant_collection.query.hybrid(**search.hybrid_args()).objects)
 
-            # Apply pagination to the top 300 results
-            total_records = len(all_results)  # This will be <= 300
-            total_pages = (total_records + page_size - 1) // page_size if total_records > 0 else 0
-            
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-
-            # Check if requested page is out of range
-            if start_index >= total_records and total_records > 0:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Page {page} is out of range. Maximum page is {total_pages}"
-                )
+                ranked_ids = search_cache.get_or_compute(*search.cache_args(), rank_top_results, extra=search.cache_extra())
+                search.remember(ranked_ids)
 
-            # Get the paginated results
-            paginated_results = all_results[start_index:end_index]
-
-            return {
-                "query": query[:100] + "..." if len(query) > 100 else query,
-                "page": page,
-                "page_size": page_size,
-                "total_records": total_records,  # Actual number of matching records (≤ 300)
-                # "total_pages": total_pages,
-                # "max_results_limit": TOP_RESULTS_LIMIT,  # Inform user about the 300 limit
-                # "has_next": page < total_pages,
-                # "has_previous": page > 1,
-                # "results_count": len(paginated_results),
-                # "is_limited_to_top_results": total_records == TOP_RESULTS_LIMIT,  # Flag if we hit the 300 limit
-                "results": paginated_results
-            }
+            # Fetch only the objects on this page, then restore the ranking order
+            page_ids = search.page_ids(ranked_ids)
+            objects = tenant_collection.query.fetch_objects(**search.fetch_args(page_ids)).objects if page_ids else []
+            return search.response(page_ids, objects)
 
+        except HTTPException:
+            raise
         except Exception as e:
             logger.info(f"Error in search_relevant_docs: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+    def get_chunk_text(self, object_id: str, tenant_name: str = "1") -> Optional[dict]:
+        """
+        Fetch one chunk's full text and metadata by object ID, e.g. after a snippet-mode search.
+
+        Returns:
+            The chunk's result fields with its `id`, or None if no such object exists
+        """
+        try:
+            uuid.UUID(object_id)
+        except ValueError:
+            return None
+        tenant_collection = self.client.collections.get(weaviate_collection_name).with_tenant(tenant_name)
+        obj = tenant_collection.query.fetch_object_by_id(object_id, return_properties=list(RESULT_FIELDS.values()))
+        if obj is None:
+            return None
+        return object_result(obj, list(RESULT_FIELDS), "", snippet=False)